@@ -0,0 +1,228 @@
+"""
+Caches shared across simulation runs.
+
+ScoreCache maps (exact state fingerprint, constraints hash) to the state's
+total score, so runs over the same scenario family skip re-scoring states
+they have already seen. It is bounded (LRU + TTL) and can be dumped to and
+restored from JSON so it survives server restarts; entries stored since the
+last save can be taken on their own, so a save only writes what is new.
+
+ResultCache maps a request's content hash to the response of the run that
+answered it, so a repeated request is served without searching again.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+def canonical_json(data: Any) -> str:
+    """
+    Canonical JSON encoding: keys sorted at every nesting level, no whitespace.
+    
+    Equal JSON values always encode to the same string, whatever order their
+    dicts were built in. Tuples encode as lists.
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+
+def content_hash(data: Any) -> str:
+    """Full SHA-256 of a value's canonical encoding, for content addressing."""
+    return hashlib.sha256(canonical_json(data).encode()).hexdigest()
+
+
+def ordered_hash(data: Any) -> str:
+    """
+    Full SHA-256 of a value's compact JSON encoding, keeping dict key order.
+    
+    For keys over scenarios, whose initial_state order decides the field
+    order, the order actions draw random values in and the order scores are
+    summed in: dicts that differ only in key order hash differently.
+    """
+    return hashlib.sha256(json.dumps(data, separators=(",", ":")).encode()).hexdigest()
+
+
+class ScoreCache:
+    """
+    Bounded LRU cache of state scores with optional time-to-live.
+    
+    Safe to share between runs executing on different threads.
+    """
+    
+    def __init__(self, max_entries: int = 50_000, ttl_seconds: float | None = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # (fingerprint, constraints hash) -> (score, stored_at)
+        self._entries: OrderedDict[tuple[int, str], tuple[float, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Keys stored since the last take_unsaved, in the order they were stored
+        self._unsaved: dict[tuple[int, str], None] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _get(self, key: tuple[int, str], now: float) -> float | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if self.ttl_seconds is not None and now - entry[1] > self.ttl_seconds:
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    def _put(self, key: tuple[int, str], score: float, now: float) -> None:
+        self._entries[key] = (score, now)
+        self._entries.move_to_end(key)
+        self._unsaved[key] = None
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def get(self, fingerprint: int, scope: str) -> float | None:
+        """Return the cached score, or None on a miss or expired entry."""
+        with self._lock:
+            return self._get((fingerprint, scope), time.time())
+    
+    def get_many(self, fingerprints: list[int], scope: str) -> list[float | None]:
+        """get for each fingerprint in turn, taking the lock once."""
+        now = time.time()
+        with self._lock:
+            return [self._get((fingerprint, scope), now) for fingerprint in fingerprints]
+    
+    def put(self, fingerprint: int, scope: str, score: float) -> None:
+        """Store a score, evicting the least recently used entries past max_entries."""
+        with self._lock:
+            self._put((fingerprint, scope), score, time.time())
+    
+    def put_many(self, fingerprints: list[int], scope: str, scores: list[float]) -> None:
+        """put for each fingerprint and score in turn, taking the lock once."""
+        now = time.time()
+        with self._lock:
+            for fingerprint, score in zip(fingerprints, scores):
+                self._put((fingerprint, scope), score, now)
+    
+    def stats(self) -> dict[str, int]:
+        """Lifetime counters for this cache instance."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+    
+    def to_json(self) -> list[list[Any]]:
+        """Entries, least recently used first, as JSON-serializable rows."""
+        with self._lock:
+            return [
+                [fingerprint, scope, score, stored_at]
+                for (fingerprint, scope), (score, stored_at) in self._entries.items()
+            ]
+    
+    def take_unsaved(self) -> list[list[Any]]:
+        """
+        Entries stored since the last call that are still cached, as to_json
+        rows in the order they were stored.
+        """
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+            return [
+                [fingerprint, scope, *self._entries[fingerprint, scope]]
+                for fingerprint, scope in unsaved
+                if (fingerprint, scope) in self._entries
+            ]
+    
+    def load_json(self, rows: list[list[Any]]) -> None:
+        """
+        Restore entries from to_json or take_unsaved output, dropping expired
+        ones; a later row for a key replaces an earlier one.
+        """
+        now = time.time()
+        with self._lock:
+            for fingerprint, scope, score, stored_at in rows:
+                if self.ttl_seconds is not None and now - stored_at > self.ttl_seconds:
+                    continue
+                self._entries[(fingerprint, scope)] = (score, stored_at)
+                self._entries.move_to_end((fingerprint, scope))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of run responses keyed by request hash, with optional
+    time-to-live.
+    
+    Each entry remembers the run it came from, so rewriting that run (for
+    example by continuing it) can drop the entries it invalidates. Safe to
+    share between threads.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # request hash -> (run_id, response, stored_at)
+        self._entries: OrderedDict[str, tuple[str, dict[str, Any], float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached response, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl_seconds is not None and time.time() - entry[2] > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: str, run_id: str, response: dict[str, Any]) -> None:
+        """Store a response, evicting the least recently used entries past max_entries."""
+        with self._lock:
+            self._entries[key] = (run_id, response, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def discard_run(self, run_id: str) -> None:
+        """Drop every entry answered by run_id."""
+        with self._lock:
+            stale = [key for key, (owner, _, _) in self._entries.items() if owner == run_id]
+            for key in stale:
+                del self._entries[key]
+    
+    def record(self, hit: bool) -> None:
+        """Count one lookup, whether it was served from memory or from storage."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def stats(self) -> dict[str, int]:
+        """Lifetime counters for this cache instance."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
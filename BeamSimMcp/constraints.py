@@ -0,0 +1,93 @@
+"""
+Constraint compilation for simulation scoring.
+
+The constraints dict ({"max_x": 100, "min_y": -50, ...}) is parsed once per
+run into typed bounds that both the reference and numpy engines evaluate,
+so no key parsing happens while candidates are scored.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+# Penalty per unit of constraint violation
+PENALTY_WEIGHT = 10
+
+_PREFIXES = {"max_": True, "min_": False}
+
+
+@dataclass(frozen=True)
+class Bound:
+    """A single upper or lower bound on one state field."""
+    key: str
+    field: str
+    limit: int | float
+    is_max: bool
+    weight: int | float = PENALTY_WEIGHT
+    
+    def penalty(self, value: Any) -> float:
+        """Penalty (zero or negative) for value under this bound alone."""
+        if not isinstance(value, (int, float)):
+            return 0.0
+        if self.is_max and value > self.limit:
+            return -((value - self.limit) * self.weight)
+        if not self.is_max and value < self.limit:
+            return -((self.limit - value) * self.weight)
+        return 0.0
+
+
+@dataclass
+class CompiledConstraints:
+    """Constraints parsed into bounds, in their original order and by field."""
+    bounds: list[Bound] = field(default_factory=list)
+    by_field: dict[str, list[Bound]] = field(default_factory=dict)
+    
+    def penalty(self, state: dict[str, Any]) -> float:
+        """Total constraint penalty of a state, accumulated in constraint order."""
+        penalty = 0.0
+        for bound in self.bounds:
+            if bound.field not in state:
+                continue
+            actual = state[bound.field]
+            if not isinstance(actual, (int, float)):
+                continue
+            if bound.is_max and actual > bound.limit:
+                penalty -= (actual - bound.limit) * bound.weight
+            elif not bound.is_max and actual < bound.limit:
+                penalty -= (bound.limit - actual) * bound.weight
+        return penalty
+    
+    def field_penalty(self, field_name: Any, value: Any) -> float:
+        """Penalty contributed by one field's value."""
+        penalty = 0.0
+        for bound in self.by_field.get(field_name, ()):
+            penalty += bound.penalty(value)
+        return penalty
+
+
+def compile_constraints(constraints: dict[str, Any] | None) -> CompiledConstraints:
+    """
+    Parse a constraints dict into bounds.
+    
+    Raises:
+        ValueError: If a key is not max_<field>/min_<field> or a limit is not a number.
+    """
+    compiled = CompiledConstraints()
+    if not constraints:
+        return compiled
+    if not isinstance(constraints, dict):
+        raise ValueError("constraints must be an object")
+    
+    for key, limit in constraints.items():
+        prefix = key[:4] if isinstance(key, str) else None
+        if prefix not in _PREFIXES or len(key) == 4:
+            raise ValueError(
+                f"Unknown constraint '{key}': expected max_<field> or min_<field>"
+            )
+        if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+            raise ValueError(f"Constraint '{key}' must be a number")
+        
+        bound = Bound(key=key, field=key[4:], limit=limit, is_max=_PREFIXES[prefix])
+        compiled.bounds.append(bound)
+        compiled.by_field.setdefault(bound.field, []).append(bound)
+    
+    return compiled
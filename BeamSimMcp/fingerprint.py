@@ -0,0 +1,102 @@
+"""
+Zobrist-style state fingerprints.
+
+A state's fingerprint is the XOR of one 64-bit hash per (field, value) pair,
+so an action that writes a single field updates it in O(1):
+
+    fp ^= field_hash(field, old) ^ field_hash(field, new)
+
+Numbers are quantized by dropping the low mantissa bits before hashing, so
+values that differ only by accumulated rounding (e.g. x + a + b vs x + b + a)
+fingerprint the same. Passing quantize_bits=0 gives exact fingerprints,
+used where equal fingerprints must mean equal scores (the score cache):
+floats are hashed by their bit pattern, and ints by their exact value under
+a salt of their own, since ints past 2**53 that differ only below float64
+precision are different states, and the reference engine sums ints exactly.
+Hashes are derived from blake2b and splitmix64 rather than hash(), so
+fingerprints are stable across processes.
+"""
+
+import hashlib
+import struct
+from functools import lru_cache
+from typing import Any
+
+MASK = (1 << 64) - 1
+
+# Low float64 mantissa bits ignored when hashing numbers (~1e-11 relative)
+QUANTIZE_BITS = 16
+
+MIX_1 = 0xBF58476D1CE4E5B9
+MIX_2 = 0x94D049BB133111EB
+
+
+def _mix(x: int) -> int:
+    """splitmix64 finalizer."""
+    x = ((x ^ (x >> 30)) * MIX_1) & MASK
+    x = ((x ^ (x >> 27)) * MIX_2) & MASK
+    return x ^ (x >> 31)
+
+
+def _digest64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode(), digest_size=8).digest(), "little")
+
+
+@lru_cache(maxsize=4096)
+def field_salt(field: str) -> int:
+    """Per-field 64-bit salt."""
+    return _digest64(f"field:{field}")
+
+
+@lru_cache(maxsize=4096)
+def int_salt(field: str) -> int:
+    """Per-field 64-bit salt for int values in exact fingerprints."""
+    return _digest64(f"int:{field}")
+
+
+def exact_int(value: int) -> int:
+    """64 bits standing for an int: its two's complement if it fits, else a digest."""
+    if -(1 << 63) <= value < 1 << 63:
+        return value & MASK
+    return _digest64(f"int:{value}")
+
+
+def quantize(value: int | float, quantize_bits: int = QUANTIZE_BITS) -> int:
+    """Round a number's float64 bit pattern to drop quantize_bits low bits."""
+    bits = struct.unpack("<Q", struct.pack("<d", float(value) + 0.0))[0]
+    if not quantize_bits:
+        return bits
+    return ((bits + (1 << (quantize_bits - 1))) & MASK) >> quantize_bits
+
+
+def field_hash(field: str, value: Any, quantize_bits: int = QUANTIZE_BITS) -> int:
+    """Hash of one (field, value) pair; absent fields contribute nothing."""
+    if not quantize_bits and isinstance(value, int):
+        return _mix(int_salt(field) ^ exact_int(value))
+    if isinstance(value, (int, float)):
+        try:
+            return _mix(field_salt(field) ^ quantize(value, quantize_bits))
+        except OverflowError:
+            pass
+    return _mix(field_salt(field) ^ _digest64(f"value:{value!r}"))
+
+
+def state_fingerprint(state: dict[str, Any], quantize_bits: int = QUANTIZE_BITS) -> int:
+    """Fingerprint of a whole state."""
+    fp = 0
+    for field, value in state.items():
+        fp ^= field_hash(field, value, quantize_bits)
+    return fp
+
+
+def updated_fingerprint(
+    fp: int,
+    state: dict[str, Any],
+    field: str,
+    value: Any,
+    quantize_bits: int = QUANTIZE_BITS
+) -> int:
+    """Fingerprint of state after field is set to value, given state's fingerprint."""
+    if field in state:
+        fp ^= field_hash(field, state[field], quantize_bits)
+    return fp ^ field_hash(field, value, quantize_bits)
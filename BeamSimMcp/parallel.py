@@ -0,0 +1,191 @@
+"""
+Process-pool candidate scoring for the numpy engine.
+
+Each step's beam rows and candidate arrays are written once into a
+multiprocessing.shared_memory block; workers attach to it by name, score a
+contiguous slice of candidates, and return only their local top-k. The
+driver merges the slices in candidate order with the same stable top_k, so
+the survivors are bit-identical to serial scoring for any worker count.
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context, shared_memory
+from typing import Any
+
+import numpy as np
+
+from objective import compile_objective
+from vectorized import _ArrayScenario, score_candidates, top_k
+
+# The worker pool shared by every run in this process and its size; it is
+# replaced by a larger one when a run asks for more workers
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+# Runs on different threads may ask for the pool at once
+_pool_lock = threading.Lock()
+
+# Worker-side attachment to the driver's current shared block
+_attached: shared_memory.SharedMemory | None = None
+
+
+def _submit(workers: int, tasks: list[tuple[Any, ...]]) -> list[Future]:
+    """
+    Submit (function, *args) tasks to the shared pool, first growing it to
+    workers processes (at most the CPU count).
+    
+    Submitting under the lock keeps another run from replacing the pool
+    in between; tasks already submitted to a replaced pool still finish.
+    """
+    global _pool, _pool_workers
+    workers = min(workers, os.cpu_count() or 1)
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn rather than fork: the server process runs an event loop
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+            _pool_workers = workers
+        return [_pool.submit(*task) for task in tasks]
+
+
+@atexit.register
+def shutdown_pool() -> None:
+    """Stop the shared pool's processes; the next run to need one starts it again."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        pool, _pool, _pool_workers = _pool, None, 0
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def _layout(n_beam: int, n_fields: int, n_candidates: int) -> list[tuple[str, Any, tuple[int, ...]]]:
+    """(name, dtype, shape) of each array in the shared block, in order."""
+    return [
+        ("rows", np.float64, (n_beam, n_fields)),
+        ("parents", np.intp, (n_candidates,)),
+        ("columns", np.intp, (n_candidates,)),
+        ("new_values", np.float64, (n_candidates,)),
+        ("int_cells", np.bool_, (n_beam, n_fields)),
+        ("new_ints", np.bool_, (n_candidates,)),
+    ]
+
+
+def _views(buffer, layout) -> dict[str, Any]:
+    views, offset = {}, 0
+    for name, dtype, shape in layout:
+        size = int(np.prod(shape))
+        views[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += size * np.dtype(dtype).itemsize
+    return views
+
+
+def _block_size(layout) -> int:
+    return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, dtype, shape in layout)
+
+
+@lru_cache(maxsize=16)
+def _worker_objective(expression: str | None):
+    """Objectives hold compiled closures, so workers recompile them from source."""
+    return compile_objective(expression)
+
+
+def _score_slice(
+    block_name: str,
+    shape: tuple[int, int, int],
+    start: int,
+    stop: int,
+    constraints: list[tuple[int, float, bool, int | float]],
+    objective: str | None,
+    field_columns: dict[str, int],
+    k: int
+) -> tuple[Any, Any]:
+    """Worker task: score candidates [start, stop) and return their local top-k."""
+    global _attached
+    if _attached is None or _attached.name != block_name:
+        if _attached is not None:
+            _attached.close()
+        _attached = shared_memory.SharedMemory(name=block_name)
+    
+    views = _views(_attached.buf, _layout(*shape))
+    scores = score_candidates(
+        views["rows"],
+        views["parents"][start:stop],
+        views["columns"][start:stop],
+        views["new_values"][start:stop],
+        constraints,
+        _worker_objective(objective),
+        field_columns,
+        views["int_cells"],
+        views["new_ints"][start:stop]
+    )
+    order = top_k(scores, k)
+    result = (order + start, scores[order])
+    del views
+    return result
+
+
+class ParallelScorer:
+    """Scores a step's candidates across a process pool and returns the top k."""
+    
+    def __init__(self, workers: int, compiled: _ArrayScenario):
+        self.workers = workers
+        self.constraints = compiled.constraints
+        self.objective = compiled.objective.expression if compiled.objective is not None else None
+        self.field_columns = compiled.columns
+        self._block: shared_memory.SharedMemory | None = None
+    
+    def _buffer(self, size: int):
+        """Shared block of at least size bytes, grown (and renamed) as needed."""
+        if self._block is None or self._block.size < size:
+            self.close()
+            self._block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        return self._block
+    
+    def top_k(self, rows, parents, columns, new_values, int_cells, new_ints, k: int) -> tuple[Any, Any]:
+        """
+        Return (indices, scores) of the k best candidates, best first.
+        
+        Equivalent to scoring every candidate with score_candidates and then
+        calling top_k on the result, including tie order.
+        """
+        n_candidates = len(parents)
+        shape = (rows.shape[0], rows.shape[1], n_candidates)
+        layout = _layout(*shape)
+        block = self._buffer(_block_size(layout))
+        views = _views(block.buf, layout)
+        views["rows"][...] = rows
+        views["parents"][...] = parents
+        views["columns"][...] = columns
+        views["new_values"][...] = new_values
+        views["int_cells"][...] = int_cells
+        views["new_ints"][...] = new_ints
+        del views
+        
+        bounds = np.linspace(0, n_candidates, self.workers + 1).astype(int)
+        futures = _submit(self.workers, [
+            (
+                _score_slice, block.name, shape, int(start), int(stop),
+                self.constraints, self.objective, self.field_columns, k
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ])
+        parts = [future.result() for future in futures]
+        
+        # Slices are in candidate order, so the merged arrays are too and
+        # top_k's lower-index tie rule still means lower candidate index.
+        indices = np.concatenate([part[0] for part in parts])
+        scores = np.concatenate([part[1] for part in parts])
+        order = top_k(scores, k)
+        return indices[order], scores[order]
+    
+    def close(self) -> None:
+        """Release the shared block; the pool stays up for later runs."""
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
@@ -0,0 +1,162 @@
+"""
+SQLite store of run records.
+
+One row per run in a runs table keyed by run_id. The record is split into
+two zlib-compressed JSON sections, the summary and the trace
+(intermediate_states), so metadata reads never decompress a trace. Indexed
+columns hold when the run was first saved, its best score, a hash of its
+scenario and the record's uncompressed size. A trace spooled to a file is
+compressed into the row as it is read, in the same transaction, and the
+file is then deleted, so the database stays the run's only copy.
+
+The database runs in WAL mode, so readers in other connections (inspection
+tools, backups) never block the writer. A connection may only be used by
+the thread that opened it; storage.py makes every call from its storage
+thread.
+"""
+
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+from cache import content_hash
+
+COMPRESSION_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    best_score REAL,
+    scenario_hash TEXT,
+    size INTEGER NOT NULL,
+    summary BLOB NOT NULL,
+    trace BLOB
+);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_best_score ON runs (best_score);
+CREATE INDEX IF NOT EXISTS runs_scenario_hash ON runs (scenario_hash);
+CREATE INDEX IF NOT EXISTS runs_size ON runs (size);
+"""
+
+
+# Bytes of a spooled trace read per chunk while compressing it
+TRACE_CHUNK_BYTES = 1 << 20
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+
+def _pack_trace_file(path: Path) -> tuple[bytes, int]:
+    """
+    Compress a file of JSON trace records, one per line, as the JSON list of
+    those records; return the blob and the list's uncompressed size.
+    """
+    compressor = zlib.compressobj(COMPRESSION_LEVEL)
+    chunks = [compressor.compress(b"[")]
+    size = 2
+    first = True
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\n")
+            if not line:
+                continue
+            if not first:
+                chunks.append(compressor.compress(b","))
+                size += 1
+            chunks.append(compressor.compress(line))
+            size += len(line)
+            first = False
+    chunks.append(compressor.compress(b"]"))
+    chunks.append(compressor.flush())
+    return b"".join(chunks), size
+
+
+class RunDatabase:
+    """
+    Run records in a SQLite database, with the same interface as runlog.RunLog.
+    
+    Not thread-safe; every call must come from the thread that created it.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Durable at every checkpoint; a crash loses at most the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+    
+    def put(self, run_id: str, data: dict[str, Any], trace_path: Path | None = None) -> None:
+        """
+        Store data as the record of run_id, keeping when it was first saved.
+        
+        With trace_path, a file of trace records one per line, that file is
+        the run's trace in place of data's intermediate_states; it is
+        deleted once the row is committed.
+        """
+        summary = dict(data)
+        trace = None
+        trace_size = 0
+        if trace_path is not None:
+            trace, trace_size = _pack_trace_file(trace_path)
+            summary["intermediate_states"] = None
+        elif "intermediate_states" in summary:
+            # Left as a placeholder so the record reads back with its keys in order
+            trace_json = json.dumps(summary["intermediate_states"]).encode()
+            trace, trace_size = zlib.compress(trace_json, COMPRESSION_LEVEL), len(trace_json)
+            summary["intermediate_states"] = None
+        summary_json = json.dumps(summary).encode()
+        best = data.get("best_result")
+        best_score = best.get("score") if isinstance(best, dict) else None
+        try:
+            scenario_hash = content_hash(data["scenario"]) if "scenario" in data else None
+        except (TypeError, ValueError):
+            scenario_hash = None
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO runs (run_id, created_at, updated_at, best_score, scenario_hash, size, summary, trace)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run_id) DO UPDATE SET
+                    updated_at = excluded.updated_at,
+                    best_score = excluded.best_score,
+                    scenario_hash = excluded.scenario_hash,
+                    size = excluded.size,
+                    summary = excluded.summary,
+                    trace = excluded.trace
+                """,
+                (
+                    run_id, now, now,
+                    best_score if isinstance(best_score, (int, float)) else None,
+                    scenario_hash,
+                    len(summary_json) + trace_size,
+                    zlib.compress(summary_json, COMPRESSION_LEVEL),
+                    trace
+                )
+            )
+        if trace_path is not None:
+            trace_path.unlink()
+    
+    def get(self, run_id: str) -> dict[str, Any] | None:
+        """The record of run_id, or None if it has none."""
+        row = self._conn.execute("SELECT summary, trace FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        data = _unpack(row[0])
+        if row[1] is not None:
+            data["intermediate_states"] = _unpack(row[1])
+        return data
+    
+    def run_ids(self) -> list[str]:
+        """Every stored run ID, in the order the runs were first saved."""
+        return [row[0] for row in self._conn.execute("SELECT run_id FROM runs ORDER BY rowid")]
+    
+    def __contains__(self, run_id: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is not None
@@ -0,0 +1,165 @@
+"""
+One JSON file per run record.
+
+Each run is stored as <directory>/ab/cd/<run_id>.json, where ab and cd are
+the first two byte pairs of the SHA-256 of the run ID, so no directory grows
+past a few hundred entries. A save writes the run's file to a temp file in
+the same directory and renames it into place, so readers see the old record
+or the new one, never part of either.
+
+A trace spooled to a file is moved beside the run's file under a name of its
+own, <run_id>.<suffix>.trace.jsonl with one record per line, before the
+run's file is renamed into place. The run's file names its trace, so the
+rename switches record and trace together; the trace it replaces is deleted
+afterwards.
+
+The run IDs are also appended to a manifest when a run is first saved, and
+again whenever its trace file changes, as "<run_id>" or
+"<run_id>\t<trace file>" per line; the last line for a run wins. The line
+is written before the run's file is renamed into place, so a crash in
+between leaves a listed run with no file, which reads as missing, rather
+than a saved run no listing finds. The manifest is read once when the
+store is opened and then kept in memory, so listing runs and finding a
+run's previous trace never walk the directory tree. It is rewritten with
+one line per run once superseded lines outnumber them.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+MANIFEST_NAME = "manifest.txt"
+TRACE_SUFFIX = ".trace.jsonl"
+
+
+class RunFiles:
+    """
+    Run records as one file each in hashed fan-out directories, with the same
+    interface as runlog.RunLog.
+    
+    Not thread-safe; callers serialize access.
+    """
+    
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = directory / MANIFEST_NAME
+        # Run ID -> name of its trace file, if its trace is spooled
+        self._run_ids: dict[str, str | None] = {}
+        self._manifest_lines = 0
+        self._load_manifest()
+        self._manifest = open(self._manifest_path, "a")
+    
+    def _load_manifest(self) -> None:
+        """Read the manifest, cutting off a line left incomplete by a crash."""
+        if not self._manifest_path.exists():
+            return
+        offset = 0
+        with open(self._manifest_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                run_id, _, trace = line.decode().rstrip("\n").partition("\t")
+                self._run_ids[run_id] = trace or None
+                self._manifest_lines += 1
+                offset += len(line)
+        if offset < self._manifest_path.stat().st_size:
+            os.truncate(self._manifest_path, offset)
+    
+    def _record_manifest(self, run_id: str, trace: str | None) -> None:
+        """Append run_id's line to the manifest, rewriting it once mostly superseded."""
+        self._run_ids[run_id] = trace
+        if self._manifest_lines >= 2 * len(self._run_ids):
+            self._manifest.close()
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    for listed, listed_trace in self._run_ids.items():
+                        f.write(f"{listed}\t{listed_trace}\n" if listed_trace else f"{listed}\n")
+                os.replace(tmp_path, self._manifest_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            finally:
+                self._manifest = open(self._manifest_path, "a")
+            self._manifest_lines = len(self._run_ids)
+            return
+        self._manifest.write(f"{run_id}\t{trace}\n" if trace else f"{run_id}\n")
+        self._manifest.flush()
+        self._manifest_lines += 1
+    
+    def _path(self, run_id: str) -> Path:
+        digest = hashlib.sha256(run_id.encode()).hexdigest()
+        return self.directory / digest[:2] / digest[2:4] / f"{run_id}.json"
+    
+    def put(self, run_id: str, data: dict[str, Any], trace_path: Path | None = None) -> None:
+        """
+        Store data as the record of run_id, replacing any earlier one.
+        
+        With trace_path, a file of trace records one per line, that file is
+        moved beside the run's file as its trace in place of data's
+        intermediate_states.
+        """
+        if "\n" in run_id or "\t" in run_id or "/" in run_id or run_id in ("", ".", ".."):
+            raise ValueError(f"Invalid run ID: {run_id}")
+        path = self._path(run_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        trace = None
+        if trace_path is not None:
+            fd, stored_trace = tempfile.mkstemp(dir=path.parent, prefix=f"{run_id}.", suffix=TRACE_SUFFIX)
+            os.close(fd)
+            os.replace(trace_path, stored_trace)
+            trace = os.path.basename(stored_trace)
+            # Left as a placeholder so the record reads back with its keys in order
+            data = {**data, "intermediate_states": None, "trace_file": trace}
+        listed = run_id in self._run_ids
+        previous = self._run_ids.get(run_id)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            # Listed before its file is in place; a run with no file reads as missing
+            if not listed or trace is not None or previous is not None:
+                self._record_manifest(run_id, trace)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if trace is not None:
+                (path.parent / trace).unlink(missing_ok=True)
+            # The earlier record, if any, is still in place along with its trace
+            if listed and self._run_ids[run_id] != previous:
+                self._record_manifest(run_id, previous)
+            raise
+        if previous is not None:
+            (path.parent / previous).unlink(missing_ok=True)
+    
+    def get(self, run_id: str) -> dict[str, Any] | None:
+        """The record of run_id, or None if it has none."""
+        if run_id not in self._run_ids:
+            return None
+        path = self._path(run_id)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        trace = data.pop("trace_file", None)
+        if trace is not None:
+            try:
+                with open(path.parent / trace, "rb") as f:
+                    data["intermediate_states"] = [json.loads(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                data["intermediate_states"] = []
+        return data
+    
+    def run_ids(self) -> list[str]:
+        """Every stored run ID, in the order the runs were first saved."""
+        return list(self._run_ids)
+    
+    def __contains__(self, run_id: str) -> bool:
+        return run_id in self._run_ids
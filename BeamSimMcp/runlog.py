@@ -0,0 +1,238 @@
+"""
+Append-only log of run records.
+
+Records are appended to numbered segment files under one directory, one per
+line as "<run_id>\t<json>\n". Saving a run appends its record; saving it
+again appends a newer one that supersedes the first. An in-memory index maps
+each run ID to the (segment, offset, length) of its latest record, so saves
+and reads touch one record regardless of how many runs are stored.
+
+The index is rebuilt by scanning the segments when the log is opened; only
+run IDs and line boundaries are read, not the JSON. A record is committed by
+the newline that ends it, so a line left incomplete by a crash is cut off
+when the log is next opened.
+
+A trace spooled to a file is kept beside the log as
+traces/<run_id>.jsonl, one record per line, and read back with the run.
+
+Superseded records are reclaimed by compaction: once at least a segment's
+worth of bytes, and half of the log, is dead, the latest record of every
+run is copied into new segments, the index is switched to the copies and
+the old segments are deleted. A crash part way leaves the old segments in
+place, and the copies merely supersede the records they duplicate.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, NamedTuple
+
+# A segment stops receiving records once it reaches this many bytes
+SEGMENT_BYTES = 64 << 20
+
+SEGMENT_SUFFIX = ".log"
+
+TRACE_DIR_NAME = "traces"
+
+# Compact once superseded records make up at least this fraction of the log
+# (and at least segment_bytes)
+COMPACT_DEAD_FRACTION = 0.5
+
+
+class RecordLocation(NamedTuple):
+    """Where the latest record of a run is stored."""
+    segment: int
+    # Byte offset of the record's JSON, and its length without the newline
+    offset: int
+    length: int
+
+
+class RunLog:
+    """
+    Run records in append-only segment files, indexed in memory by run ID.
+    
+    Not thread-safe; callers serialize access.
+    """
+    
+    def __init__(self, directory: Path, segment_bytes: int = SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._index: dict[str, RecordLocation] = {}
+        self._segments: list[int] = []
+        self._segment = 0
+        self._file = None
+        self._size = 0
+        # Bytes in all segments, and in records a later one supersedes
+        self._total_bytes = 0
+        self._dead_bytes = 0
+        self._open()
+        self._maybe_compact()
+    
+    def _trace_path(self, run_id: str) -> Path:
+        return self.directory / TRACE_DIR_NAME / f"{run_id}.jsonl"
+    
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / f"{segment:08d}{SEGMENT_SUFFIX}"
+    
+    def _open(self) -> None:
+        """Rebuild the index from the segments on disk and open the last for appending."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segments = sorted(
+            int(path.stem) for path in self.directory.glob(f"*{SEGMENT_SUFFIX}") if path.stem.isdigit()
+        )
+        for segment in segments:
+            self._scan(segment)
+        self._segment = segments[-1] if segments else 1
+        self._segments = segments or [self._segment]
+        self._file = open(self._segment_path(self._segment), "ab")
+        self._size = self._file.tell()
+    
+    def _scan(self, segment: int) -> None:
+        """Index every complete record of a segment, cutting off an incomplete last line."""
+        path = self._segment_path(segment)
+        offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                run_id, sep, _ = line.partition(b"\t")
+                if sep:
+                    self._supersede(run_id.decode())
+                    start = offset + len(run_id) + 1
+                    self._index[run_id.decode()] = RecordLocation(segment, start, len(line) - len(run_id) - 2)
+                else:
+                    self._dead_bytes += len(line)
+                offset += len(line)
+        if offset < path.stat().st_size:
+            os.truncate(path, offset)
+        self._total_bytes += offset
+    
+    def _supersede(self, run_id: str) -> None:
+        """Count the current record of run_id, if any, as dead."""
+        location = self._index.get(run_id)
+        if location is not None:
+            self._dead_bytes += len(run_id.encode()) + location.length + 2
+    
+    def put(self, run_id: str, data: dict[str, Any], trace_path: Path | None = None) -> None:
+        """
+        Store data as the latest record of run_id.
+        
+        With trace_path, a file of trace records one per line, that file is
+        moved beside the log as the run's trace in place of data's
+        intermediate_states.
+        """
+        if "\t" in run_id or "\n" in run_id or "/" in run_id or run_id in ("", ".", ".."):
+            raise ValueError(f"Invalid run ID: {run_id}")
+        stored_trace = self._trace_path(run_id)
+        if trace_path is not None:
+            stored_trace.parent.mkdir(exist_ok=True)
+            os.replace(trace_path, stored_trace)
+            # Left as a placeholder so the record reads back with its keys in order
+            data = {**data, "intermediate_states": None, "spooled_trace": True}
+        elif run_id in self._index and stored_trace.exists():
+            # Replaced by a record whose trace is inline
+            stored_trace.unlink()
+        if self._size >= self.segment_bytes:
+            self._file.close()
+            self._segment += 1
+            self._segments.append(self._segment)
+            self._file = open(self._segment_path(self._segment), "ab")
+            self._size = 0
+        prefix = run_id.encode() + b"\t"
+        payload = json.dumps(data).encode()
+        try:
+            self._file.write(prefix + payload + b"\n")
+            self._file.flush()
+        except OSError:
+            # Cut off whatever part of the record reached the file
+            self._file.close()
+            os.truncate(self._segment_path(self._segment), self._size)
+            self._file = open(self._segment_path(self._segment), "ab")
+            raise
+        self._supersede(run_id)
+        self._index[run_id] = RecordLocation(self._segment, self._size + len(prefix), len(payload))
+        self._size += len(prefix) + len(payload) + 1
+        self._total_bytes += len(prefix) + len(payload) + 1
+        self._maybe_compact()
+    
+    def _maybe_compact(self) -> None:
+        if self._dead_bytes >= max(self.segment_bytes, self._total_bytes * COMPACT_DEAD_FRACTION):
+            self.compact()
+    
+    def compact(self) -> None:
+        """
+        Copy the latest record of every run into new segments, in the order
+        the runs were first saved, then switch the index to the copies and
+        delete the old segments.
+        """
+        old_segments = self._segments
+        self._file.close()
+        segment = self._segment + 1
+        segments = [segment]
+        out = open(self._segment_path(segment), "wb")
+        size = 0
+        index: dict[str, RecordLocation] = {}
+        sources: dict[int, Any] = {}
+        try:
+            for run_id, location in self._index.items():
+                source = sources.get(location.segment)
+                if source is None:
+                    source = sources[location.segment] = open(self._segment_path(location.segment), "rb")
+                source.seek(location.offset)
+                prefix = run_id.encode() + b"\t"
+                if size >= self.segment_bytes:
+                    out.flush()
+                    os.fsync(out.fileno())
+                    out.close()
+                    segment += 1
+                    segments.append(segment)
+                    out = open(self._segment_path(segment), "wb")
+                    size = 0
+                out.write(prefix + source.read(location.length) + b"\n")
+                index[run_id] = RecordLocation(segment, size + len(prefix), location.length)
+                size += len(prefix) + location.length + 1
+            # The copies must be on disk before the originals are deleted
+            out.flush()
+            os.fsync(out.fileno())
+        except BaseException:
+            out.close()
+            for copy in segments:
+                self._segment_path(copy).unlink(missing_ok=True)
+            self._file = open(self._segment_path(self._segment), "ab")
+            raise
+        finally:
+            for source in sources.values():
+                source.close()
+        
+        self._index = index
+        self._segments = segments
+        self._segment = segment
+        self._file = out
+        self._size = size
+        self._total_bytes = sum(self._segment_path(copy).stat().st_size for copy in segments)
+        self._dead_bytes = 0
+        for old in old_segments:
+            self._segment_path(old).unlink(missing_ok=True)
+    
+    def get(self, run_id: str) -> dict[str, Any] | None:
+        """The latest record of run_id, or None if it has none."""
+        location = self._index.get(run_id)
+        if location is None:
+            return None
+        with open(self._segment_path(location.segment), "rb") as f:
+            f.seek(location.offset)
+            data = json.loads(f.read(location.length))
+        if data.pop("spooled_trace", False):
+            try:
+                with open(self._trace_path(run_id), "rb") as f:
+                    data["intermediate_states"] = [json.loads(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                data["intermediate_states"] = []
+        return data
+    
+    def run_ids(self) -> list[str]:
+        """Every stored run ID, in the order the runs were first saved."""
+        return list(self._index)
+    
+    def __contains__(self, run_id: str) -> bool:
+        return run_id in self._index
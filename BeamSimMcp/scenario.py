@@ -0,0 +1,223 @@
+"""
+Scenario compilation.
+
+A scenario ({"initial_state": ..., "actions": [...], "objective": ...}) is
+compiled once into a CompiledScenario: its field schema (numeric vs. opaque
+fields, in state order, with interned indices), its objective, and an action
+table of (op, field index, field, operand) rows. The engines read the table
+instead of re-inspecting action dicts and value types for every candidate.
+
+Compiled scenarios are immutable and cached by a hash of the scenario's
+JSON encoding, keeping key order, so repeated runs of the same scenario
+skip compilation.
+"""
+
+import copy
+import random
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+from cache import ordered_hash
+from objective import Objective, compile_objective
+
+# Action table operations
+OP_NOOP = 0
+OP_INCREMENT = 1
+OP_DECREMENT = 2
+OP_SET = 3
+
+# Compiled scenarios kept in memory, least recently used evicted first
+COMPILED_CACHE_SIZE = 128
+
+_compiled: OrderedDict[str, "CompiledScenario"] = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+class ActionEntry(NamedTuple):
+    """One predefined action lowered to the operation it performs."""
+    op: int
+    # Index of the field in the schema, -1 for a no-op or a field not in it
+    field_index: int
+    field: Any
+    # Delta for increment/decrement, assigned value for set
+    operand: Any
+
+
+@dataclass(frozen=True)
+class CompiledScenario:
+    """
+    A scenario with its schema, objective and actions resolved once.
+    
+    fixed_schema is True when no action can add a field or change whether a
+    field is numeric: every increment/decrement on a numeric field has a
+    numeric delta and every set writes a number to a numeric field. Every
+    state of such a scenario then has the initial state's fields and types,
+    so the action table alone decides each action's effect. Otherwise the
+    engines fall back to inspecting each state.
+    """
+    key: str | None
+    scenario: dict[str, Any]
+    initial_state: dict[str, Any]
+    # Names of numeric and opaque fields, in state order
+    numeric_fields: tuple[Any, ...]
+    opaque_fields: tuple[Any, ...]
+    # Every initial field -> its index in state order
+    field_index: dict[Any, int]
+    objective: Objective | None
+    # Predefined actions and their table rows; None when generated per state
+    actions: tuple[dict[str, Any], ...] | None
+    action_table: tuple[ActionEntry, ...] | None
+    fixed_schema: bool
+    
+    def actions_for(self, rng: random.Random) -> Sequence[dict[str, Any]]:
+        """
+        Actions to expand one state with, in candidate order.
+        
+        Predefined actions are returned as the shared tuple, not copied.
+        Otherwise an increment and a decrement are generated for every
+        numeric field, drawing one delta per field from rng; generated
+        actions never change a field's type, so every state has the
+        initial state's numeric fields.
+        """
+        if self.actions is not None:
+            return self.actions
+        actions = []
+        for key in self.numeric_fields:
+            delta = rng.uniform(0.5, 2.0)
+            actions.append({"type": "increment", "field": key, "delta": delta})
+            actions.append({"type": "decrement", "field": key, "delta": delta})
+        return actions
+    
+    def effect(
+        self,
+        values: dict[str, Any],
+        action_index: int,
+        action: dict[str, Any]
+    ) -> tuple[Any, Any] | None:
+        """
+        The (field, new value) action action_index writes into values, or None for a no-op.
+        
+        Only valid for fixed-schema scenarios, where no type check is needed.
+        """
+        if self.action_table is None:
+            # Generated actions alternate increment/decrement per numeric field
+            field = action["field"]
+            if action_index % 2 == 0:
+                return field, values[field] + action["delta"]
+            return field, values[field] - action["delta"]
+        op, _, field, operand = self.action_table[action_index]
+        if op == OP_INCREMENT:
+            return field, values[field] + operand
+        if op == OP_DECREMENT:
+            return field, values[field] - operand
+        if op == OP_SET:
+            return field, operand
+        return None
+
+
+def _lower_action(
+    action: dict[str, Any],
+    field_index: dict[Any, int],
+    numeric: set[Any]
+) -> tuple[ActionEntry, bool]:
+    """Table row for an action, and whether it keeps the schema fixed."""
+    action_type = action.get("type", "")
+    field = action.get("field", "")
+    try:
+        index = field_index.get(field, -1)
+    except TypeError:
+        # Unhashable field; left to the reference path
+        return ActionEntry(OP_NOOP, -1, field, None), False
+    
+    if action_type in ("increment", "decrement"):
+        if field not in numeric:
+            # A missing or opaque field stays that way, so this is always a no-op
+            return ActionEntry(OP_NOOP, index, field, None), True
+        delta = action.get("delta", 1)
+        op = OP_INCREMENT if action_type == "increment" else OP_DECREMENT
+        return ActionEntry(op, index, field, delta), _is_number(delta)
+    if action_type == "set" and field:
+        value = action.get("value", 0)
+        return ActionEntry(OP_SET, index, field, value), field in numeric and _is_number(value)
+    return ActionEntry(OP_NOOP, index, field, None), True
+
+
+def _compile(scenario: dict[str, Any], key: str | None) -> CompiledScenario:
+    initial_state = scenario.get("initial_state")
+    if not isinstance(initial_state, dict):
+        raise ValueError("Scenario 'initial_state' must be an object")
+    
+    numeric_fields = tuple(name for name, value in initial_state.items() if _is_number(value))
+    opaque_fields = tuple(name for name, value in initial_state.items() if not _is_number(value))
+    field_index = {name: i for i, name in enumerate(initial_state)}
+    objective = compile_objective(scenario.get("objective"))
+    
+    actions = action_table = None
+    fixed_schema = True
+    if "actions" in scenario:
+        if not isinstance(scenario["actions"], list) or not all(
+            isinstance(action, dict) for action in scenario["actions"]
+        ):
+            raise ValueError("Scenario 'actions' must be a list of objects")
+        actions = tuple(scenario["actions"])
+        numeric = set(numeric_fields)
+        rows = []
+        for action in actions:
+            row, fixed = _lower_action(action, field_index, numeric)
+            rows.append(row)
+            fixed_schema = fixed_schema and fixed
+        action_table = tuple(rows)
+    
+    return CompiledScenario(
+        key=key,
+        scenario=scenario,
+        initial_state=initial_state,
+        numeric_fields=numeric_fields,
+        opaque_fields=opaque_fields,
+        field_index=field_index,
+        objective=objective,
+        actions=actions,
+        action_table=action_table,
+        fixed_schema=fixed_schema
+    )
+
+
+def compile_scenario(scenario: dict[str, Any]) -> CompiledScenario:
+    """
+    Compile a scenario, or return the cached compilation of an equal one.
+    
+    Equal means equal including dict key order, since the order of
+    initial_state decides the compiled field order.
+    
+    The cached object is built from a private copy, so later changes to the
+    caller's dict cannot leak into it. Scenarios that are not JSON
+    serializable are compiled without caching.
+    
+    Raises:
+        ValueError: If initial_state is not an object, actions is not a list
+            of objects, or the objective is invalid
+    """
+    try:
+        key = ordered_hash(scenario)
+    except (TypeError, ValueError):
+        return _compile(scenario, None)
+    
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+    
+    compiled = _compile(copy.deepcopy(scenario), key)
+    with _compiled_lock:
+        _compiled[key] = compiled
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
@@ -0,0 +1,238 @@
+"""
+Scoring plugins.
+
+A scorer ranks a whole step of candidates in one call:
+
+    score_batch(states, field_names, constraints) -> (scores, breakdowns)
+
+states is a (candidates x fields) float64 array whose columns are named by
+field_names, constraints is the run's CompiledConstraints, scores is a
+(candidates,) array of finite values and breakdowns maps each score
+component to a (candidates,) array of that component. Third-party scorers
+register under the "beam_sim.scorers" entry point group and are selected by
+name; the built-in "default" scorer (value sum or scenario objective, plus
+constraint penalties) is the reference implementation.
+"""
+
+import sys
+from abc import ABC, abstractmethod
+from importlib.metadata import entry_points
+from typing import Any
+
+from constraints import CompiledConstraints, compile_constraints
+from objective import Objective
+
+ENTRY_POINT_GROUP = "beam_sim.scorers"
+DEFAULT_SCORER = "default"
+
+# sum() of floats uses Neumaier compensated summation from Python 3.12
+COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+
+class ScoringPlugin(ABC):
+    """Base class for scorers; subclasses must implement score_batch."""
+    name = ""
+    
+    @abstractmethod
+    def score_batch(
+        self,
+        states: Any,
+        field_names: list[str],
+        constraints: CompiledConstraints
+    ) -> tuple[Any, dict[str, Any]]:
+        """Score every row of states; return (scores, per-component breakdowns)."""
+    
+    def score_state(
+        self,
+        state: dict[str, Any],
+        constraints: CompiledConstraints,
+        field_names: list[str] | None = None
+    ) -> dict[str, float]:
+        """
+        Score breakdown of a single state, used for explain and the initial beam.
+        
+        The default implementation calls score_batch on a one-row array over
+        field_names (the state's numeric fields if not given).
+        """
+        import numpy as np
+        
+        field_names = field_names if field_names is not None else numeric_fields(state)
+        row = [float(state[key]) if _is_number(state.get(key)) else np.nan for key in field_names]
+        states = np.array([row], dtype=np.float64).reshape(1, len(field_names))
+        _, breakdowns = self.score_batch(states, field_names, constraints)
+        return {component: float(np.asarray(values)[0]) for component, values in breakdowns.items()}
+
+
+class DefaultScorer(ScoringPlugin):
+    """
+    Reference scorer: value sum (or the scenario objective) plus penalties.
+    
+    The engines reproduce this scorer with specialized fast paths (lazy
+    candidate scoring, incremental deltas, the score cache, parallel
+    workers); score_batch is the plain array form of the same computation.
+    """
+    name = DEFAULT_SCORER
+    
+    def __init__(self, objective: Objective | None = None):
+        self.objective = objective
+    
+    def score_batch(
+        self,
+        states: Any,
+        field_names: list[str],
+        constraints: CompiledConstraints
+    ) -> tuple[Any, dict[str, Any]]:
+        import numpy as np
+        
+        columns = {key: i for i, key in enumerate(field_names)}
+        n = len(states)
+        
+        if self.objective is not None:
+            value_name = "objective"
+            values = self.objective.evaluate_columns(
+                lambda key: states[:, columns[key]] if key in columns else 0.0, n
+            )
+        else:
+            # Every cell of a float array counts as a float value
+            value_name = "value_sum"
+            values = value_sums(((states[:, index], None) for index in range(len(field_names))), n)
+        
+        penalty = np.zeros(n)
+        for bound in constraints.bounds:
+            if bound.field not in columns:
+                continue
+            actual = states[:, columns[bound.field]]
+            if bound.is_max:
+                violated = actual > bound.limit
+                excess = (actual - bound.limit) * bound.weight
+            else:
+                violated = actual < bound.limit
+                excess = (bound.limit - actual) * bound.weight
+            np.subtract(penalty, excess, out=penalty, where=violated)
+        
+        return values + penalty, {value_name: values, "constraint_penalty": penalty}
+    
+    def score_state(
+        self,
+        state: dict[str, Any],
+        constraints: dict[str, Any] | CompiledConstraints,
+        field_names: list[str] | None = None
+    ) -> dict[str, float]:
+        """Exact breakdown on Python numbers, without numpy."""
+        if not isinstance(constraints, CompiledConstraints):
+            constraints = compile_constraints(constraints)
+        
+        breakdown = {}
+        
+        if self.objective is not None:
+            breakdown["objective"] = self.objective.evaluate(state)
+        else:
+            # Score based on numeric values in state
+            value_score = sum(v for v in state.values() if isinstance(v, (int, float)))
+            breakdown["value_sum"] = value_score
+        
+        # Apply constraint penalties
+        breakdown["constraint_penalty"] = constraints.penalty(state)
+        
+        return breakdown
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+def value_sums(columns: Any, n: int):
+    """
+    sum() of each of n states' numeric values, on arrays.
+    
+    columns yields (values, is_int) per numeric field in state order:
+    float64 values and whether each was a Python int (None if none were).
+    Up to Python 3.11 sum() adds left to right, which float64 addition
+    reproduces for exactly representable values. From 3.12 it keeps an
+    exact total while the values are ints, then a float total plus a
+    Neumaier compensation term that only float values update, added at the
+    end when non-zero and finite. Both are reproduced bit for bit.
+    """
+    import numpy as np
+    
+    total = np.zeros(n)
+    if not COMPENSATED_SUM:
+        for values, _ in columns:
+            total += values
+        return total
+    
+    compensation = np.zeros(n)
+    in_float = np.zeros(n, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for values, is_int in columns:
+            is_float = np.ones(n, dtype=bool) if is_int is None else ~is_int
+            step = total + values
+            update = is_float & in_float
+            if update.any():
+                error = np.where(
+                    np.abs(total) >= np.abs(values), (total - step) + values, (values - step) + total
+                )
+                compensation[update] += error[update]
+            total = step
+            in_float |= is_float
+    done = in_float & (compensation != 0) & np.isfinite(compensation)
+    total[done] += compensation[done]
+    return total
+
+
+def numeric_fields(state: dict[str, Any]) -> list[str]:
+    """Names of a state's numeric fields, in state order."""
+    return [key for key, value in state.items() if _is_number(value)]
+
+
+def available_scorers() -> list[str]:
+    """Names of the built-in scorer and every installed plugin."""
+    names = [DEFAULT_SCORER]
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        if entry_point.name not in names:
+            names.append(entry_point.name)
+    return names
+
+
+def load_scorer(name: str) -> ScoringPlugin:
+    """
+    Return the scorer registered under name.
+    
+    An entry point may name a ScoringPlugin subclass or instance, or any
+    object with a score_batch method.
+    
+    Raises:
+        ValueError: If no scorer has that name, it does not provide
+            score_batch, or it is a ScoringPlugin subclass that leaves
+            score_batch abstract
+    """
+    if name == DEFAULT_SCORER:
+        return DefaultScorer()
+    
+    matches = [ep for ep in entry_points(group=ENTRY_POINT_GROUP) if ep.name == name]
+    if not matches:
+        raise ValueError(f"scorer must be one of {', '.join(available_scorers())}")
+    
+    plugin = matches[0].load()
+    if isinstance(plugin, type):
+        if issubclass(plugin, ScoringPlugin) and plugin.__abstractmethods__:
+            missing = ", ".join(sorted(plugin.__abstractmethods__))
+            raise ValueError(f"Scorer '{name}' does not implement {missing}")
+        plugin = plugin()
+    if not callable(getattr(plugin, "score_batch", None)):
+        raise ValueError(f"Scorer '{name}' does not provide score_batch")
+    if not isinstance(plugin, ScoringPlugin):
+        # Duck-typed plugin: borrow the one-row score_state
+        plugin = _Adapter(plugin)
+    return plugin
+
+
+class _Adapter(ScoringPlugin):
+    """Wraps a duck-typed plugin object."""
+    
+    def __init__(self, plugin: Any):
+        self.plugin = plugin
+        self.name = getattr(plugin, "name", "")
+    
+    def score_batch(self, states, field_names, constraints):
+        return self.plugin.score_batch(states, field_names, constraints)
@@ -2,15 +2,23 @@
 Beam Simulation MCP Server
 
 A minimal MCP server for running deterministic beam search simulations.
-Exposes tools for running simulations and explaining results.
+Exposes tools for running, continuing and explaining simulations.
 """
 
 import asyncio
+import inspect
 import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
 from dataclasses import asdict
 from typing import Any
 
+import anyio
 from mcp.server import Server
+from mcp.server.session import ServerSession
 from mcp.server.stdio import stdio_server
 from mcp.types import (
     Resource,
@@ -18,21 +26,95 @@ from mcp.types import (
     Tool,
 )
 
-from simulation import BeamSimulator, SimulationResult
-from storage import generate_run_id, get_simulation, save_simulation
+from cache import ResultCache, ScoreCache
+from simulation import (
+    DEFAULT_TRACE_EVERY,
+    ENGINES,
+    MAX_WORKERS,
+    SCORING_MODES,
+    TRACE_LEVELS,
+    BeamSimulator,
+    Checkpoint,
+    Prefix,
+    SimulationResult,
+    StepProgress,
+    TraceDigest,
+    check_replay,
+    splice_trace,
+)
+from stopping import CancellationToken, StoppingRules
+from storage import (
+    TraceSpool,
+    generate_run_id,
+    get_checkpoint,
+    get_prefix,
+    get_result_run,
+    get_simulation,
+    load_score_cache,
+    save_checkpoint,
+    save_prefix,
+    save_result_key,
+    save_score_cache,
+    save_simulation,
+)
 
 # Create the MCP server instance
 server = Server("beam-sim-mcp")
 
+# Score cache shared by every run that opts in; loaded from disk on first use
+_score_cache: ScoreCache | None = None
+
+# Responses of recent runs, by request hash; backed by the stored runs
+_result_cache = ResultCache()
+
+# Simulations run on worker threads, at most this many at a time
+MAX_CONCURRENT_RUNS = os.cpu_count() or 1
+_run_slots = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
+
+# Minimum seconds between progress notifications for one run
+PROGRESS_INTERVAL = 0.25
+
+# Recently used search prefixes, by search key. A spooled prefix's trace
+# stays on disk (storage.StoredTrace); only its RNG states are held here
+PREFIX_CACHE_SIZE = 32
+_prefixes: OrderedDict[str, Prefix] = OrderedDict()
+
+# How a run's trace is persisted: stored as recorded, or regenerated on demand
+PERSISTENCE_MODES = ("full", "replayable")
+
+# Traces of replayable runs regenerated recently, by run ID, with their digest
+REPLAY_CACHE_SIZE = 8
+_replayed: OrderedDict[str, tuple[str, list[Any]]] = OrderedDict()
+
+
+async def _get_score_cache() -> ScoreCache:
+    """Return the shared score cache, loading it from disk the first time."""
+    global _score_cache
+    if _score_cache is None:
+        _score_cache = ScoreCache()
+        await load_score_cache(_score_cache)
+    return _score_cache
+
 
 # --- Tool Definitions ---
 
+# Default search budget, kept under the registry's 30s simulate_run timeout
+# so a truncated result is returned and persisted before the client gives up
+DEFAULT_DEADLINE_MS = 25_000
+
+# Budget for regenerating a replayable run's trace for simulate_explain,
+# kept under the registry's 5s timeout for that tool
+EXPLAIN_REPLAY_DEADLINE_MS = 4_000
+
+# Most steps one simulate_continue call may add, as in the tool's schema
+MAX_ADDITIONAL_STEPS = 100
+
 SIMULATE_RUN_SCHEMA = {
     "type": "object",
     "properties": {
         "scenario": {
             "type": "object",
-            "description": "Simulation scenario with 'initial_state' dict and optional 'actions' array",
+            "description": "Simulation scenario with 'initial_state' dict, optional 'actions' array and optional 'objective' expression",
             "properties": {
                 "initial_state": {
                     "type": "object",
@@ -42,13 +124,17 @@ SIMULATE_RUN_SCHEMA = {
                     "type": "array",
                     "description": "Optional predefined actions",
                     "items": {"type": "object"}
+                },
+                "objective": {
+                    "type": "string",
+                    "description": "Optional expression over fields that replaces the value sum, e.g. '2 * x - abs(y)'; supports + - *, division by a number, abs, min, max"
                 }
             },
             "required": ["initial_state"]
         },
         "constraints": {
             "type": "object",
-            "description": "Optional constraints like max_x, min_y for scoring penalties"
+            "description": "Optional numeric bounds keyed max_<field> or min_<field> for scoring penalties"
         },
         "beamWidth": {
             "type": "integer",
@@ -63,11 +149,125 @@ SIMULATE_RUN_SCHEMA = {
         "seed": {
             "type": "integer",
             "description": "Random seed for deterministic results"
+        },
+        "engine": {
+            "type": "string",
+            "enum": list(ENGINES),
+            "description": "Expansion engine; all engines return identical results (default: auto, numpy when installed)",
+            "default": "auto"
+        },
+        "scoring": {
+            "type": "string",
+            "enum": list(SCORING_MODES),
+            "description": "full re-scores every candidate; incremental scores the one changed field in O(1) and can only differ on rounding-level ties (default: full)",
+            "default": "full"
+        },
+        "dedup": {
+            "type": "boolean",
+            "description": "Collapse candidates that reach the same state within a step (default: false)",
+            "default": False
+        },
+        "scoreCache": {
+            "type": "boolean",
+            "description": "Reuse state scores cached by earlier runs and persist new ones; ignored with incremental scoring (default: false)",
+            "default": False
+        },
+        "scorer": {
+            "type": "string",
+            "description": "Scoring plugin name; 'default' or one registered under the beam_sim.scorers entry point group (default: default)",
+            "default": "default"
+        },
+        "plateauSteps": {
+            "type": "integer",
+            "description": "Stop once the best score has not improved for this many consecutive steps"
+        },
+        "minImprovement": {
+            "type": "number",
+            "description": "Stop after a step that improves the best score by less than this fraction"
+        },
+        "goalScore": {
+            "type": "number",
+            "description": "Stop as soon as the best score reaches this value"
+        },
+        "stopWhenStable": {
+            "type": "boolean",
+            "description": "Stop when a step leaves the beam's set of states unchanged (default: false)",
+            "default": False
+        },
+        "deadlineMs": {
+            "type": "integer",
+            "description": f"Wall-clock budget for the search; when it runs out the best beam so far is returned with termination.truncated set (default: {DEFAULT_DEADLINE_MS})",
+            "default": DEFAULT_DEADLINE_MS
+        },
+        "workers": {
+            "type": "integer",
+            "description": f"Worker processes for scoring large steps with the numpy engine, at most the server's CPU count ({MAX_WORKERS}); results are identical for any count (default: 1)",
+            "default": 1,
+            "minimum": 1,
+            "maximum": MAX_WORKERS
+        },
+        "checkpointEvery": {
+            "type": "integer",
+            "description": "Also checkpoint the run after every this many steps, so it can be continued if it never finishes; the final beam is always checkpointed"
+        },
+        "reusePrefix": {
+            "type": "boolean",
+            "description": "Take the steps an earlier run of the same search already computed from storage instead of searching them again; results are identical (default: true)",
+            "default": True
+        },
+        "trace": {
+            "type": "string",
+            "enum": list(TRACE_LEVELS),
+            "description": "How much of each step's beam to keep in the stored trace: 'full' (default) every state with its history, 'delta' only what changed from each state's parent, 'sampled' full beams every traceEvery steps, 'scores' scores only, 'none' nothing",
+            "default": "full"
+        },
+        "traceEvery": {
+            "type": "integer",
+            "description": f"Steps between recorded beams with trace 'sampled' (default: {DEFAULT_TRACE_EVERY})",
+            "default": DEFAULT_TRACE_EVERY
+        },
+        "resultCache": {
+            "type": "boolean",
+            "description": "Return the stored result of an identical earlier request (same scenario, constraints, beamWidth, maxSteps, seed, scoring, dedup, scorer and stopping rules) instead of running again (default: true)",
+            "default": True
+        },
+        "persistence": {
+            "type": "string",
+            "enum": list(PERSISTENCE_MODES),
+            "description": "'full' (default) stores the trace; 'replayable' stores only the run's settings and a digest of its trace, and re-runs the search to regenerate the trace when it is read. A run cut short by its deadline is replayed up to the step it reached",
+            "default": "full"
         }
     },
     "required": ["scenario"]
 }
 
+SIMULATE_CONTINUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "runId": {
+            "type": "string",
+            "description": "ID of a previous simulation run to extend from its last checkpoint"
+        },
+        "additionalSteps": {
+            "type": "integer",
+            "description": "Steps to run beyond the checkpoint; the result equals a single run that many steps longer (default: 10)",
+            "default": 10,
+            "minimum": 1,
+            "maximum": MAX_ADDITIONAL_STEPS
+        },
+        "deadlineMs": {
+            "type": "integer",
+            "description": f"Wall-clock budget for the continuation (default: {DEFAULT_DEADLINE_MS})",
+            "default": DEFAULT_DEADLINE_MS
+        },
+        "checkpointEvery": {
+            "type": "integer",
+            "description": "Also checkpoint after every this many steps"
+        }
+    },
+    "required": ["runId"]
+}
+
 SIMULATE_EXPLAIN_SCHEMA = {
     "type": "object",
     "properties": {
@@ -89,6 +289,11 @@ async def list_tools() -> list[Tool]:
             description="Run a deterministic beam search simulation over a scenario",
             inputSchema=SIMULATE_RUN_SCHEMA
         ),
+        Tool(
+            name="simulate_continue",
+            description="Extend a previous simulation run by more steps from its checkpoint",
+            inputSchema=SIMULATE_CONTINUE_SCHEMA
+        ),
         Tool(
             name="simulate_explain",
             description="Get a human-readable explanation of a simulation run",
@@ -103,12 +308,315 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
     
     if name == "simulate_run":
         return await _handle_simulate_run(arguments)
+    elif name == "simulate_continue":
+        return await _handle_simulate_continue(arguments)
     elif name == "simulate_explain":
         return await _handle_simulate_explain(arguments)
     else:
         raise ValueError(f"Unknown tool: {name}")
 
 
+# Whether this SDK's send_progress_notification takes a message (added after 1.0)
+_PROGRESS_MESSAGE = "message" in inspect.signature(ServerSession.send_progress_notification).parameters
+
+
+class _ProgressReporter:
+    """
+    BeamSimulator progress callback that forwards steps to the client.
+    
+    Called on the simulation thread, it hands notifications to the event
+    loop, at most one per PROGRESS_INTERVAL plus the last step. finish()
+    then sends a final notification at the step the run ended on, so a run
+    stopped early still reports completion.
+    """
+    
+    def __init__(self, session: ServerSession, token: str | int, loop: asyncio.AbstractEventLoop):
+        self.session = session
+        self.token = token
+        self.loop = loop
+        self._last_sent = float("-inf")
+        self._complete = False
+    
+    def _notification(self, step: int, total: int, details: dict[str, Any]):
+        if _PROGRESS_MESSAGE:
+            return self.session.send_progress_notification(self.token, step, total, json.dumps(details))
+        return self.session.send_progress_notification(self.token, step, total)
+    
+    def __call__(self, update: StepProgress) -> None:
+        now = time.monotonic()
+        if now - self._last_sent < PROGRESS_INTERVAL and update.step < update.max_steps:
+            return
+        self._last_sent = now
+        self._complete = update.step >= update.max_steps
+        asyncio.run_coroutine_threadsafe(
+            self._notification(update.step, update.max_steps, {
+                "step": update.step,
+                "bestScore": update.best_score,
+                "beamSize": update.beam_size,
+                "candidatesEvaluated": update.candidates_evaluated,
+                "elapsedMs": round(update.elapsed_ms, 1)
+            }),
+            self.loop
+        )
+    
+    async def finish(self, result: SimulationResult) -> None:
+        """Report completion at the run's final step unless the last notification already did."""
+        if self._complete:
+            return
+        step = result.termination.get("step", 0)
+        await self._notification(step, step, {
+            "step": step,
+            "bestScore": result.best_result.get("score"),
+            "reason": result.termination.get("reason")
+        })
+
+
+def _progress_reporter(loop: asyncio.AbstractEventLoop) -> _ProgressReporter | None:
+    """The progress reporter for the current request, or None if it carries no progress token."""
+    try:
+        context = server.request_context
+    except LookupError:
+        return None
+    token = context.meta.progressToken if context.meta is not None else None
+    if token is None:
+        return None
+    return _ProgressReporter(context.session, token, loop)
+
+
+def _checkpoint_saver(loop: asyncio.AbstractEventLoop) -> Callable[[Checkpoint], None]:
+    """Build a BeamSimulator on_checkpoint callback that persists from the event loop."""
+    
+    def save(checkpoint: Checkpoint) -> None:
+        asyncio.run_coroutine_threadsafe(
+            save_checkpoint(checkpoint.run_id, checkpoint.to_json()),
+            loop
+        )
+    
+    return save
+
+
+async def _run_in_slot(
+    run: Callable[[CancellationToken, Callable[[StepProgress], None] | None], SimulationResult]
+) -> SimulationResult:
+    """
+    Call run(cancellation, progress) on a worker thread once a run slot is free.
+    
+    If the request is cancelled, the run is stopped at its next safe point
+    and CancelledError propagates once its thread has finished. Otherwise
+    the client is sent a final progress notification when the run ends.
+    """
+    async with _run_slots:
+        cancellation = CancellationToken()
+        progress = _progress_reporter(asyncio.get_running_loop())
+        worker = asyncio.ensure_future(asyncio.to_thread(run, cancellation, progress))
+        try:
+            result = await asyncio.shield(worker)
+        except asyncio.CancelledError:
+            # The client cancelled the request: stop the search at its next
+            # safe point, keep the slot until the thread has let go of the
+            # CPU, and skip persisting a result nobody will read.
+            cancellation.cancel()
+            with anyio.CancelScope(shield=True):
+                await asyncio.wait([worker])
+            raise
+        if progress is not None:
+            await progress.finish(result)
+        return result
+
+
+async def _save_result(
+    result: SimulationResult,
+    request_key: str | None = None,
+    spool: TraceSpool | None = None,
+    replay: dict[str, Any] | None = None
+) -> None:
+    """
+    Persist a finished run and its checkpoint.
+    
+    With request_key, the run is also recorded as the answer to that
+    request; a run saved without one no longer answers any request. With
+    spool, the run's trace is the one spooled during the run. With replay
+    ({"settings", "trace_digest"}), no trace is stored at all.
+    """
+    record = {
+        "run_id": result.run_id,
+        "best_result": result.best_result,
+        "top_k": result.top_k,
+        "score_breakdown": result.score_breakdown,
+        "intermediate_states": result.intermediate_states,
+        "scenario": result.scenario,
+        "constraints": result.constraints,
+        "stats": result.stats,
+        "termination": result.termination,
+        "trace": result.trace
+    }
+    if request_key is not None:
+        record["request_key"] = request_key
+    if replay is not None:
+        del record["intermediate_states"]
+        record["replay"] = replay
+        spool = None
+    _result_cache.discard_run(result.run_id)
+    _replayed.pop(result.run_id, None)
+    await save_simulation(result.run_id, record, spool)
+    if result.checkpoint is not None:
+        await save_checkpoint(result.run_id, result.checkpoint.to_json())
+    if request_key is not None:
+        await save_result_key(request_key, result.run_id)
+        _result_cache.put(request_key, result.run_id, _response(record))
+
+
+def _response(record: dict[str, Any]) -> dict[str, Any]:
+    """Tool response fields for a stored run record."""
+    response = {
+        "runId": record["run_id"],
+        "bestResult": record["best_result"],
+        "topK": record["top_k"],
+        "scoreBreakdown": record["score_breakdown"],
+        "termination": record["termination"]
+    }
+    if record.get("stats"):
+        response["stats"] = record["stats"]
+    return response
+
+
+def _run_response(result: SimulationResult) -> list[TextContent]:
+    """Structured tool response for a finished run."""
+    response = _response({
+        "run_id": result.run_id,
+        "best_result": result.best_result,
+        "top_k": result.top_k,
+        "score_breakdown": result.score_breakdown,
+        "termination": result.termination,
+        "stats": result.stats
+    })
+    return [TextContent(type="text", text=json.dumps(response, indent=2))]
+
+
+async def _cached_response(key: str) -> list[TextContent] | None:
+    """The stored response to an identical earlier request, if any."""
+    response = _result_cache.get(key)
+    if response is None:
+        run_id = await get_result_run(key)
+        data = await get_simulation(run_id) if run_id is not None else None
+        # The run may since have been overwritten by another request or continued
+        if data is not None and data.get("request_key") == key:
+            response = _response(data)
+            _result_cache.put(key, run_id, response)
+    _result_cache.record(response is not None)
+    if response is None:
+        return None
+    return [TextContent(type="text", text=json.dumps({**response, "cached": True}, indent=2))]
+
+
+async def _load_prefix(
+    simulator: BeamSimulator,
+    scenario: dict[str, Any],
+    constraints: dict[str, Any]
+) -> Prefix | None:
+    """The longest stored search with this run's search key, if any."""
+    key = simulator.search_key(scenario, constraints)
+    prefix = _prefixes.get(key)
+    if prefix is None:
+        data = await get_prefix(key)
+        if not data:
+            return None
+        try:
+            prefix = Prefix.from_json(data)
+        except ValueError:
+            # Written by an older version; the next run replaces it
+            return None
+        _remember_prefix(prefix)
+    else:
+        _prefixes.move_to_end(key)
+    if prefix.scenario != scenario or prefix.constraints != (constraints or {}):
+        return None
+    return prefix
+
+
+def _remember_prefix(prefix: Prefix) -> None:
+    _prefixes[prefix.key] = prefix
+    _prefixes.move_to_end(prefix.key)
+    while len(_prefixes) > PREFIX_CACHE_SIZE:
+        _prefixes.popitem(last=False)
+
+
+async def _save_prefix(
+    result: SimulationResult,
+    stored: Prefix | None,
+    spool: TraceSpool | None = None
+) -> None:
+    """
+    Store the run's search if it goes further than the stored one.
+    
+    stored is the prefix the run was offered, if any; when there is none
+    (reuse was disabled, say), the stored prefix's length is read from disk.
+    A search whose trace was spooled is stored with the spooled trace and
+    read back from disk when next reused, rather than kept in memory.
+    """
+    if result.prefix is None:
+        return
+    if stored is not None:
+        stored_steps = stored.steps
+    else:
+        data = await get_prefix(result.prefix.key, with_trace=False)
+        rng_states = data.get("rng_states") if isinstance(data, dict) else None
+        stored_steps = len(rng_states) - 1 if isinstance(rng_states, list) else 0
+    if result.prefix.steps > stored_steps:
+        if result.prefix.trace is None:
+            _prefixes.pop(result.prefix.key, None)
+        else:
+            _remember_prefix(result.prefix)
+        await save_prefix(result.prefix.key, result.prefix.to_json(), spool)
+
+
+async def _with_trace(data: dict[str, Any], deadline_ms: int = DEFAULT_DEADLINE_MS) -> dict[str, Any]:
+    """
+    A stored run with its intermediate_states, regenerating them if the run
+    was persisted as replayable.
+    
+    The replay uses the workers the run was recorded with and must finish
+    within deadline_ms.
+    
+    Raises:
+        ValueError: If the run cannot be replayed by this engine version,
+            the replay runs out of time or it does not match the stored result
+    """
+    replay = data.get("replay")
+    if replay is None or "intermediate_states" in data:
+        return data
+    if replay["settings"]["trace"] == "none":
+        return {**data, "intermediate_states": []}
+    run_id = data["run_id"]
+    cached = _replayed.get(run_id)
+    if cached is not None and cached[0] == replay["trace_digest"]:
+        _replayed.move_to_end(run_id)
+        return {**data, "intermediate_states": cached[1]}
+    
+    simulator = BeamSimulator.from_replay(replay["settings"], deadline_ms=deadline_ms)
+    prefix = await _load_prefix(simulator, data["scenario"], data["constraints"])
+    result = await _run_in_slot(
+        lambda cancellation, progress: simulator.run(
+            run_id, data["scenario"], data["constraints"], cancellation, prefix=prefix
+        )
+    )
+    if result.termination["truncated"]:
+        raise ValueError(f"Replay of simulation {run_id} did not finish within {deadline_ms} ms")
+    states = check_replay(result, data)
+    
+    _replayed[run_id] = (replay["trace_digest"], states)
+    while len(_replayed) > REPLAY_CACHE_SIZE:
+        _replayed.popitem(last=False)
+    return {**data, "intermediate_states": states}
+
+
+def _validate_checkpoint_every(checkpoint_every: Any) -> None:
+    if checkpoint_every is not None and (
+        isinstance(checkpoint_every, bool) or not isinstance(checkpoint_every, int) or checkpoint_every < 1
+    ):
+        raise ValueError("checkpointEvery must be a positive integer")
+
+
 async def _handle_simulate_run(args: dict[str, Any]) -> list[TextContent]:
     """Execute a beam search simulation."""
     
@@ -128,6 +636,23 @@ async def _handle_simulate_run(args: dict[str, Any]) -> list[TextContent]:
     beam_width = args.get("beamWidth", 5)
     max_steps = args.get("maxSteps", 10)
     seed = args.get("seed")
+    engine = args.get("engine", "auto")
+    scoring = args.get("scoring", "full")
+    dedup = args.get("dedup", False)
+    use_score_cache = args.get("scoreCache", False)
+    workers = args.get("workers", 1)
+    scorer = args.get("scorer", "default")
+    plateau_steps = args.get("plateauSteps")
+    min_improvement = args.get("minImprovement")
+    goal_score = args.get("goalScore")
+    stop_when_stable = args.get("stopWhenStable", False)
+    deadline_ms = args.get("deadlineMs", DEFAULT_DEADLINE_MS)
+    checkpoint_every = args.get("checkpointEvery")
+    reuse_prefix = args.get("reusePrefix", True)
+    use_result_cache = args.get("resultCache", True)
+    trace = args.get("trace", "full")
+    trace_every = args.get("traceEvery", DEFAULT_TRACE_EVERY)
+    persistence = args.get("persistence", "full")
     
     # Validate parameter types
     if not isinstance(beam_width, int) or beam_width < 1:
@@ -136,39 +661,225 @@ async def _handle_simulate_run(args: dict[str, Any]) -> list[TextContent]:
         raise ValueError("maxSteps must be a positive integer")
     if seed is not None and not isinstance(seed, int):
         raise ValueError("seed must be an integer")
-    
-    # Generate run ID (deterministic if seed provided)
-    run_id = generate_run_id(seed)
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"scoring must be one of {', '.join(SCORING_MODES)}")
+    if not isinstance(dedup, bool):
+        raise ValueError("dedup must be a boolean")
+    if not isinstance(use_score_cache, bool):
+        raise ValueError("scoreCache must be a boolean")
+    if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+        raise ValueError("workers must be a positive integer")
+    if workers > MAX_WORKERS:
+        raise ValueError(f"workers must be at most {MAX_WORKERS}")
+    if not isinstance(scorer, str):
+        raise ValueError("scorer must be a string")
+    if plateau_steps is not None and (
+        isinstance(plateau_steps, bool) or not isinstance(plateau_steps, int) or plateau_steps < 1
+    ):
+        raise ValueError("plateauSteps must be a positive integer")
+    if min_improvement is not None and (
+        isinstance(min_improvement, bool) or not isinstance(min_improvement, (int, float)) or min_improvement < 0
+    ):
+        raise ValueError("minImprovement must be a non-negative number")
+    if goal_score is not None and (isinstance(goal_score, bool) or not isinstance(goal_score, (int, float))):
+        raise ValueError("goalScore must be a number")
+    if not isinstance(stop_when_stable, bool):
+        raise ValueError("stopWhenStable must be a boolean")
+    if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, int) or deadline_ms < 1:
+        raise ValueError("deadlineMs must be a positive integer")
+    _validate_checkpoint_every(checkpoint_every)
+    if not isinstance(reuse_prefix, bool):
+        raise ValueError("reusePrefix must be a boolean")
+    if not isinstance(use_result_cache, bool):
+        raise ValueError("resultCache must be a boolean")
+    if trace not in TRACE_LEVELS:
+        raise ValueError(f"trace must be one of {', '.join(TRACE_LEVELS)}")
+    if isinstance(trace_every, bool) or not isinstance(trace_every, int) or trace_every < 1:
+        raise ValueError("traceEvery must be a positive integer")
+    if persistence not in PERSISTENCE_MODES:
+        raise ValueError(f"persistence must be one of {', '.join(PERSISTENCE_MODES)}")
     
     # Run simulation
     simulator = BeamSimulator(
         beam_width=beam_width,
         max_steps=max_steps,
-        seed=seed
+        seed=seed,
+        engine=engine,
+        scoring=scoring,
+        dedup=dedup,
+        score_cache=await _get_score_cache() if use_score_cache else None,
+        workers=workers,
+        scorer=scorer,
+        stopping=StoppingRules(
+            plateau_steps=plateau_steps,
+            min_improvement=min_improvement,
+            goal_score=goal_score,
+            stable_beam=stop_when_stable
+        ),
+        deadline_ms=deadline_ms,
+        trace=trace,
+        trace_every=trace_every
     )
     
-    result = simulator.run(run_id, scenario, constraints)
+    # An identical request already answered is served from storage
+    request_key = simulator.request_key(scenario, constraints, persistence)
+    if use_result_cache:
+        cached = await _cached_response(request_key)
+        if cached is not None:
+            return cached
     
-    # Persist the result
-    await save_simulation(run_id, {
-        "run_id": result.run_id,
-        "best_result": result.best_result,
-        "top_k": result.top_k,
-        "score_breakdown": result.score_breakdown,
-        "intermediate_states": result.intermediate_states,
-        "scenario": result.scenario,
-        "constraints": result.constraints
-    })
+    # Generate run ID (deterministic if seed provided)
+    run_id = generate_run_id(seed)
     
-    # Return structured response
-    response = {
-        "runId": result.run_id,
-        "bestResult": result.best_result,
-        "topK": result.top_k,
-        "scoreBreakdown": result.score_breakdown
-    }
+    # Steps an earlier run of the same search already took are read back
+    # rather than searched again
+    prefix = await _load_prefix(simulator, scenario, constraints) if reuse_prefix else None
     
-    return [TextContent(type="text", text=json.dumps(response, indent=2))]
+    # The trace is written to disk as the run goes rather than held in memory.
+    # A replayable run keeps only its digest, and stores no prefix either.
+    digest = TraceDigest() if persistence == "replayable" else None
+    spool = TraceSpool() if trace != "none" and digest is None else None
+    try:
+        saver = _checkpoint_saver(asyncio.get_running_loop())
+        result = await _run_in_slot(
+            lambda cancellation, progress: simulator.run(
+                run_id, scenario, constraints, cancellation, progress,
+                checkpoint_every=checkpoint_every, on_checkpoint=saver,
+                prefix=prefix,
+                trace_sink=digest if digest is not None else spool
+            )
+        )
+        
+        if use_score_cache:
+            await save_score_cache(simulator.score_cache)
+        
+        # Persist the result; a truncated one does not answer the request.
+        # The prefix shares the spooled trace, so it is saved before the run
+        # takes the spool over.
+        truncated = result.termination["truncated"]
+        replay = None
+        if digest is not None:
+            replay = {
+                "settings": simulator.replay_settings(result.termination),
+                "trace_digest": digest.hexdigest()
+            }
+        else:
+            await _save_prefix(result, prefix, spool)
+        await _save_result(result, None if truncated else request_key, spool, replay)
+    finally:
+        if spool is not None:
+            spool.discard()
+    
+    return _run_response(result)
+
+
+async def _handle_simulate_continue(args: dict[str, Any]) -> list[TextContent]:
+    """Extend a previous run from its checkpoint."""
+    
+    run_id = args.get("runId")
+    if not run_id:
+        raise ValueError("Missing required field: runId")
+    
+    if not isinstance(run_id, str):
+        raise ValueError("runId must be a string")
+    
+    additional_steps = args.get("additionalSteps", 10)
+    deadline_ms = args.get("deadlineMs", DEFAULT_DEADLINE_MS)
+    checkpoint_every = args.get("checkpointEvery")
+    
+    if isinstance(additional_steps, bool) or not isinstance(additional_steps, int) or additional_steps < 1:
+        raise ValueError("additionalSteps must be a positive integer")
+    if additional_steps > MAX_ADDITIONAL_STEPS:
+        raise ValueError(f"additionalSteps must be at most {MAX_ADDITIONAL_STEPS}")
+    if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, int) or deadline_ms < 1:
+        raise ValueError("deadlineMs must be a positive integer")
+    _validate_checkpoint_every(checkpoint_every)
+    
+    data = await get_checkpoint(run_id)
+    if not data:
+        raise ValueError(f"Checkpoint not found: {run_id}")
+    checkpoint = Checkpoint.from_json(data)
+    
+    # The continuation keeps the trace level the run was recorded at
+    previous = await get_simulation(run_id)
+    previous_trace = previous.get("trace", {"level": "full"}) if previous else {"level": "full"}
+    
+    use_score_cache = bool(checkpoint.config.get("score_cache"))
+    simulator = BeamSimulator.from_checkpoint(
+        checkpoint,
+        additional_steps,
+        score_cache=await _get_score_cache() if use_score_cache else None,
+        deadline_ms=deadline_ms,
+        trace=previous_trace["level"],
+        trace_every=previous_trace.get("every", DEFAULT_TRACE_EVERY)
+    )
+    
+    # A stored search reaching the checkpoint answers the continuation with
+    # its full trace; otherwise resume from the checkpoint itself
+    prefix = await _load_prefix(simulator, checkpoint.scenario, checkpoint.constraints)
+    if prefix is not None and prefix.steps < checkpoint.step:
+        prefix = None
+    
+    # The continuation's trace is spooled to disk, like a new run's, and
+    # spliced onto the earlier one from there
+    spool = TraceSpool() if previous_trace["level"] != "none" else None
+    try:
+        saver = _checkpoint_saver(asyncio.get_running_loop())
+        if prefix is not None:
+            result = await _run_in_slot(
+                lambda cancellation, progress: simulator.run(
+                    run_id, checkpoint.scenario, checkpoint.constraints, cancellation, progress,
+                    checkpoint_every=checkpoint_every, on_checkpoint=saver, prefix=prefix,
+                    trace_sink=spool
+                )
+            )
+        else:
+            result = await _run_in_slot(
+                lambda cancellation, progress: simulator.continue_run(
+                    checkpoint, cancellation, progress,
+                    checkpoint_every=checkpoint_every, on_checkpoint=saver,
+                    trace_sink=spool
+                )
+            )
+        
+        if use_score_cache:
+            await save_score_cache(simulator.score_cache)
+        
+        if prefix is None and previous and spool is not None:
+            # The stored trace ends with the checkpointed beam, which the
+            # continuation's trace starts with. A run recovered from a periodic
+            # checkpoint has no stored trace, so its trace starts at the checkpoint.
+            previous = await _with_trace(previous)
+            spliced = splice_trace(
+                previous["intermediate_states"], previous_trace,
+                spool.records(), result.trace, checkpoint.step
+            )
+            if spliced is not None:
+                records, result.trace = spliced
+                joined = TraceSpool()
+                try:
+                    await asyncio.to_thread(_write_records, joined, records)
+                except BaseException:
+                    joined.discard()
+                    raise
+                spool.discard()
+                spool = joined
+        
+        # As in simulate_run, the prefix shares the spool, so it is saved first
+        await _save_prefix(result, prefix, spool)
+        await _save_result(result, spool=spool)
+    finally:
+        if spool is not None:
+            spool.discard()
+    
+    return _run_response(result)
+
+
+def _write_records(spool: TraceSpool, records: Iterable[Any]) -> None:
+    for record in records:
+        spool.write(record)
 
 
 async def _handle_simulate_explain(args: dict[str, Any]) -> list[TextContent]:
@@ -185,6 +896,7 @@ async def _handle_simulate_explain(args: dict[str, Any]) -> list[TextContent]:
     data = await get_simulation(run_id)
     if not data:
         raise ValueError(f"Simulation not found: {run_id}")
+    data = await _with_trace(data, EXPLAIN_REPLAY_DEADLINE_MS)
     
     # Reconstruct result object
     result = SimulationResult(
@@ -194,7 +906,10 @@ async def _handle_simulate_explain(args: dict[str, Any]) -> list[TextContent]:
         score_breakdown=data["score_breakdown"],
         intermediate_states=data["intermediate_states"],
         scenario=data["scenario"],
-        constraints=data["constraints"]
+        constraints=data["constraints"],
+        stats=data.get("stats", {}),
+        termination=data.get("termination", {}),
+        trace=data.get("trace", {"level": "full"})
     )
     
     # Generate explanation
@@ -206,6 +921,9 @@ async def _handle_simulate_explain(args: dict[str, Any]) -> list[TextContent]:
 
 # --- Resource Definitions ---
 
+RESULT_CACHE_URI = "cache://results"
+
+
 @server.list_resources()
 async def list_resources() -> list[Resource]:
     """List available simulation resources."""
@@ -213,6 +931,13 @@ async def list_resources() -> list[Resource]:
     
     run_ids = await list_simulations()
     return [
+        Resource(
+            uri=RESULT_CACHE_URI,
+            name="Result cache statistics",
+            description="Entries, hits, misses and evictions of the simulate_run result cache",
+            mimeType="application/json"
+        )
+    ] + [
         Resource(
             uri=f"simulations://{run_id}",
             name=f"Simulation {run_id[:8]}...",
@@ -227,6 +952,9 @@ async def list_resources() -> list[Resource]:
 async def read_resource(uri: str) -> str:
     """Read a simulation resource by URI."""
     
+    if str(uri) == RESULT_CACHE_URI:
+        return json.dumps(_result_cache.stats(), indent=2)
+    
     # Parse the URI
     if not uri.startswith("simulations://"):
         raise ValueError(f"Invalid resource URI scheme: {uri}")
@@ -240,19 +968,25 @@ async def read_resource(uri: str) -> str:
     if not data:
         raise ValueError(f"Simulation not found: {run_id}")
     
-    return json.dumps(data, indent=2)
+    return json.dumps(await _with_trace(data), indent=2)
 
 
 # --- Server Entry Point ---
 
 async def run_server():
     """Run the MCP server."""
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options()
-        )
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+    finally:
+        # Only imported once a run used workers; numpy may not be installed
+        parallel = sys.modules.get("parallel")
+        if parallel is not None:
+            parallel.shutdown_pool()
 
 
 def main():
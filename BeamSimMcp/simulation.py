@@ -6,17 +6,146 @@ The beam search explores the space keeping the top-k candidates at each step.
 """
 
 import hashlib
+import heapq
+import itertools
+import json
+import os
 import random
-from dataclasses import dataclass, field
-from typing import Any
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import asdict, dataclass, field
+from operator import itemgetter
+from typing import Any, Protocol
+
+from cache import ScoreCache, canonical_json, ordered_hash
+from constraints import CompiledConstraints, compile_constraints
+from fingerprint import state_fingerprint, updated_fingerprint
+from objective import Objective
+from scenario import CompiledScenario, compile_scenario
+from scoring import DEFAULT_SCORER, DefaultScorer, ScoringPlugin, load_scorer
+from stopping import (
+    BEAM_EXHAUSTED,
+    BUDGET_CLOCKS,
+    CANCELLED,
+    DEADLINE,
+    GOAL,
+    MAX_STEPS,
+    MIN_IMPROVEMENT,
+    PLATEAU,
+    STABLE_BEAM,
+    TRUNCATING_REASONS,
+    Budget,
+    CancellationToken,
+    StepInterrupted,
+    StoppingRules,
+    StopMonitor,
+)
+
+# Bumped whenever the checkpoint layout changes; older checkpoints are rejected
+CHECKPOINT_VERSION = 1
+
+# Bumped whenever a change alters the beams a search produces, so results
+# and prefixes stored by an older engine are no longer served
+ENGINE_VERSION = 1
+
+TRACE_LEVELS = ("full", "delta", "sampled", "scores", "none")
+
+# Steps between recorded beams at the "sampled" trace level
+DEFAULT_TRACE_EVERY = 10
+
+
+class PathNode:
+    """
+    One step of a search path, linked to the step before it.
+    
+    Candidates extending the same state share that state's node, so growing a
+    path is one small allocation instead of a copy of the whole history.
+    """
+    __slots__ = ("parent", "action_id")
+    
+    def __init__(self, parent: "PathNode | None", action_id: int):
+        self.parent = parent
+        self.action_id = action_id
+
+
+class ActionLabels:
+    """Interns actions to integer IDs and renders paths back to labels."""
+    
+    INITIAL = 0
+    
+    def __init__(self):
+        self._ids: dict[Any, int] = {}
+        self._actions: list[dict[str, Any] | None] = [None]
+        self._labels: list[str | None] = ["initial"]
+        self._restored: dict[str, int] = {}
+    
+    def intern(self, action: dict[str, Any]) -> int:
+        """Return the ID for an action, keyed by its type and field."""
+        key = (action.get("type", "unknown"), action.get("field", ""))
+        try:
+            return self._ids[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable type/field values; fall back to the rendered label
+            key = _action_label(action)
+            if key in self._ids:
+                return self._ids[key]
+        
+        action_id = len(self._actions)
+        self._ids[key] = action_id
+        self._actions.append(action)
+        self._labels.append(None)
+        return action_id
+    
+    def intern_label(self, label: str) -> int:
+        """Return an ID that renders as label, for paths restored from a checkpoint."""
+        if label == "initial":
+            return self.INITIAL
+        action_id = self._restored.get(label)
+        if action_id is None:
+            action_id = self._restored[label] = len(self._actions)
+            self._actions.append(None)
+            self._labels.append(label)
+        return action_id
+    
+    def label(self, action_id: int) -> str:
+        """Render one action ID, caching the string."""
+        label = self._labels[action_id]
+        if label is None:
+            label = self._labels[action_id] = _action_label(self._actions[action_id])
+        return label
+    
+    def render(self, node: PathNode | None) -> list[str]:
+        """Render a path, root first, as the action labels it took."""
+        ids = []
+        while node is not None:
+            ids.append(node.action_id)
+            node = node.parent
+        return [self.label(action_id) for action_id in reversed(ids)]
 
 
 @dataclass
 class SimulationState:
-    """A state in the simulation with its score and history."""
+    """A state in the simulation with its score and path."""
     values: dict[str, Any]
     score: float = 0.0
-    history: list[str] = field(default_factory=list)
+    path: PathNode | None = None
+    # Quantized fingerprint for dedup; exact fingerprint for the score cache
+    fingerprint: int = 0
+    exact_fingerprint: int = 0
+
+
+@dataclass
+class StepProgress:
+    """Progress of a run after one completed expansion step."""
+    step: int
+    max_steps: int
+    best_score: float
+    beam_size: int
+    # Cumulative over the run
+    candidates_evaluated: int
+    elapsed_ms: float
 
 
 @dataclass
@@ -29,6 +158,442 @@ class SimulationResult:
     intermediate_states: list[list[dict[str, Any]]]
     scenario: dict[str, Any]
     constraints: dict[str, Any]
+    stats: dict[str, Any] = field(default_factory=dict)
+    # Why the search ended ("reason") and after how many steps ("step")
+    termination: dict[str, Any] = field(default_factory=dict)
+    # Resume point after the last completed step; None if the run was cancelled
+    checkpoint: "Checkpoint | None" = None
+    # The search this run followed from the initial state, for reuse by runs
+    # with the same search key; None if cancelled, resumed from a checkpoint
+    # or recorded at a trace level other than full
+    prefix: "Prefix | None" = None
+    # How intermediate_states was recorded (see TraceRecorder.metadata)
+    trace: dict[str, Any] = field(default_factory=lambda: {"level": "full"})
+
+
+@dataclass
+class Checkpoint:
+    """
+    Everything needed to extend a run: the beam after its last completed
+    step, the RNG state at that point, and the configuration that produced it.
+    
+    Continuing from a checkpoint for N more steps gives the same beam as a
+    single run of step + N steps with the same seed. Stopping rules and
+    deadlines are not part of the checkpoint.
+    """
+    run_id: str
+    # Completed expansion steps
+    step: int
+    # [{"values", "score", "path"}] with paths rendered as labels
+    beam: list[dict[str, Any]]
+    rng_state: Any
+    # beam_width, seed, engine, scoring, dedup, scorer, score_cache
+    config: dict[str, Any]
+    scenario: dict[str, Any]
+    constraints: dict[str, Any]
+    stats: dict[str, Any] = field(default_factory=dict)
+    version: int = CHECKPOINT_VERSION
+    
+    def to_json(self) -> dict[str, Any]:
+        """JSON-serializable form of the checkpoint."""
+        return {
+            "version": self.version,
+            "run_id": self.run_id,
+            "step": self.step,
+            "beam": self.beam,
+            "rng_state": _rng_state_to_json(self.rng_state),
+            "config": self.config,
+            "scenario": self.scenario,
+            "constraints": self.constraints,
+            "stats": self.stats
+        }
+    
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "Checkpoint":
+        """
+        Rebuild a checkpoint saved with to_json.
+        
+        Raises:
+            ValueError: If the data is not a checkpoint of this version
+        """
+        if not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError("Unsupported checkpoint version")
+        try:
+            return cls(
+                run_id=data["run_id"],
+                step=data["step"],
+                beam=data["beam"],
+                rng_state=_rng_state_from_json(data["rng_state"]),
+                config=data["config"],
+                scenario=data["scenario"],
+                constraints=data["constraints"],
+                stats=data.get("stats", {})
+            )
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Malformed checkpoint") from None
+
+
+@dataclass
+class Prefix:
+    """
+    A search followed from the initial state, stored under its search key.
+    
+    The beam after step k depends only on the search key (scenario,
+    constraints, beam width, seed, scoring, dedup, scorer), not on maxSteps,
+    stopping rules or deadlines. A run with the same key can therefore be
+    answered from a prefix at least as long as its maxSteps, or resumed from
+    the end of a shorter one.
+    """
+    key: str
+    scenario: dict[str, Any]
+    constraints: dict[str, Any]
+    # Beam after each completed step, as in SimulationResult.intermediate_states;
+    # None when the run wrote its trace to a sink, where it is to be read from.
+    # Any sequence will do (storage.StoredTrace reads records from disk); runs
+    # only iterate over it
+    trace: Sequence[list[dict[str, Any]]] | None
+    # RNG state after each completed step
+    rng_states: list[Any]
+    # Index of each state's parent in the beam before it, per beam (none for
+    # the initial one), so stored beams are traced as the run that stored
+    # them traced them
+    parents: list[list[int]] = field(default_factory=list)
+    # Duplicates collapsed by each step, cumulative (dedup runs only)
+    duplicates: list[int] = field(default_factory=list)
+    version: int = CHECKPOINT_VERSION
+    
+    @property
+    def steps(self) -> int:
+        """Completed steps the prefix covers."""
+        return len(self.rng_states) - 1
+    
+    def to_json(self) -> dict[str, Any]:
+        """JSON-serializable form of the prefix; without "trace" if it is held by a sink."""
+        data = {
+            "version": self.version,
+            "key": self.key,
+            "scenario": self.scenario,
+            "constraints": self.constraints,
+            "rng_states": [_rng_state_to_json(state) for state in self.rng_states],
+            "parents": self.parents,
+            "duplicates": self.duplicates
+        }
+        if self.trace is not None:
+            data["trace"] = self.trace
+        return data
+    
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "Prefix":
+        """
+        Rebuild a prefix saved with to_json.
+        
+        Raises:
+            ValueError: If the data is not a prefix of this version
+        """
+        if not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError("Unsupported prefix version")
+        try:
+            prefix = cls(
+                key=data["key"],
+                scenario=data["scenario"],
+                constraints=data["constraints"],
+                trace=data["trace"],
+                rng_states=[_rng_state_from_json(state) for state in data["rng_states"]],
+                parents=data["parents"],
+                duplicates=data.get("duplicates", [])
+            )
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Malformed prefix") from None
+        if (
+            len(prefix.rng_states) != len(prefix.trace)
+            or len(prefix.parents) != len(prefix.rng_states)
+            or prefix.steps < 1
+        ):
+            raise ValueError("Malformed prefix")
+        return prefix
+
+
+def _rng_state_to_json(state: Any) -> list[Any]:
+    version, internal, gauss = state
+    return [version, list(internal), gauss]
+
+
+def _rng_state_from_json(data: Any) -> Any:
+    version, internal, gauss = data
+    return (version, tuple(internal), gauss)
+
+
+class TraceSink(Protocol):
+    """Receives a run's trace records in step order, as the steps complete."""
+    
+    def write(self, record: Any) -> None:
+        ...
+
+
+class TraceDigest:
+    """
+    Trace sink that hashes the records written to it, passing them on to sink.
+    
+    The digest is SHA-256 over each record's canonical JSON, one per line,
+    so a run's trace can be checked against it after being regenerated.
+    """
+    
+    def __init__(self, sink: TraceSink | None = None):
+        self._hash = hashlib.sha256()
+        self._sink = sink
+    
+    def write(self, record: Any) -> None:
+        self._hash.update(canonical_json(record).encode())
+        self._hash.update(b"\n")
+        if self._sink is not None:
+            self._sink.write(record)
+    
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def trace_digest(records: list[Any]) -> str:
+    """The TraceDigest of a recorded trace."""
+    digest = TraceDigest()
+    for record in records:
+        digest.write(record)
+    return digest.hexdigest()
+
+
+def check_replay(result: SimulationResult, record: dict[str, Any]) -> list[Any]:
+    """
+    The trace of a replayed run, checked against the stored record it repeats.
+    
+    Both are compared as stored, after the JSON round trip the original
+    went through.
+    
+    Raises:
+        ValueError: If the replay's trace digest or top_k differs from the
+            record's
+    """
+    states = json.loads(json.dumps(result.intermediate_states))
+    if (
+        trace_digest(states) != record["replay"]["trace_digest"]
+        or json.loads(json.dumps(result.top_k)) != record["top_k"]
+    ):
+        raise ValueError(f"Replay of simulation {record['run_id']} does not match its stored result")
+    return states
+
+
+class TraceRecorder:
+    """
+    Records the beam after each completed step at one trace level.
+    
+    full: every beam as [{"values", "score", "history"}].
+    delta: the first beam in full, then one {"parent", "action", "changes",
+        "score"} per state: the index of its parent in the previous record,
+        the label of the action taken, and the fields whose values differ
+        from the parent's. Each entry with "values" is complete and each
+        other entry is relative to the previous record.
+    sampled: full beams after every `every`th step and after the last.
+    scores: each beam's scores, best first.
+    none: nothing.
+    
+    With a sink, records are handed to it instead of kept in records. The
+    latest one is held back until the next arrives, since an interrupted
+    step discards it; finish() hands it over.
+    """
+    
+    def __init__(
+        self,
+        labels: ActionLabels,
+        level: str = "full",
+        every: int = DEFAULT_TRACE_EVERY,
+        sink: TraceSink | None = None
+    ):
+        self.labels = labels
+        self.level = level
+        self.every = every
+        self.sink = sink
+        # The held-back record, if any
+        self._pending: list[Any] = []
+        self.records: list[Any] = []
+        # Step each record holds
+        self.steps: list[int] = []
+        # For delta: parent lookup and values of the last record, and of the
+        # one before it in case the last is discarded
+        self._previous: tuple[dict[int, int], list[dict[str, Any]]] | None = None
+        self._before_last: tuple[dict[int, int], list[dict[str, Any]]] | None = None
+    
+    def _wanted(self, step: int, final: bool) -> bool:
+        if self.level == "none":
+            return False
+        return self.level != "sampled" or final or step % self.every == 0
+    
+    def _append(self, step: int, record: Any) -> None:
+        if self.sink is None:
+            self.records.append(record)
+        else:
+            for held in self._pending:
+                self.sink.write(held)
+            self._pending = [record]
+        self.steps.append(step)
+    
+    def record(
+        self,
+        step: int,
+        beam: list[SimulationState],
+        final: bool = False,
+        parents: list[int] | None = None
+    ) -> None:
+        """
+        Record the beam after step completed steps; final marks the run's last beam.
+        
+        parents gives each state's index in the previous beam, for a beam
+        restored from a Prefix, whose paths no longer lead to the previous
+        record's states.
+        """
+        if not self._wanted(step, final):
+            return
+        if self.level == "scores":
+            self._append(step, [s.score for s in beam])
+        elif self.level != "delta":
+            self._append(step, [
+                {"values": s.values.copy(), "score": s.score, "history": self.labels.render(s.path)}
+                for s in beam
+            ])
+        else:
+            previous = self._previous
+            entries = []
+            for i, s in enumerate(beam):
+                if previous is None:
+                    parent = None
+                elif parents is not None:
+                    parent = parents[i]
+                else:
+                    parent = previous[0].get(id(s.path.parent)) if s.path is not None else None
+                entries.append(self._delta_entry(
+                    s.values, s.score, parent, previous,
+                    lambda s=s: self.labels.label(s.path.action_id),
+                    lambda s=s: self.labels.render(s.path)
+                ))
+            self._append(step, entries)
+            self._advance({id(s.path): i for i, s in enumerate(beam)}, [s.values for s in beam])
+    
+    def record_stored(
+        self,
+        step: int,
+        entries: list[dict[str, Any]],
+        parents: list[int],
+        final: bool = False
+    ) -> None:
+        """
+        Record a beam stored as full trace entries, such as one from a Prefix.
+        
+        parents gives each entry's index in the previous beam, so the record
+        is the one record() made of the beam in the run that stored it.
+        """
+        if not self._wanted(step, final):
+            return
+        if self.level == "scores":
+            self._append(step, [entry["score"] for entry in entries])
+        elif self.level != "delta":
+            self._append(step, entries)
+        else:
+            previous = self._previous
+            records = []
+            for i, entry in enumerate(entries):
+                history = entry["history"]
+                records.append(self._delta_entry(
+                    entry["values"], entry["score"], parents[i] if previous is not None else None, previous,
+                    lambda history=history: history[-1],
+                    lambda history=history: list(history)
+                ))
+            self._append(step, records)
+            # Whatever follows a stored beam is given its parents
+            self._advance({}, [entry["values"] for entry in entries])
+    
+    def _delta_entry(
+        self,
+        values: dict[str, Any],
+        score: float,
+        parent: int | None,
+        previous: tuple[dict[int, int], list[dict[str, Any]]] | None,
+        action: Callable[[], str],
+        history: Callable[[], list[str]]
+    ) -> dict[str, Any]:
+        if parent is None or parent < 0:
+            return {"values": values.copy(), "score": score, "history": history()}
+        parent_values = previous[1][parent]
+        changes = {
+            key: value for key, value in values.items()
+            if key not in parent_values or parent_values[key] != value
+        }
+        return {"parent": parent, "action": action(), "changes": changes, "score": score}
+    
+    def _advance(self, lookup: dict[int, int], values: list[dict[str, Any]]) -> None:
+        self._before_last = self._previous
+        self._previous = (lookup, values)
+    
+    def discard_last(self, step: int) -> None:
+        """Drop the record of step, if one was made, so the beam can be recorded again."""
+        if self.steps and self.steps[-1] == step:
+            if self.sink is None:
+                self.records.pop()
+            else:
+                # Only the latest record is ever discarded, and it is still held
+                self._pending = []
+            self.steps.pop()
+            if self.level == "delta":
+                self._previous = self._before_last
+    
+    def finish(self) -> None:
+        """Hand the last record to the sink."""
+        for held in self._pending:
+            self.sink.write(held)
+        self._pending = []
+    
+    def metadata(self) -> dict[str, Any]:
+        """The trace level, with the sampling interval and recorded steps when sampled."""
+        trace: dict[str, Any] = {"level": self.level}
+        if self.level == "sampled":
+            trace["every"] = self.every
+            trace["steps"] = self.steps
+        return trace
+
+
+def splice_trace(
+    earlier_records: Sequence[Any],
+    earlier_trace: dict[str, Any],
+    records: Iterable[Any],
+    trace: dict[str, Any],
+    step: int
+) -> tuple[Iterator[Any], dict[str, Any]] | None:
+    """
+    Join the trace of a run checkpointed after step steps with its continuation's.
+    
+    The earlier trace ends with the checkpointed beam, which the
+    continuation's trace starts with (if that step is recorded). The earlier
+    record of that beam is kept: at the delta level it is relative to the
+    beam before it, as in one longer run, while the continuation's is in
+    full, and the continuation's next record already gives its parents as
+    indices into that beam. The joined records are produced lazily, so the
+    continuation's can be streamed from a spool. Returns None if the traces
+    were recorded at different levels or the earlier one does not end at
+    the checkpoint, e.g. because it was never stored.
+    """
+    level = trace["level"]
+    if earlier_trace.get("level", "full") != level:
+        return None
+    if level == "none":
+        return iter(records), trace
+    if level == "sampled":
+        steps = earlier_trace.get("steps", [])
+        if not steps or steps[-1] != step:
+            return None
+        kept = [i for i, recorded in enumerate(steps) if recorded < step]
+        return (
+            itertools.chain((earlier_records[i] for i in kept), records),
+            {**trace, "steps": [steps[i] for i in kept] + trace["steps"]}
+        )
+    if len(earlier_records) != step + 1:
+        return None
+    return itertools.chain(earlier_records, itertools.islice(records, 1, None)), trace
 
 
 def _compute_hash(data: dict[str, Any]) -> int:
@@ -37,73 +602,345 @@ def _compute_hash(data: dict[str, Any]) -> int:
     return int(hashlib.sha256(serialized.encode()).hexdigest()[:16], 16)
 
 
-def _default_score_function(state: dict[str, Any], constraints: dict[str, Any]) -> dict[str, float]:
+def _merge_stats(previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+    """Add a continued run's counters to those of the run it continued."""
+    merged = dict(previous)
+    for key, value in current.items():
+        if isinstance(value, dict):
+            merged[key] = _merge_stats(merged.get(key) or {}, value)
+        elif isinstance(merged.get(key), (int, float)):
+            merged[key] = merged[key] + value
+        else:
+            merged[key] = value
+    return merged
+
+
+def _default_score_function(
+    state: dict[str, Any],
+    constraints: dict[str, Any] | CompiledConstraints,
+    objective: Objective | None = None
+) -> dict[str, float]:
     """
     Default scoring: sum numeric values, apply constraint penalties.
+    A scenario objective, when given, replaces the value sum.
     Returns breakdown of score components.
+    
+    This is the single-state form of scoring.DefaultScorer, the reference
+    scoring plugin.
     """
-    breakdown = {}
+    return DefaultScorer(objective).score_state(state, constraints)
+
+
+def _action_effect(state: dict[str, Any], action: dict[str, Any]) -> tuple[Any, Any] | None:
+    """Return the (field, new value) an action writes into state, or None for a no-op."""
+    action_type = action.get("type", "")
+    field = action.get("field", "")
+    delta = action.get("delta", 1)
     
-    # Score based on numeric values in state
-    value_score = sum(v for v in state.values() if isinstance(v, (int, float)))
-    breakdown["value_sum"] = value_score
+    if action_type == "increment" and field in state:
+        if isinstance(state[field], (int, float)):
+            return field, state[field] + delta
+    elif action_type == "decrement" and field in state:
+        if isinstance(state[field], (int, float)):
+            return field, state[field] - delta
+    elif action_type == "set" and field:
+        return field, action.get("value", 0)
+    
+    return None
+
+
+def _apply_action(state: dict[str, Any], action: dict[str, Any]) -> dict[str, Any]:
+    """Apply an action to a state, returning new state."""
+    new_state = state.copy()
+    
+    effect = _action_effect(state, action)
+    if effect is not None:
+        field, value = effect
+        new_state[field] = value
+    
+    return new_state
+
+
+def _numeric_values_with_change(state: dict[str, Any], field: Any, value: Any) -> Iterator[Any]:
+    """Numeric values of state with one field set to value, in the updated state's order."""
+    for key, v in state.items():
+        if key == field:
+            v = value
+        if isinstance(v, (int, float)):
+            yield v
+    if field not in state and isinstance(value, (int, float)):
+        yield value
+
+
+def _score_with_change(
+    state: dict[str, Any],
+    constraints: CompiledConstraints,
+    field: Any,
+    value: Any,
+    objective: Objective | None = None
+) -> float:
+    """
+    Total default score of state with one field set to value, without copying state.
+    
+    Mirrors _default_score_function on the updated state, in the same order,
+    so the result is bit-identical to scoring the materialized child.
+    """
+    if objective is not None:
+        value_score = objective.evaluate_with_change(state, field, value)
+    else:
+        value_score = sum(_numeric_values_with_change(state, field, value))
     
-    # Apply constraint penalties
     penalty = 0.0
-    for key, limit in constraints.items():
-        if key.startswith("max_") and key[4:] in state:
-            actual = state.get(key[4:], 0)
-            if isinstance(actual, (int, float)) and actual > limit:
-                penalty -= (actual - limit) * 10
-        elif key.startswith("min_") and key[4:] in state:
-            actual = state.get(key[4:], 0)
-            if isinstance(actual, (int, float)) and actual < limit:
-                penalty -= (limit - actual) * 10
-    breakdown["constraint_penalty"] = penalty
+    for bound in constraints.bounds:
+        if bound.field == field:
+            actual = value
+        elif bound.field in state:
+            actual = state[bound.field]
+        else:
+            continue
+        if not isinstance(actual, (int, float)):
+            continue
+        if bound.is_max and actual > bound.limit:
+            penalty -= (actual - bound.limit) * bound.weight
+        elif not bound.is_max and actual < bound.limit:
+            penalty -= (bound.limit - actual) * bound.weight
     
-    return breakdown
+    return value_score + penalty
 
 
-def _generate_actions(state: dict[str, Any], scenario: dict[str, Any], rng: random.Random) -> list[dict[str, Any]]:
+def _score_delta(
+    state: dict[str, Any],
+    field: Any,
+    value: Any,
+    constraints: CompiledConstraints
+) -> float:
     """
-    Generate possible actions from current state.
-    Uses scenario's 'actions' field if provided, else generates increments.
+    Change in total default score when one field of state is set to value.
+    
+    O(1) in the size of the state: only the written field's value and its own
+    constraints are looked at.
     """
-    actions = []
+    old = state.get(field)
+    new_is_number = isinstance(value, (int, float))
+    old_is_number = isinstance(old, (int, float))
     
-    if "actions" in scenario:
-        # Use predefined actions from scenario
-        for action in scenario["actions"]:
-            actions.append(action.copy())
+    if new_is_number and old_is_number:
+        change = value - old
+    elif new_is_number:
+        change = value
+    elif old_is_number:
+        change = -old
     else:
-        # Default: generate increment/decrement actions for numeric fields
-        for key, value in state.items():
-            if isinstance(value, (int, float)):
-                delta = rng.uniform(0.5, 2.0)
-                actions.append({"type": "increment", "field": key, "delta": delta})
-                actions.append({"type": "decrement", "field": key, "delta": delta})
+        change = 0.0
     
-    return actions
+    if field in constraints.by_field:
+        change += constraints.field_penalty(field, value) - constraints.field_penalty(field, old)
+    return change
 
 
-def _apply_action(state: dict[str, Any], action: dict[str, Any]) -> dict[str, Any]:
-    """Apply an action to a state, returning new state."""
-    new_state = state.copy()
+ENGINES = ("auto", "python", "numpy")
+
+# Most scoring processes one run may use; more cannot run at once anyway
+MAX_WORKERS = os.cpu_count() or 1
+
+# Candidates the reference engine scores between interruption checks
+SAFE_POINT_INTERVAL = 256
+
+_TERMINATION_DESCRIPTIONS = {
+    BEAM_EXHAUSTED: "no candidate actions remained",
+    PLATEAU: "the best score stopped improving",
+    MIN_IMPROVEMENT: "the best score improved by less than the minimum",
+    GOAL: "the goal score was reached",
+    STABLE_BEAM: "the beam stopped changing",
+    DEADLINE: "the time budget ran out, so the result is the best beam found so far",
+    CANCELLED: "the run was cancelled, so the result is the best beam found so far",
+}
+SCORING_MODES = ("full", "incremental")
+
+
+def _action_label(action: dict[str, Any]) -> str:
+    """Render an action the way it appears in a result path."""
+    return f"{action.get('type', 'unknown')}({action.get('field', '')})"
+
+
+def _stored_beam(record: list[dict[str, Any]]) -> list[SimulationState]:
+    """A full trace record as states, for checking stopping rules against."""
+    return [SimulationState(values=entry["values"], score=entry["score"]) for entry in record]
+
+
+def _safe_point(
+    budget: Budget | None,
+    cancellation: CancellationToken | None
+) -> Callable[[], None] | None:
+    """Combine a run's interruption checks into one engine safe_point callback."""
+    if budget is None:
+        return cancellation.check if cancellation is not None else None
+    if cancellation is None:
+        return budget.check
     
-    action_type = action.get("type", "")
-    field = action.get("field", "")
-    delta = action.get("delta", 1)
+    def check() -> None:
+        cancellation.check()
+        budget.check()
     
-    if action_type == "increment" and field in new_state:
-        if isinstance(new_state[field], (int, float)):
-            new_state[field] = new_state[field] + delta
-    elif action_type == "decrement" and field in new_state:
-        if isinstance(new_state[field], (int, float)):
-            new_state[field] = new_state[field] - delta
-    elif action_type == "set" and field:
-        new_state[field] = action.get("value", 0)
+    return check
+
+
+class PythonEngine:
+    """
+    Reference expansion engine: expands and scores one candidate at a time.
     
-    return new_state
+    With scoring="incremental", candidates are ranked by their parent's score
+    plus the O(1) score change of the one field they write, and survivors are
+    re-scored in full so rounding error never carries over between steps.
+    
+    With dedup, candidates whose fingerprint was already produced this step
+    are dropped before scoring; the first one in candidate order is kept.
+    
+    With a score_cache, full scores are looked up by exact fingerprint under
+    cache_scope (the constraints, field order and objective hash) before
+    being computed; cache_hits and cache_misses count this engine's lookups.
+    
+    safe_point, when set, is called every SAFE_POINT_INTERVAL candidates and
+    may raise StepInterrupted to abandon the step.
+    
+    A scenario objective is not decomposable per field, so it always uses
+    full scoring.
+    
+    Actions come from the compiled scenario; for a fixed-schema scenario
+    their effects are read from its action table without type checks.
+    """
+    
+    def __init__(
+        self,
+        scenario: CompiledScenario,
+        constraints: CompiledConstraints,
+        rng: random.Random,
+        labels: ActionLabels,
+        scoring: str = "full",
+        dedup: bool = False,
+        score_cache: ScoreCache | None = None,
+        cache_scope: str = "",
+        objective: Objective | None = None
+    ):
+        self.scenario = scenario
+        self.constraints = constraints
+        self.objective = objective
+        self.rng = rng
+        self.labels = labels
+        self.incremental = scoring == "incremental" and objective is None
+        self.dedup = dedup
+        self.duplicates = 0
+        self.evaluated = 0
+        self.score_cache = score_cache
+        self.cache_scope = cache_scope
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.safe_point: Callable[[], None] | None = None
+    
+    def close(self) -> None:
+        """Nothing to release; present for parity with NumpyEngine."""
+    
+    def _effect(
+        self,
+        values: dict[str, Any],
+        action_index: int,
+        action: dict[str, Any]
+    ) -> tuple[Any, Any] | None:
+        """The (field, new value) an action writes, from the action table when the schema is fixed."""
+        if self.scenario.fixed_schema:
+            return self.scenario.effect(values, action_index, action)
+        return _action_effect(values, action)
+    
+    def _candidates(
+        self,
+        beam: list[SimulationState],
+        actions_per_state: list[Sequence[dict[str, Any]]]
+    ) -> Iterator[tuple[float, int, int]]:
+        """
+        Yield (score, state index, action index) for every successor.
+        
+        Successors are scored in place against their parent's values; nothing
+        is copied until a candidate survives the cut.
+        """
+        seen: set[int] | None = set() if self.dedup else None
+        cache = None if self.incremental else self.score_cache
+        effect_of = self._effect
+        
+        for state_index, state in enumerate(beam):
+            actions = self.scenario.actions_for(self.rng)
+            actions_per_state.append(actions)
+            
+            for action_index, action in enumerate(actions):
+                if self.safe_point is not None and action_index % SAFE_POINT_INTERVAL == 0:
+                    self.safe_point()
+                effect = effect_of(state.values, action_index, action)
+                if seen is not None:
+                    fp = state.fingerprint
+                    if effect is not None:
+                        fp = updated_fingerprint(fp, state.values, *effect)
+                    if fp in seen:
+                        self.duplicates += 1
+                        continue
+                    seen.add(fp)
+                
+                if effect is None:
+                    score = state.score
+                elif self.incremental:
+                    score = state.score + _score_delta(state.values, *effect, self.constraints)
+                elif cache is not None:
+                    key = updated_fingerprint(state.exact_fingerprint, state.values, *effect, 0)
+                    score = cache.get(key, self.cache_scope)
+                    if score is None:
+                        self.cache_misses += 1
+                        score = _score_with_change(state.values, self.constraints, *effect, self.objective)
+                        cache.put(key, self.cache_scope, score)
+                    else:
+                        self.cache_hits += 1
+                else:
+                    score = _score_with_change(state.values, self.constraints, *effect, self.objective)
+                self.evaluated += 1
+                yield score, state_index, action_index
+    
+    def expand(self, beam: list[SimulationState], beam_width: int) -> list[SimulationState]:
+        """Expand every beam state by every action and keep the best beam_width."""
+        actions_per_state: list[Sequence[dict[str, Any]]] = []
+        
+        # Bounded heap over the candidate stream. nlargest is equivalent to
+        # sorted(..., reverse=True)[:n], so ties keep candidate order.
+        winners = heapq.nlargest(
+            beam_width,
+            self._candidates(beam, actions_per_state),
+            key=itemgetter(0)
+        )
+        
+        survivors = []
+        for score, state_index, action_index in winners:
+            parent = beam[state_index]
+            action = actions_per_state[state_index][action_index]
+            effect = self._effect(parent.values, action_index, action)
+            values = parent.values.copy()
+            if effect is not None:
+                values[effect[0]] = effect[1]
+            if self.incremental:
+                score = sum(_default_score_function(values, self.constraints).values())
+            
+            fp = parent.fingerprint
+            exact_fp = parent.exact_fingerprint
+            if self.dedup or self.score_cache is not None:
+                if effect is not None:
+                    if self.dedup:
+                        fp = updated_fingerprint(fp, parent.values, *effect)
+                    if self.score_cache is not None:
+                        exact_fp = updated_fingerprint(exact_fp, parent.values, *effect, 0)
+            
+            survivors.append(SimulationState(
+                values=values,
+                score=score,
+                path=PathNode(parent.path, self.labels.intern(action)),
+                fingerprint=fp,
+                exact_fingerprint=exact_fp
+            ))
+        return survivors
 
 
 class BeamSimulator:
@@ -113,108 +950,630 @@ class BeamSimulator:
         self,
         beam_width: int = 5,
         max_steps: int = 10,
-        seed: int | None = None
+        seed: int | None = None,
+        engine: str = "auto",
+        scoring: str = "full",
+        dedup: bool = False,
+        score_cache: ScoreCache | None = None,
+        workers: int = 1,
+        scorer: str = DEFAULT_SCORER,
+        stopping: StoppingRules | None = None,
+        deadline_ms: int | float | None = None,
+        budget_clock: str = "wall",
+        trace: str = "full",
+        trace_every: int = DEFAULT_TRACE_EVERY
     ):
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"scoring must be one of {', '.join(SCORING_MODES)}")
+        if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive integer")
+        if workers > MAX_WORKERS:
+            raise ValueError(f"workers must be at most {MAX_WORKERS}")
+        if workers > 1 and engine == "python":
+            raise ValueError("workers > 1 requires the numpy engine")
+        if not isinstance(scorer, str):
+            raise ValueError("scorer must be a string")
+        if deadline_ms is not None and (
+            isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0
+        ):
+            raise ValueError("deadline_ms must be a positive number")
+        if budget_clock not in BUDGET_CLOCKS:
+            raise ValueError(f"budget_clock must be one of {', '.join(BUDGET_CLOCKS)}")
+        if trace not in TRACE_LEVELS:
+            raise ValueError(f"trace must be one of {', '.join(TRACE_LEVELS)}")
+        if isinstance(trace_every, bool) or not isinstance(trace_every, int) or trace_every < 1:
+            raise ValueError("trace_every must be a positive integer")
+        self.plugin = load_scorer(scorer)
+        if scorer != DEFAULT_SCORER and engine == "python":
+            raise ValueError("Scorer plugins require the numpy engine")
         self.beam_width = beam_width
         self.max_steps = max_steps
         self.seed = seed
+        self.engine = engine
+        self.scoring = scoring
+        self.dedup = dedup
+        self.score_cache = score_cache
+        self.workers = workers
+        self.scorer = scorer
+        self.stopping = stopping
+        self.deadline_ms = deadline_ms
+        self.budget_clock = budget_clock
+        self.trace = trace
+        self.trace_every = trace_every
         self.rng = random.Random(seed if seed is not None else _compute_hash({"default": True}))
+        # Runs starting from any other RNG state do not follow the search key
+        self._seeded_state = self.rng.getstate()
+    
+    @classmethod
+    def from_checkpoint(cls, checkpoint: Checkpoint, additional_steps: int, **options: Any) -> "BeamSimulator":
+        """
+        Build a simulator that extends a checkpointed run by additional_steps.
+        
+        The settings that decide the search (beam width, seed, engine,
+        scoring, dedup, scorer) come from the checkpoint; options passes the
+        rest (score_cache, workers, deadline_ms, ...) to the constructor.
+        
+        Raises:
+            ValueError: If additional_steps is not a positive integer
+        """
+        if isinstance(additional_steps, bool) or not isinstance(additional_steps, int) or additional_steps < 1:
+            raise ValueError("additional_steps must be a positive integer")
+        config = checkpoint.config
+        return cls(
+            beam_width=config["beam_width"],
+            max_steps=checkpoint.step + additional_steps,
+            seed=config["seed"],
+            engine=config["engine"],
+            scoring=config["scoring"],
+            dedup=config["dedup"],
+            scorer=config["scorer"],
+            **options
+        )
+    
+    @classmethod
+    def from_replay(cls, settings: dict[str, Any], **options: Any) -> "BeamSimulator":
+        """
+        Build a simulator that repeats a run recorded with replay_settings.
+        
+        Raises:
+            ValueError: If the run was recorded by another engine version,
+                whose search this one may not reproduce
+        """
+        if settings.get("engine_version") != ENGINE_VERSION:
+            raise ValueError("Run was recorded by another engine version and cannot be replayed")
+        stopping = settings["stopping"]
+        return cls(
+            beam_width=settings["beam_width"],
+            max_steps=settings["max_steps"],
+            seed=settings["seed"],
+            engine=settings["engine"],
+            scoring=settings["scoring"],
+            dedup=settings["dedup"],
+            scorer=settings["scorer"],
+            # Results do not depend on the worker count, so a run recorded on
+            # a machine with more CPUs replays with as many as this one has
+            workers=min(settings.get("workers", 1), MAX_WORKERS),
+            stopping=StoppingRules(**stopping) if stopping is not None else None,
+            trace=settings["trace"],
+            trace_every=settings["trace_every"],
+            **options
+        )
+    
+    def replay_settings(self, termination: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        Everything besides the scenario and constraints needed to run this
+        simulator's search again with the same result and trace.
+        
+        Given the termination of a run cut short by its deadline or by
+        cancellation, the replay stops at the step the run reached: the
+        beams and trace up to there do not depend on what cut it short.
+        Workers are kept too, so the replay takes about as long as the run.
+        """
+        stopping = self.stopping if self.stopping is not None and self.stopping.enabled else None
+        max_steps = self.max_steps
+        if termination is not None and termination["truncated"]:
+            max_steps = termination["step"]
+        return {
+            "beam_width": self.beam_width,
+            "max_steps": max_steps,
+            "seed": self.seed,
+            "engine": self.engine,
+            "scoring": self.scoring,
+            "dedup": self.dedup,
+            "scorer": self.scorer,
+            "workers": self.workers,
+            "stopping": asdict(stopping) if stopping is not None else None,
+            "trace": self.trace,
+            "trace_every": self.trace_every,
+            "engine_version": ENGINE_VERSION
+        }
+    
+    def _config(self) -> dict[str, Any]:
+        """The settings a checkpoint needs to reproduce this simulator's search."""
+        return {
+            "beam_width": self.beam_width,
+            "seed": self.seed,
+            "engine": self.engine,
+            "scoring": self.scoring,
+            "dedup": self.dedup,
+            "scorer": self.scorer,
+            "score_cache": self.score_cache is not None
+        }
+    
+    def search_key(self, scenario: dict[str, Any], constraints: dict[str, Any] | None = None) -> str:
+        """
+        Hash of everything that decides the beam after each step.
+        
+        maxSteps, stopping rules, deadlines, the engine and the score cache
+        only decide where a search stops or how fast it runs, so runs that
+        differ only in those share a key and their prefixes. Key order
+        counts: reordering initial_state changes the field order, the order
+        random action values are drawn in and the order scores are summed in.
+        """
+        return ordered_hash({
+            "scenario": scenario,
+            "constraints": constraints or {},
+            "beam_width": self.beam_width,
+            "seed": self.seed,
+            "scoring": self.scoring,
+            "dedup": self.dedup,
+            "scorer": self.scorer,
+            "engine_version": ENGINE_VERSION
+        })[:16]
+    
+    def request_key(
+        self,
+        scenario: dict[str, Any],
+        constraints: dict[str, Any] | None = None,
+        persistence: str = "full"
+    ) -> str:
+        """
+        Content hash of everything that decides a completed run's result.
+        
+        The search key plus max_steps, the stopping rules, the trace level
+        the result is recorded at and how it is persisted (a replayable run
+        stores no trace). Deadlines, the engine, workers and the score cache
+        do not change the result of a run that finishes, so they are left
+        out.
+        """
+        stopping = self.stopping if self.stopping is not None and self.stopping.enabled else None
+        return ordered_hash({
+            "search": self.search_key(scenario, constraints),
+            "scenario": scenario,
+            "constraints": constraints or {},
+            "max_steps": self.max_steps,
+            "stopping": asdict(stopping) if stopping is not None else None,
+            "trace": self.trace,
+            "trace_every": self.trace_every if self.trace == "sampled" else None,
+            "persistence": persistence,
+            "engine_version": ENGINE_VERSION
+        })
+    
+    def _restore_beam(
+        self,
+        entries: list[dict[str, Any]],
+        labels: ActionLabels,
+        path_key: str = "path"
+    ) -> list[SimulationState]:
+        """Rebuild a stored beam, re-interning its paths and fingerprinting its states."""
+        beam = []
+        for entry in entries:
+            path = None
+            for label in entry[path_key]:
+                path = PathNode(path, labels.intern_label(label))
+            values = dict(entry["values"])
+            beam.append(SimulationState(
+                values=values,
+                score=entry["score"],
+                path=path,
+                fingerprint=state_fingerprint(values) if self.dedup else 0,
+                exact_fingerprint=state_fingerprint(values, 0) if self.score_cache is not None else 0
+            ))
+        return beam
+    
+    def _create_engine(
+        self,
+        scenario: CompiledScenario,
+        constraints: CompiledConstraints,
+        labels: ActionLabels,
+        cache_scope: str,
+        plugin: ScoringPlugin | None
+    ):
+        """
+        Pick the expansion engine for a run.
+        
+        "auto" uses the numpy engine when numpy is installed and the scenario
+        fits its fixed-schema array layout, else the reference engine. Both
+        produce identical results, so the choice only affects speed. Only
+        the numpy engine parallelizes; with "auto" a scenario that falls
+        back to the reference engine runs serially. A numpy run whose ints
+        grow past float64's exact range finishes on the reference engine.
+        
+        Scorer plugins (anything but the default scorer) are called with
+        candidate arrays, so they need the numpy engine.
+        """
+        if self.engine != "python":
+            import vectorized
+            
+            if not vectorized.HAS_NUMPY:
+                if self.engine == "numpy":
+                    raise ValueError("engine 'numpy' requires numpy to be installed")
+                if plugin is not None:
+                    raise ValueError("Scorer plugins require numpy to be installed")
+            else:
+                engine = vectorized.create_engine(
+                    scenario, constraints, self.rng, labels, self.scoring, self.dedup,
+                    self.score_cache, cache_scope, self.workers, plugin
+                )
+                if engine is not None:
+                    return engine
+        if plugin is not None:
+            raise ValueError(
+                f"Scorer '{self.scorer}' needs a fixed-schema numeric scenario the numpy engine can run"
+            )
+        return PythonEngine(
+            scenario, constraints, self.rng, labels, self.scoring, self.dedup,
+            self.score_cache, cache_scope, scenario.objective
+        )
     
     def run(
         self,
         run_id: str,
         scenario: dict[str, Any],
-        constraints: dict[str, Any] | None = None
+        constraints: dict[str, Any] | None = None,
+        cancellation: CancellationToken | None = None,
+        progress: Callable[[StepProgress], None] | None = None,
+        resume: Checkpoint | None = None,
+        checkpoint_every: int | None = None,
+        on_checkpoint: Callable[[Checkpoint], None] | None = None,
+        prefix: Prefix | None = None,
+        trace_sink: TraceSink | None = None
     ) -> SimulationResult:
         """
         Execute beam search simulation.
         
         Args:
             run_id: Unique identifier for this run
-            scenario: Must contain 'initial_state' dict
+            scenario: Must contain 'initial_state' dict; may carry an
+                'objective' expression replacing the value sum (default
+                scorer only)
             constraints: Optional constraints like max_x, min_y
+            cancellation: Optional token another thread can cancel to stop
+                the run at its next safe point
+            progress: Optional callback invoked with a StepProgress after
+                every completed step, on the thread running the search
+            resume: Optional checkpoint of this scenario to continue from
+                instead of the initial state; use continue_run
+            checkpoint_every: With on_checkpoint, also checkpoint after
+                every this many completed steps
+            on_checkpoint: Callback invoked with each periodic Checkpoint,
+                on the thread running the search
+            prefix: Optional stored search with this run's search_key; the
+                steps it covers are taken from it instead of searched
+            trace_sink: Optional sink the trace is written to as the steps
+                complete, instead of being kept in intermediate_states
+        
+        Raises:
+            ValueError: If the scenario has no initial_state object, its
+                actions are not a list of objects, its objective is
+                invalid, a constraint key or limit is malformed, the
+                scorer plugin cannot run on this scenario, resume cannot
+                be continued to max_steps, or prefix has a different key
         
         Returns:
-            SimulationResult with best result, top-k, and trace
+            SimulationResult with best result, top-k, trace, the reason
+            the search ended, and a checkpoint to continue from (None if
+            cancelled). If deadline_ms runs out (measured from the
+            start of the call on budget_clock), the last completed beam is
+            returned and termination is flagged as truncated. A resumed
+            run's trace starts at the checkpointed beam and its stats
+            include the checkpoint's. A run given a prefix returns what a
+            freshly constructed simulator would, with stats.reused_steps
+            counting the steps taken from the prefix.
+            intermediate_states is recorded at the simulator's trace level
+            (see TraceRecorder) and described by the result's trace; with
+            a trace_sink it is empty, as is the trace of its prefix.
         """
+        started = time.monotonic()
+        budget = Budget(self.deadline_ms, self.budget_clock) if self.deadline_ms is not None else None
+        if checkpoint_every is not None and (
+            isinstance(checkpoint_every, bool) or not isinstance(checkpoint_every, int) or checkpoint_every < 1
+        ):
+            raise ValueError("checkpoint_every must be a positive integer")
+        if resume is not None:
+            if not resume.beam:
+                raise ValueError("Run ended with an empty beam and cannot be continued")
+            if resume.step >= self.max_steps:
+                raise ValueError("max_steps must be greater than the checkpoint's step")
+            if prefix is not None:
+                raise ValueError("resume and prefix cannot be combined")
+        if prefix is not None and prefix.key != self.search_key(scenario, constraints):
+            raise ValueError("prefix was recorded for a different search")
+        
         constraints = constraints or {}
+        compiled_constraints = compile_constraints(constraints)
         
         # Initialize with scenario's initial state
         initial_state = scenario.get("initial_state", {})
         if not initial_state:
             raise ValueError("Scenario must contain 'initial_state'")
         
-        # Create initial beam
-        initial_breakdown = _default_score_function(initial_state, constraints)
-        initial_score = sum(initial_breakdown.values())
+        # Compiled once per distinct scenario, not once per run
+        compiled_scenario = compile_scenario(scenario)
+        objective = compiled_scenario.objective
+        if self.scorer == DEFAULT_SCORER:
+            scorer, plugin = DefaultScorer(objective), None
+        elif objective is not None:
+            raise ValueError("objective is only supported by the default scorer")
+        else:
+            scorer = plugin = self.plugin
+        
+        labels = ActionLabels()
+        fields = list(compiled_scenario.numeric_fields)
+        cache_scope = ""
+        if self.score_cache is not None:
+            # Scores are summed in field order, so two states with equal
+            # values but differently ordered fields may score differently.
+            scope: dict[str, Any] = {"constraints": constraints, "fields": fields}
+            if objective is not None or plugin is not None:
+                scope["objective"] = objective.expression if objective is not None else None
+                scope["scorer"] = self.scorer
+            cache_scope = ordered_hash(scope)[:16]
+        engine = self._create_engine(compiled_scenario, compiled_constraints, labels, cache_scope, plugin)
+        engine.safe_point = _safe_point(budget, cancellation)
         
-        beam: list[SimulationState] = [
-            SimulationState(
-                values=initial_state.copy(),
-                score=initial_score,
-                history=["initial"]
+        def current_stats() -> dict[str, Any]:
+            stats: dict[str, Any] = {}
+            if self.dedup:
+                stats["duplicates_collapsed"] = engine.duplicates
+            if self.score_cache is not None:
+                # Counted by the engine: the cache's own counters are shared
+                # with every run using it at the same time
+                stats["score_cache"] = {"hits": engine.cache_hits, "misses": engine.cache_misses}
+            return _merge_stats(base_stats, stats)
+        
+        def checkpoint(step: int) -> Checkpoint:
+            return Checkpoint(
+                run_id=run_id,
+                step=step,
+                beam=[
+                    {"values": s.values.copy(), "score": s.score, "path": labels.render(s.path)}
+                    for s in beam
+                ],
+                rng_state=rng_state,
+                config=self._config(),
+                scenario=scenario,
+                constraints=constraints,
+                stats=current_stats()
             )
-        ]
         
-        intermediate_states: list[list[dict[str, Any]]] = []
+        stopping = self.stopping if self.stopping is not None and self.stopping.enabled else None
+        monitor = None
+        recorder = TraceRecorder(labels, self.trace, self.trace_every, trace_sink)
+        termination = {"reason": MAX_STEPS, "step": self.max_steps}
+        end_step = self.max_steps
+        # Parents of a beam restored from a prefix, for the trace
+        beam_parents: list[int] | None = None
         
-        # Run beam search
-        for step in range(self.max_steps):
-            # Record intermediate state
-            intermediate_states.append([
-                {"values": s.values.copy(), "score": s.score, "history": s.history.copy()}
-                for s in beam
-            ])
-            
-            candidates: list[SimulationState] = []
+        def interruption(step: int) -> dict[str, Any] | None:
+            """The termination of a run cancelled or out of time before step, if it is."""
+            if cancellation is not None and cancellation.cancelled:
+                return {"reason": CANCELLED, "step": step}
+            if budget is not None and budget.expired():
+                return {"reason": DEADLINE, "step": step}
+            return None
+        
+        if resume is not None:
+            # Continue from the checkpointed beam and RNG position
+            beam = self._restore_beam(resume.beam, labels)
+            self.rng.setstate(resume.rng_state)
+            start_step = resume.step
+            base_stats = resume.stats
+        elif prefix is not None:
+            # Follow the stored search as far as it answers this run, checking
+            # cancellation and the deadline between stored steps as between
+            # searched ones, and the stopping rules against each stored beam.
+            # Read in order, so a trace held on disk is streamed, not loaded whole
+            start_step = min(prefix.steps, self.max_steps)
+            records = iter(prefix.trace)
+            record = next(records)
+            if stopping is not None:
+                monitor = StopMonitor(stopping, _stored_beam(record))
+            for step in range(start_step):
+                stop = interruption(step)
+                if stop is not None:
+                    termination = stop
+                    start_step = end_step = step
+                    break
+                following = next(records)
+                reason = monitor.observe(_stored_beam(following)) if monitor is not None else None
+                recorder.record_stored(step, record, prefix.parents[step])
+                record = following
+                if reason is not None:
+                    termination = {"reason": reason, "step": step + 1}
+                    start_step = end_step = step + 1
+                    break
+            beam = self._restore_beam(record, labels, "history")
+            beam_parents = prefix.parents[start_step]
+            self.rng.setstate(prefix.rng_states[start_step])
+            base_stats = {}
+            if self.dedup:
+                base_stats["duplicates_collapsed"] = prefix.duplicates[start_step]
+        else:
+            # Create initial beam
+            initial_breakdown = scorer.score_state(initial_state, compiled_constraints, fields)
+            initial_score = sum(initial_breakdown.values())
             
-            for state in beam:
-                actions = _generate_actions(state.values, scenario, self.rng)
+            beam = [
+                SimulationState(
+                    values=initial_state.copy(),
+                    score=initial_score,
+                    path=PathNode(None, ActionLabels.INITIAL),
+                    fingerprint=state_fingerprint(initial_state) if self.dedup else 0,
+                    exact_fingerprint=(
+                        state_fingerprint(initial_state, 0) if self.score_cache is not None else 0
+                    )
+                )
+            ]
+            start_step = 0
+            base_stats = {}
+        if monitor is None and stopping is not None:
+            monitor = StopMonitor(stopping, beam)
+        
+        # RNG position after the last completed step; an abandoned step has
+        # already drawn from the generator
+        rng_state = self.rng.getstate()
+        
+        # Per-step RNG states, parents and duplicate counts for this run's
+        # prefix, recorded only while the search is the one its key
+        # describes and its trace holds every beam
+        rng_states: list[Any] | None = None
+        parents: list[list[int]] = []
+        duplicates: list[int] = []
+        if self.trace == "full" and prefix is not None:
+            rng_states = prefix.rng_states[:start_step + 1]
+            parents = prefix.parents[:start_step + 1]
+            duplicates = prefix.duplicates[:start_step + 1] if self.dedup else []
+        elif self.trace == "full" and resume is None and rng_state == self._seeded_state:
+            rng_states = [rng_state]
+            parents = [[]]
+            duplicates = [0] if self.dedup else []
+        duplicates_before = duplicates[-1] if duplicates else 0
+        
+        # Run beam search
+        try:
+            for step in range(start_step, end_step):
+                stop = interruption(step)
+                if stop is not None:
+                    termination = stop
+                    break
+                
+                # Record intermediate state
+                recorder.record(step, beam, parents=beam_parents)
+                
+                try:
+                    expanded = engine.expand(beam, self.beam_width)
+                except StepInterrupted as interrupted:
+                    # Keep the last completed beam; it is recorded again below
+                    recorder.discard_last(step)
+                    termination = {"reason": interrupted.reason, "step": step}
+                    break
+                rng_state = self.rng.getstate()
+                if rng_states is not None:
+                    rng_states.append(rng_state)
+                    index = {id(s.path): i for i, s in enumerate(beam)}
+                    parents.append([index.get(id(s.path.parent), -1) for s in expanded])
+                    if self.dedup:
+                        duplicates.append(duplicates_before + engine.duplicates)
+                beam, beam_parents = expanded, None
                 
-                for action in actions:
-                    new_values = _apply_action(state.values, action)
-                    breakdown = _default_score_function(new_values, constraints)
-                    new_score = sum(breakdown.values())
-                    
-                    action_desc = f"{action.get('type', 'unknown')}({action.get('field', '')})"
-                    candidates.append(SimulationState(
-                        values=new_values,
-                        score=new_score,
-                        history=state.history + [action_desc]
+                if not beam:
+                    termination = {"reason": BEAM_EXHAUSTED, "step": step + 1}
+                    break
+                
+                if progress is not None:
+                    progress(StepProgress(
+                        step=step + 1,
+                        max_steps=self.max_steps,
+                        best_score=beam[0].score,
+                        beam_size=len(beam),
+                        candidates_evaluated=engine.evaluated,
+                        elapsed_ms=(time.monotonic() - started) * 1000
                     ))
-            
-            # Keep top beam_width candidates
-            candidates.sort(key=lambda s: s.score, reverse=True)
-            beam = candidates[:self.beam_width]
-            
-            if not beam:
-                break
+                
+                if (
+                    on_checkpoint is not None
+                    and checkpoint_every is not None
+                    and (step + 1) % checkpoint_every == 0
+                    and step + 1 < self.max_steps
+                ):
+                    on_checkpoint(checkpoint(step + 1))
+                
+                if monitor is not None:
+                    reason = monitor.observe(beam)
+                    if reason is not None:
+                        termination = {"reason": reason, "step": step + 1}
+                        break
+        finally:
+            engine.close()
+        termination["truncated"] = termination["reason"] in TRUNCATING_REASONS
         
         # Record final state
-        intermediate_states.append([
-            {"values": s.values.copy(), "score": s.score, "history": s.history.copy()}
-            for s in beam
-        ])
+        recorder.record(termination["step"], beam, final=True, parents=beam_parents)
+        recorder.finish()
         
         # Get best result
         best = beam[0] if beam else SimulationState(values=initial_state, score=0.0)
-        best_breakdown = _default_score_function(best.values, constraints)
+        best_breakdown = scorer.score_state(best.values, compiled_constraints, fields)
+        
+        stats = current_stats()
+        if prefix is not None:
+            stats["reused_steps"] = start_step
+        
+        final_checkpoint = None
+        final_prefix = None
+        if termination["reason"] != CANCELLED:
+            final_checkpoint = checkpoint(termination["step"])
+            if rng_states is not None and len(rng_states) > 1 and beam:
+                final_prefix = Prefix(
+                    key=self.search_key(scenario, constraints),
+                    scenario=scenario,
+                    constraints=constraints,
+                    trace=recorder.records if trace_sink is None else None,
+                    rng_states=rng_states,
+                    parents=parents,
+                    duplicates=duplicates
+                )
         
         return SimulationResult(
             run_id=run_id,
             best_result={
                 "values": best.values,
                 "score": best.score,
-                "path": best.history
+                "path": labels.render(best.path)
             },
             top_k=[
-                {"values": s.values, "score": s.score, "path": s.history}
+                {"values": s.values, "score": s.score, "path": labels.render(s.path)}
                 for s in beam[:self.beam_width]
             ],
             score_breakdown=best_breakdown,
-            intermediate_states=intermediate_states,
+            intermediate_states=recorder.records,
             scenario=scenario,
-            constraints=constraints
+            constraints=constraints,
+            stats=stats,
+            termination=termination,
+            checkpoint=final_checkpoint,
+            prefix=final_prefix,
+            trace=recorder.metadata()
+        )
+    
+    def continue_run(
+        self,
+        checkpoint: Checkpoint,
+        cancellation: CancellationToken | None = None,
+        progress: Callable[[StepProgress], None] | None = None,
+        checkpoint_every: int | None = None,
+        on_checkpoint: Callable[[Checkpoint], None] | None = None,
+        trace_sink: TraceSink | None = None
+    ) -> SimulationResult:
+        """
+        Continue a checkpointed run up to max_steps (see from_checkpoint).
+        
+        Raises:
+            ValueError: As for run
+        """
+        return self.run(
+            checkpoint.run_id,
+            checkpoint.scenario,
+            checkpoint.constraints,
+            cancellation,
+            progress,
+            resume=checkpoint,
+            checkpoint_every=checkpoint_every,
+            on_checkpoint=on_checkpoint,
+            trace_sink=trace_sink
         )
     
     def explain(self, result: SimulationResult) -> str:
@@ -225,13 +1584,45 @@ class BeamSimulator:
             "## Initial Scenario",
             f"Starting state: {result.scenario.get('initial_state', {})}",
             f"Constraints applied: {result.constraints or 'None'}",
+        ]
+        
+        if "objective" in result.scenario:
+            lines.append(f"Objective: {result.scenario['objective']}")
+        
+        # Sampled and empty traces hold fewer records than the run had beams
+        level = result.trace.get("level", "full")
+        explored = len(result.intermediate_states)
+        if level in ("sampled", "none") and "step" in result.termination:
+            explored = result.termination["step"] + 1
+        
+        lines.extend([
             "",
             "## Search Process",
-            f"The beam search explored {len(result.intermediate_states)} steps,",
+            f"The beam search explored {explored} steps,",
             f"keeping the top {len(result.top_k)} candidates at each step.",
+        ])
+        
+        if level == "sampled":
+            lines.append(f"The trace records the beam every {result.trace.get('every')} steps and after the last.")
+        elif level != "full":
+            lines.append(f"The trace was recorded at level '{level}'.")
+        
+        reason = result.termination.get("reason", MAX_STEPS)
+        if reason != MAX_STEPS:
+            lines.append(
+                f"The search stopped after step {result.termination.get('step')}: "
+                f"{_TERMINATION_DESCRIPTIONS.get(reason, reason)}."
+            )
+        
+        if "duplicates_collapsed" in result.stats:
+            lines.append(
+                f"{result.stats['duplicates_collapsed']} duplicate candidates were collapsed before selection."
+            )
+        
+        lines.extend([
             "",
             "## Winning Path",
-        ]
+        ])
         
         for i, step in enumerate(result.best_result.get("path", [])):
             lines.append(f"  {i}. {step}")
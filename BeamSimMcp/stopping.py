@@ -0,0 +1,176 @@
+"""
+Early-termination rules and time budgets for beam search.
+
+Rules are checked after every expansion step against the new beam; the
+first one that fires ends the run. A Budget or CancellationToken is checked
+between steps and by the engines at safe points inside a step; when it
+runs out or is cancelled, the step in progress is abandoned and the last
+completed beam is returned, flagged as truncated. The result's termination
+record says why the run ended and after how many completed steps.
+"""
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from fingerprint import state_fingerprint
+
+# Termination reasons
+MAX_STEPS = "max_steps"
+BEAM_EXHAUSTED = "beam_exhausted"
+PLATEAU = "plateau"
+MIN_IMPROVEMENT = "min_improvement"
+GOAL = "goal"
+STABLE_BEAM = "stable_beam"
+DEADLINE = "deadline"
+CANCELLED = "cancelled"
+
+# Reasons that cut the search short of what was asked for
+TRUNCATING_REASONS = frozenset({DEADLINE, CANCELLED})
+
+BUDGET_CLOCKS = ("wall", "cpu")
+
+# Floor for the relative-improvement denominator when the best score is ~0
+_RELATIVE_FLOOR = 1e-12
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+@dataclass(frozen=True)
+class StoppingRules:
+    """
+    Configurable stopping rules; any left unset is disabled.
+    
+    plateau_steps: stop once the best score has not improved for this many
+        consecutive steps.
+    min_improvement: stop after a step that raises the best score by less
+        than this fraction of its previous value.
+    goal_score: stop as soon as the best score reaches this value.
+    stable_beam: stop when a step produces the same set of states as the
+        beam it expanded.
+    """
+    plateau_steps: int | None = None
+    min_improvement: float | None = None
+    goal_score: float | None = None
+    stable_beam: bool = False
+    
+    def __post_init__(self):
+        if self.plateau_steps is not None and (
+            not isinstance(self.plateau_steps, int)
+            or isinstance(self.plateau_steps, bool)
+            or self.plateau_steps < 1
+        ):
+            raise ValueError("plateau_steps must be a positive integer")
+        if self.min_improvement is not None and (
+            not _is_number(self.min_improvement) or self.min_improvement < 0
+        ):
+            raise ValueError("min_improvement must be a non-negative number")
+        if self.goal_score is not None and not _is_number(self.goal_score):
+            raise ValueError("goal_score must be a number")
+        if not isinstance(self.stable_beam, bool):
+            raise ValueError("stable_beam must be a boolean")
+    
+    @property
+    def enabled(self) -> bool:
+        return (
+            self.plateau_steps is not None
+            or self.min_improvement is not None
+            or self.goal_score is not None
+            or self.stable_beam
+        )
+
+
+class StepInterrupted(Exception):
+    """Raised inside an engine to abandon the step in progress."""
+    
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Budget:
+    """
+    A time budget measured on the wall clock or on process CPU time.
+    
+    check() is cheap enough to call once per expanded state.
+    """
+    
+    def __init__(self, milliseconds: int | float, clock: str = "wall"):
+        if clock not in BUDGET_CLOCKS:
+            raise ValueError(f"budget clock must be one of {', '.join(BUDGET_CLOCKS)}")
+        self._now: Callable[[], float] = time.monotonic if clock == "wall" else time.process_time
+        self.expires_at = self._now() + milliseconds / 1000
+    
+    def expired(self) -> bool:
+        return self._now() >= self.expires_at
+    
+    def check(self) -> None:
+        """Raise StepInterrupted if the budget has run out."""
+        if self._now() >= self.expires_at:
+            raise StepInterrupted(DEADLINE)
+
+
+class CancellationToken:
+    """Thread-safe flag a caller sets to make a run stop at its next safe point."""
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self) -> None:
+        self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def check(self) -> None:
+        """Raise StepInterrupted if cancellation was requested."""
+        if self._event.is_set():
+            raise StepInterrupted(CANCELLED)
+
+
+class StopMonitor:
+    """Tracks one run's progress against a set of stopping rules."""
+    
+    def __init__(self, rules: StoppingRules, initial_beam: list[Any]):
+        self.rules = rules
+        self.best = initial_beam[0].score if initial_beam else None
+        self.stale_steps = 0
+        self._membership = self._members(initial_beam) if rules.stable_beam else None
+    
+    @staticmethod
+    def _members(beam: list[Any]) -> Counter:
+        return Counter(state_fingerprint(s.values, 0) for s in beam)
+    
+    def observe(self, beam: list[Any]) -> str | None:
+        """Record the beam a step produced; return the rule that fired, if any."""
+        rules = self.rules
+        score = beam[0].score
+        previous = self.best
+        improved = previous is None or score > previous
+        
+        if improved:
+            self.best = score
+            self.stale_steps = 0
+        else:
+            self.stale_steps += 1
+        
+        if rules.goal_score is not None and score >= rules.goal_score:
+            return GOAL
+        if rules.plateau_steps is not None and self.stale_steps >= rules.plateau_steps:
+            return PLATEAU
+        if rules.min_improvement is not None and previous is not None:
+            gain = (score - previous) / max(abs(previous), _RELATIVE_FLOOR)
+            if gain < rules.min_improvement:
+                return MIN_IMPROVEMENT
+        if self._membership is not None:
+            membership = self._members(beam)
+            if membership == self._membership:
+                return STABLE_BEAM
+            self._membership = membership
+        return None
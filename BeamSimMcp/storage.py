@@ -1,21 +1,85 @@
 """
-JSON file persistence for simulation runs.
+File persistence for simulation runs, their checkpoints, search prefixes,
+the request-hash index of stored results, and the cross-run score cache.
 Uses asyncio.Lock for single-process concurrency protection.
+
+Runs are kept by one of STORAGE_BACKENDS, chosen with the BEAM_SIM_STORAGE
+environment variable: "log" (default), an append-only segment log under
+runs/ (runlog.RunLog); "sqlite", a WAL-mode database in simulations.db
+(rundb.RunDatabase); or "files", one JSON file per run under run_files/
+(runfiles.RunFiles). The backend is only touched from one dedicated storage
+thread, so the event loop never waits on its I/O. A simulations.json left by
+an earlier version is imported into the backend once.
+A run's trace can be spooled to traces/ while it runs (TraceSpool), one
+record per line; the backend then adopts the file as the run's trace.
 """
 
 import asyncio
+import itertools
 import json
 import os
+import re
+import shutil
 import tempfile
 import uuid
+from collections import OrderedDict
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 import aiofiles
 
+from cache import ScoreCache
+from rundb import RunDatabase
+from runfiles import RunFiles
+from runlog import RunLog
+
+STORAGE_BACKENDS = ("log", "sqlite", "files")
+STORAGE_BACKEND = os.environ.get("BEAM_SIM_STORAGE", "log")
+
+RUN_LOG_DIR = Path(__file__).parent / "runs"
+DATABASE_FILE = Path(__file__).parent / "simulations.db"
+RUN_FILES_DIR = Path(__file__).parent / "run_files"
 STORAGE_FILE = Path(__file__).parent / "simulations.json"
+SCORE_CACHE_FILE = Path(__file__).parent / "score_cache.jsonl"
+CHECKPOINT_DIR = Path(__file__).parent / "checkpoints"
+PREFIX_DIR = Path(__file__).parent / "prefixes"
+RESULT_INDEX_FILE = Path(__file__).parent / "result_index.log"
+TRACE_DIR = Path(__file__).parent / "traces"
+
+# Bytes of trace a spool buffers in memory between writes to disk
+TRACE_BUFFER_BYTES = 1 << 20
+
+# Request hashes kept in the result index, least recently used dropped first
+RESULT_INDEX_SIZE = 100_000
+
+# The result index log is rewritten with only its live entries once it holds
+# this many times RESULT_INDEX_SIZE rows
+RESULT_INDEX_LOG_FACTOR = 2
+
+# The score cache log is rewritten with only its live entries once it holds
+# this many times the cache's max_entries rows
+SCORE_CACHE_LOG_FACTOR = 2
 
 _lock = asyncio.Lock()
+_cache_lock = asyncio.Lock()
+_checkpoint_lock = asyncio.Lock()
+_prefix_lock = asyncio.Lock()
+
+_SEARCH_KEY = re.compile(r"[0-9a-f]{16}")
+
+# Opened on first use; every access holds _lock and runs on _store_thread
+_runs: RunLog | RunDatabase | RunFiles | None = None
+_store_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="beam-sim-storage")
+
+# Rows in the score cache log; only touched on _store_thread
+_score_cache_rows = 0
+
+# Request hash -> run ID, least recently used first, and the rows in its log;
+# read on first use and only touched on _store_thread
+_result_index: OrderedDict[str, str] | None = None
+_result_index_rows = 0
 
 
 def generate_run_id(seed: int | None = None) -> str:
@@ -27,47 +91,406 @@ def generate_run_id(seed: int | None = None) -> str:
     return str(uuid.uuid4())
 
 
-async def _read_storage() -> dict[str, Any]:
-    """Read the storage file, returning empty dict if not exists."""
-    if not STORAGE_FILE.exists():
-        return {}
-    async with aiofiles.open(STORAGE_FILE, "r") as f:
-        content = await f.read()
-        return json.loads(content) if content.strip() else {}
+async def _in_store_thread(func: Any, *args: Any) -> Any:
+    """Call func(*args) on the storage thread."""
+    return await asyncio.get_running_loop().run_in_executor(_store_thread, func, *args)
+
+
+def _open_runs() -> RunLog | RunDatabase | RunFiles:
+    if STORAGE_BACKEND == "sqlite":
+        return RunDatabase(DATABASE_FILE)
+    if STORAGE_BACKEND == "files":
+        return RunFiles(RUN_FILES_DIR)
+    if STORAGE_BACKEND == "log":
+        return RunLog(RUN_LOG_DIR)
+    raise ValueError(f"BEAM_SIM_STORAGE must be one of {', '.join(STORAGE_BACKENDS)}")
 
 
-async def _write_storage(data: dict[str, Any]) -> None:
-    """Write storage atomically via temp file + rename."""
-    dir_path = STORAGE_FILE.parent
+async def _get_runs() -> RunLog | RunDatabase | RunFiles:
+    """
+    Return the run store, opening it the first time.
+    
+    Runs in a legacy simulations.json that the store does not already hold
+    are added to it, and the file is then renamed so this happens once.
+    """
+    global _runs
+    if _runs is None:
+        runs = await _in_store_thread(_open_runs)
+        if STORAGE_FILE.exists():
+            async with aiofiles.open(STORAGE_FILE, "r") as f:
+                content = await f.read()
+            legacy = json.loads(content) if content.strip() else {}
+            for run_id, data in legacy.items():
+                if not await _in_store_thread(runs.__contains__, run_id):
+                    await _in_store_thread(runs.put, run_id, data)
+            os.replace(STORAGE_FILE, STORAGE_FILE.with_name(STORAGE_FILE.name + ".imported"))
+        _runs = runs
+    return _runs
+
+
+async def _write_storage(data: Any, path: Path, indent: int | None = None) -> None:
+    """Write a JSON file atomically via temp file + rename."""
+    dir_path = path.parent
     fd, tmp_path = tempfile.mkstemp(dir=dir_path, suffix=".tmp")
     try:
         os.close(fd)
         async with aiofiles.open(tmp_path, "w") as f:
-            await f.write(json.dumps(data, indent=2))
-        os.replace(tmp_path, STORAGE_FILE)
+            await f.write(json.dumps(data, indent=indent))
+        os.replace(tmp_path, path)
     except Exception:
         if os.path.exists(tmp_path):
             os.unlink(tmp_path)
         raise
 
 
-async def save_simulation(run_id: str, data: dict[str, Any]) -> None:
-    """Save a simulation run to storage."""
+class TraceSpool:
+    """
+    Append-only file a run's trace records are written to as its steps complete.
+    
+    Records are written one JSON document per line from the thread running
+    the search, buffered up to TRACE_BUFFER_BYTES. save_simulation hands the
+    file to the run store as the run's trace; discard removes a spool that
+    was not adopted.
+    """
+    
+    def __init__(self):
+        TRACE_DIR.mkdir(exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=TRACE_DIR, suffix=".spool")
+        self.path = Path(path)
+        self._file = os.fdopen(fd, "w", buffering=TRACE_BUFFER_BYTES)
+    
+    def write(self, record: Any) -> None:
+        """Append one trace record."""
+        self._file.write(json.dumps(record))
+        self._file.write("\n")
+    
+    def close(self) -> None:
+        """Flush and close the file; later writes fail."""
+        if not self._file.closed:
+            self._file.close()
+    
+    def discard(self) -> None:
+        """Close and delete the file, unless it has been adopted."""
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+    
+    def records(self) -> Iterator[Any]:
+        """Close the file and read its records back one at a time."""
+        self.close()
+        return iter(StoredTrace(self.path))
+
+
+class StoredTrace(Sequence):
+    """
+    Trace records in a file, one JSON document per line, read on demand.
+    
+    Only the record count is kept in memory; iterating streams the file, so
+    a prefix's trace can be followed without loading it.
+    """
+    
+    def __init__(self, path: Path, count: int | None = None):
+        self.path = path
+        self._count = count
+    
+    @classmethod
+    def open(cls, path: Path) -> "StoredTrace | None":
+        """The trace in path with its records counted, or None if it is missing."""
+        try:
+            with open(path, "rb") as f:
+                return cls(path, sum(1 for line in f if line.strip()))
+        except FileNotFoundError:
+            return None
+    
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = sum(1 for _ in self)
+        return self._count
+    
+    def __iter__(self) -> Iterator[Any]:
+        with open(self.path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        record = next(itertools.islice(self, index, None), None) if index >= 0 else None
+        if record is None:
+            raise IndexError("trace record index out of range")
+        return record
+
+
+async def save_simulation(run_id: str, data: dict[str, Any], spool: TraceSpool | None = None) -> None:
+    """
+    Save a simulation run to storage.
+    
+    With a spool, the run store adopts the spooled file as the run's trace,
+    in place of data's intermediate_states, rather than it being
+    serialized again.
+    """
     async with _lock:
-        storage = await _read_storage()
-        storage[run_id] = data
-        await _write_storage(storage)
+        runs = await _get_runs()
+        if spool is not None:
+            spool.close()
+            await _in_store_thread(runs.put, run_id, data, spool.path)
+        else:
+            await _in_store_thread(runs.put, run_id, data)
 
 
 async def get_simulation(run_id: str) -> dict[str, Any] | None:
     """Retrieve a simulation run by ID."""
     async with _lock:
-        storage = await _read_storage()
-        return storage.get(run_id)
+        runs = await _get_runs()
+        return await _in_store_thread(runs.get, run_id)
 
 
 async def list_simulations() -> list[str]:
     """List all simulation run IDs."""
     async with _lock:
-        storage = await _read_storage()
-        return list(storage.keys())
+        runs = await _get_runs()
+        return await _in_store_thread(runs.run_ids)
+
+
+def _run_path(directory: Path, run_id: str, suffix: str = ".json") -> Path | None:
+    """File for a run in directory, or None if run_id is not a run ID."""
+    try:
+        canonical = str(uuid.UUID(run_id))
+    except (TypeError, ValueError):
+        return None
+    return directory / f"{canonical}{suffix}" if canonical == run_id else None
+
+
+def _checkpoint_path(run_id: str) -> Path | None:
+    """Checkpoint file for a run, or None if run_id is not a run ID."""
+    return _run_path(CHECKPOINT_DIR, run_id)
+
+
+async def save_checkpoint(run_id: str, data: dict[str, Any]) -> None:
+    """Save a run's latest checkpoint, replacing any earlier one."""
+    path = _checkpoint_path(run_id)
+    if path is None:
+        raise ValueError(f"Invalid run ID: {run_id}")
+    async with _checkpoint_lock:
+        CHECKPOINT_DIR.mkdir(exist_ok=True)
+        await _write_storage(data, path, indent=None)
+
+
+async def get_checkpoint(run_id: str) -> dict[str, Any] | None:
+    """Retrieve a run's latest checkpoint, if one was saved."""
+    path = _checkpoint_path(run_id)
+    if path is None:
+        return None
+    async with _checkpoint_lock:
+        if not path.exists():
+            return None
+        async with aiofiles.open(path, "r") as f:
+            content = await f.read()
+        return json.loads(content) if content.strip() else None
+
+
+def _share_file(source: Path, target: Path) -> None:
+    """Atomically make target a copy of source, hard-linking when possible."""
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        os.unlink(tmp_path)
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+async def save_prefix(key: str, data: dict[str, Any], spool: TraceSpool | None = None) -> None:
+    """
+    Save the longest known search for a search key, replacing any earlier one.
+    
+    With a spool, its file is taken as the prefix's trace in place of
+    data's; it must be saved here before save_simulation adopts it.
+    """
+    if not _SEARCH_KEY.fullmatch(key):
+        raise ValueError(f"Invalid search key: {key}")
+    trace_path = PREFIX_DIR / f"{key}.trace.jsonl"
+    async with _prefix_lock:
+        PREFIX_DIR.mkdir(exist_ok=True)
+        if spool is not None:
+            spool.close()
+            # Spools are never written again once closed, so sharing is safe
+            await asyncio.to_thread(_share_file, spool.path, trace_path)
+            data = {**data, "spooled_trace": True}
+        elif trace_path.exists():
+            trace_path.unlink()
+        await _write_storage(data, PREFIX_DIR / f"{key}.json", indent=None)
+
+
+async def get_prefix(key: str, with_trace: bool = True) -> dict[str, Any] | None:
+    """
+    Retrieve the stored search for a search key, if any.
+    
+    A spooled trace is returned as a StoredTrace rather than read into
+    memory; without with_trace, the trace is left out altogether.
+    """
+    if not _SEARCH_KEY.fullmatch(key):
+        return None
+    path = PREFIX_DIR / f"{key}.json"
+    async with _prefix_lock:
+        if not path.exists():
+            return None
+        async with aiofiles.open(path, "r") as f:
+            content = await f.read()
+        data = json.loads(content) if content.strip() else None
+        if data and with_trace and data.get("spooled_trace"):
+            records = await asyncio.to_thread(StoredTrace.open, PREFIX_DIR / f"{key}.trace.jsonl")
+            if records is None:
+                return None
+            data["trace"] = records
+        return data
+
+
+def _open_result_index() -> OrderedDict[str, str]:
+    """
+    Return the request-hash index, reading its log the first time and
+    cutting off a row left incomplete by a crash.
+    """
+    global _result_index, _result_index_rows
+    if _result_index is None:
+        index: OrderedDict[str, str] = OrderedDict()
+        rows = 0
+        if RESULT_INDEX_FILE.exists():
+            offset = 0
+            with open(RESULT_INDEX_FILE, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    key, run_id = json.loads(line)
+                    index[key] = run_id
+                    index.move_to_end(key)
+                    offset += len(line)
+                    rows += 1
+            if offset < RESULT_INDEX_FILE.stat().st_size:
+                os.truncate(RESULT_INDEX_FILE, offset)
+            while len(index) > RESULT_INDEX_SIZE:
+                index.popitem(last=False)
+        _result_index, _result_index_rows = index, rows
+    return _result_index
+
+
+def _index_result(key: str, run_id: str) -> None:
+    """Record key -> run_id in the index and append it to the log."""
+    global _result_index_rows
+    index = _open_result_index()
+    index[key] = run_id
+    index.move_to_end(key)
+    while len(index) > RESULT_INDEX_SIZE:
+        index.popitem(last=False)
+    if _result_index_rows < RESULT_INDEX_LOG_FACTOR * RESULT_INDEX_SIZE:
+        with open(RESULT_INDEX_FILE, "a") as f:
+            f.write(json.dumps([key, run_id]) + "\n")
+        _result_index_rows += 1
+        return
+    # Mostly superseded or evicted rows by now: rewrite with the live
+    # entries, least recently used first, so the order survives a restart
+    fd, tmp_path = tempfile.mkstemp(dir=RESULT_INDEX_FILE.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("".join(json.dumps([k, v]) + "\n" for k, v in index.items()))
+        os.replace(tmp_path, RESULT_INDEX_FILE)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    _result_index_rows = len(index)
+
+
+def _look_up_result(key: str) -> str | None:
+    index = _open_result_index()
+    run_id = index.get(key)
+    if run_id is not None:
+        index.move_to_end(key)
+    return run_id
+
+
+async def save_result_key(key: str, run_id: str) -> None:
+    """
+    Record that the run run_id answers the request with hash key.
+    
+    Only the newest RESULT_INDEX_SIZE request hashes are kept, least
+    recently saved or looked up dropped first.
+    """
+    await _in_store_thread(_index_result, key, run_id)
+
+
+async def get_result_run(key: str) -> str | None:
+    """
+    The run recorded for a request hash, if any.
+    
+    The run may since have been overwritten or continued; callers check the
+    stored run's request_key before serving it.
+    """
+    return await _in_store_thread(_look_up_result, key)
+
+
+def _read_score_cache(cache: ScoreCache) -> None:
+    """Load the score cache log into cache, cutting off a row left incomplete by a crash."""
+    global _score_cache_rows
+    rows = []
+    offset = 0
+    with open(SCORE_CACHE_FILE, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            rows.append(json.loads(line))
+            offset += len(line)
+    if offset < SCORE_CACHE_FILE.stat().st_size:
+        os.truncate(SCORE_CACHE_FILE, offset)
+    cache.load_json(rows)
+    _score_cache_rows = len(rows)
+
+
+def _append_score_cache(cache: ScoreCache) -> None:
+    """Append the entries cache has stored since its last save to the log."""
+    global _score_cache_rows
+    rows = cache.take_unsaved()
+    if not rows:
+        return
+    if _score_cache_rows + len(rows) <= SCORE_CACHE_LOG_FACTOR * cache.max_entries:
+        with open(SCORE_CACHE_FILE, "a") as f:
+            f.write("".join(json.dumps(row) + "\n" for row in rows))
+        _score_cache_rows += len(rows)
+        return
+    # Mostly superseded or evicted rows by now: rewrite with the live entries
+    rows = cache.to_json()
+    fd, tmp_path = tempfile.mkstemp(dir=SCORE_CACHE_FILE.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("".join(json.dumps(row) + "\n" for row in rows))
+        os.replace(tmp_path, SCORE_CACHE_FILE)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    _score_cache_rows = len(rows)
+
+
+async def load_score_cache(cache: ScoreCache) -> None:
+    """Populate a score cache from disk, if one was saved."""
+    async with _cache_lock:
+        if SCORE_CACHE_FILE.exists():
+            await _in_store_thread(_read_score_cache, cache)
+
+
+async def save_score_cache(cache: ScoreCache) -> None:
+    """
+    Persist the entries a score cache has stored since it was last saved, so
+    they survive server restarts. Runs on the storage thread.
+    """
+    async with _cache_lock:
+        await _in_store_thread(_append_score_cache, cache)
@@ -0,0 +1,134 @@
+"""The numpy engine must return exactly what the reference engine does."""
+
+import json
+import random
+
+import pytest
+
+import simulation
+from simulation import BeamSimulator
+
+vectorized = pytest.importorskip("vectorized")
+if not vectorized.HAS_NUMPY:
+    pytest.skip("numpy is not installed", allow_module_level=True)
+
+# Int deltas carry f1 past 2**53 partway through the run
+OVERFLOW = {
+    "initial_state": {"f0": 1, "f1": -141612911756436},
+    "actions": [
+        {"type": "increment", "field": "f0", "delta": 3 ** 33},
+        {"type": "decrement", "field": "f1", "delta": 7 ** 18},
+        {"type": "increment", "field": "f1", "delta": 5 ** 22},
+        {"type": "decrement", "field": "f0", "delta": 11 ** 15}
+    ]
+}
+
+
+def _number(rng: random.Random) -> int | float:
+    return rng.randint(-5, 5) if rng.random() < 0.5 else round(rng.uniform(-5, 5), 3)
+
+
+def _scenario(seed: int, objective: bool) -> tuple[dict, dict]:
+    """A random fixed-schema scenario and constraints; ints make ties likely."""
+    rng = random.Random(seed)
+    fields = [f"f{i}" for i in range(rng.randint(2, 5))]
+    scenario: dict = {"initial_state": {key: _number(rng) for key in fields}}
+    if seed % 3:
+        scenario["actions"] = [
+            {"type": rng.choice(["increment", "decrement", "set"]), "field": rng.choice(fields),
+             "delta": _number(rng), "value": _number(rng)}
+            for _ in range(rng.randint(3, 8))
+        ]
+        for action in scenario["actions"]:
+            action.pop("value" if action["type"] != "set" else "delta")
+    if objective:
+        scenario["objective"] = f"2 * {fields[0]} - abs({fields[-1]}) + min({fields[0]}, 3)"
+    constraints = {f"{rng.choice(['max', 'min'])}_{key}": _number(rng) for key in rng.sample(fields, 2)}
+    return scenario, constraints
+
+
+def _outcome(simulator: BeamSimulator, scenario: dict, constraints: dict | None = None) -> str:
+    result = simulator.run("run", scenario, constraints)
+    return json.dumps([result.best_result, result.top_k, result.intermediate_states])
+
+
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("objective", [False, True])
+@pytest.mark.parametrize("dedup", [False, True])
+@pytest.mark.parametrize("scoring", ["full", "incremental"])
+def test_numpy_engine_matches_reference(seed, objective, dedup, scoring):
+    scenario, constraints = _scenario(seed, objective)
+    options = {"beam_width": 5, "max_steps": 6, "seed": seed, "dedup": dedup, "scoring": scoring}
+    reference = _outcome(BeamSimulator(engine="python", **options), scenario, constraints)
+    assert _outcome(BeamSimulator(engine="numpy", **options), scenario, constraints) == reference
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("objective", [False, True])
+def test_process_pool_matches_reference(monkeypatch, seed, objective):
+    # Send every step to the pool, however small, and split it three ways
+    # even on a machine with fewer CPUs
+    monkeypatch.setattr(vectorized, "PARALLEL_MIN_CANDIDATES", 0)
+    monkeypatch.setattr(simulation, "MAX_WORKERS", 3)
+    scenario, constraints = _scenario(seed, objective)
+    options = {"beam_width": 5, "max_steps": 4, "seed": seed}
+    reference = _outcome(BeamSimulator(engine="python", **options), scenario, constraints)
+    assert _outcome(BeamSimulator(engine="numpy", workers=3, **options), scenario, constraints) == reference
+
+
+@pytest.mark.parametrize("engine", ["numpy", "auto"])
+@pytest.mark.parametrize("constraints", [None, {"max_f0": 10 ** 12}])
+def test_ints_past_float64_range_match_reference(engine, constraints):
+    options = {"beam_width": 4, "max_steps": 6, "seed": 5}
+    reference = _outcome(BeamSimulator(engine="python", **options), OVERFLOW, constraints)
+    assert _outcome(BeamSimulator(engine=engine, **options), OVERFLOW, constraints) == reference
+
+
+def test_workers_are_capped_at_the_cpu_count():
+    with pytest.raises(ValueError, match="at most"):
+        BeamSimulator(engine="numpy", workers=simulation.MAX_WORKERS + 1)
+
+
+def test_runs_share_one_pool_grown_to_the_largest_request(monkeypatch):
+    parallel = pytest.importorskip("parallel")
+    monkeypatch.setattr(parallel.os, "cpu_count", lambda: 4)
+    parallel.shutdown_pool()
+    try:
+        parallel._submit(2, [])
+        first = parallel._pool
+        parallel._submit(1, [])
+        assert parallel._pool is first
+        parallel._submit(3, [])
+        assert parallel._pool is not first and parallel._pool_workers == 3
+        parallel._submit(16, [])
+        assert parallel._pool_workers == 4
+    finally:
+        parallel.shutdown_pool()
+    assert parallel._pool is None
+
+
+def test_exact_fingerprints_hash_ints_like_the_reference():
+    import numpy as np
+    from constraints import compile_constraints
+    from fingerprint import field_hash
+    from scenario import compile_scenario
+    
+    engine = vectorized.create_engine(
+        compile_scenario({"initial_state": {"a": 1, "b": 0.5}}), compile_constraints(None),
+        random.Random(0), simulation.ActionLabels()
+    )
+    values = np.array([-3.0, 2.0 ** 53, 0.5, 7.0])
+    columns = np.array([0, 0, 1, 1])
+    ints = np.array([True, True, False, False])
+    expected = [field_hash(key, value, 0) for key, value in [("a", -3), ("a", 2 ** 53), ("b", 0.5), ("b", 7.0)]]
+    assert engine._hash_cells(columns, values, 0, ints).tolist() == expected
+
+
+def test_fallback_keeps_using_the_score_cache():
+    from cache import ScoreCache
+    
+    options = {"beam_width": 4, "max_steps": 6, "seed": 5}
+    reference = BeamSimulator(engine="python", score_cache=ScoreCache(), **options).run("run", OVERFLOW)
+    result = BeamSimulator(engine="numpy", score_cache=ScoreCache(), **options).run("run", OVERFLOW)
+    assert result.best_result == reference.best_result
+    assert result.stats["score_cache"] == reference.stats["score_cache"]
@@ -0,0 +1,63 @@
+"""A cancelled or timed-out run must return its last completed step, flagged as truncated."""
+
+import itertools
+import json
+
+import pytest
+
+import stopping
+from simulation import BeamSimulator
+from stopping import CANCELLED, DEADLINE, CancellationToken
+
+SCENARIO = {"initial_state": {"x": 0, "y": 1.5, "z": -2}}
+ENGINES = ["python", "numpy"]
+
+
+def _simulator(engine: str, **options) -> BeamSimulator:
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    return BeamSimulator(beam_width=4, seed=5, engine=engine, **options)
+
+
+def _assert_ends_at(result, engine: str, step: int) -> None:
+    """The result is the run's state after step completed steps."""
+    fresh = _simulator(engine, max_steps=step).run("run", SCENARIO)
+    assert len(result.intermediate_states) == step + 1
+    assert json.dumps(result.intermediate_states) == json.dumps(fresh.intermediate_states)
+    assert result.top_k == fresh.top_k
+    assert result.best_result == fresh.best_result
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cancelled_from_the_progress_callback(engine):
+    token = CancellationToken()
+    
+    def progress(update):
+        if update.step == 3:
+            token.cancel()
+    
+    result = _simulator(engine, max_steps=8).run("run", SCENARIO, progress=progress, cancellation=token)
+    assert result.termination == {"reason": CANCELLED, "step": 3, "truncated": True}
+    _assert_ends_at(result, engine, 3)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tiny_deadline_keeps_the_initial_beam(engine):
+    result = _simulator(engine, max_steps=8, deadline_ms=1e-9).run("run", SCENARIO)
+    assert result.termination == {"reason": DEADLINE, "step": 0, "truncated": True}
+    _assert_ends_at(result, engine, 0)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("ticks", [5, 17, 40])
+def test_deadline_inside_a_step_drops_that_step(monkeypatch, engine, ticks):
+    # Every clock read advances a millisecond, so the budget runs out at
+    # some safe point, between steps or inside one
+    clock = itertools.count()
+    monkeypatch.setattr(stopping.time, "monotonic", lambda: next(clock) / 1000)
+    result = _simulator(engine, max_steps=50, deadline_ms=ticks).run("run", SCENARIO)
+    monkeypatch.undo()
+    
+    assert result.termination["reason"] == DEADLINE and result.termination["truncated"]
+    assert 0 < result.termination["step"] < 50
+    _assert_ends_at(result, engine, result.termination["step"])
@@ -0,0 +1,44 @@
+"""Cache keys must tell apart scenarios that differ only in key order."""
+
+from dataclasses import asdict
+
+import scenario
+from cache import ScoreCache
+from simulation import BeamSimulator
+
+SCENARIO = {"initial_state": {"a": 0.1, "b": 1e16, "c": -1e16, "d": 0.2}}
+REORDERED = {"initial_state": {"d": 0.2, "c": -1e16, "b": 1e16, "a": 0.1}}
+
+
+def _result(simulator: BeamSimulator, data: dict) -> dict:
+    result = asdict(simulator.run("run", data))
+    for key in ("prefix", "checkpoint", "stats"):
+        result.pop(key)
+    return result
+
+
+def test_keys_depend_on_key_order():
+    simulator = BeamSimulator(beam_width=4, max_steps=6, seed=5)
+    assert simulator.search_key(SCENARIO) != simulator.search_key(REORDERED)
+    assert simulator.request_key(SCENARIO) != simulator.request_key(REORDERED)
+    assert simulator.search_key(SCENARIO) == simulator.search_key(dict(SCENARIO))
+
+
+def test_compiled_scenario_keeps_field_order():
+    first = scenario.compile_scenario(SCENARIO)
+    second = scenario.compile_scenario(REORDERED)
+    assert first is not second
+    assert list(first.numeric_fields) == ["a", "b", "c", "d"]
+    assert list(second.numeric_fields) == ["d", "c", "b", "a"]
+    assert scenario.compile_scenario(dict(SCENARIO)) is first
+
+
+def test_result_does_not_depend_on_earlier_key_order():
+    scenario._compiled.clear()
+    fresh = _result(BeamSimulator(beam_width=4, max_steps=6, seed=5), REORDERED)
+    
+    cache = ScoreCache()
+    scenario._compiled.clear()
+    _result(BeamSimulator(beam_width=4, max_steps=6, seed=5, score_cache=cache), SCENARIO)
+    warm = _result(BeamSimulator(beam_width=4, max_steps=6, seed=5, score_cache=cache), REORDERED)
+    assert warm == fresh
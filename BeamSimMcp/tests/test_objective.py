@@ -0,0 +1,93 @@
+"""Objective expressions must reject anything outside the DSL and score the rest exactly."""
+
+import pytest
+
+from objective import MAX_EXPRESSION_NODES, compile_objective
+
+STATE = {"revenue": 10, "cost": 2.5, "x": -3, "y": 4, "label": "a"}
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("import os", "Invalid objective"),
+    ("__import__('os').system('true')", "only call abs, min or max"),
+    ("x.real", "Unsupported syntax"),
+    ("revenue.__class__", "Unsupported syntax"),
+    ("print(x)", "only call abs, min or max"),
+    ("abs(x)(y)", "only call abs, min or max"),
+    ("max(x, key=y)", "positional arguments only"),
+    ("min(*x)", "positional arguments only"),
+    ("abs(x, y)", "exactly 1"),
+    ("min(x)", "at least 2"),
+    ("abs", "must be called"),
+    ("(lambda: 1)()", "only call abs, min or max"),
+    ("lambda: 1", "Unsupported syntax"),
+    ("x ** 2", "Unsupported operator"),
+    ("x // 2", "Unsupported operator"),
+    ("x / 0", "divide by a non-zero number"),
+    ("x / 0.0", "divide by a non-zero number"),
+    ("x / y", "divide by a non-zero number"),
+    ("x / (1 + 1)", "divide by a non-zero number"),
+    ("x / True", "divide by a non-zero number"),
+    ("x + 1e999", "out of range"),
+    ("x - 1e999 * 0", "out of range"),
+    ("x + True", "Unsupported constant"),
+    ("x + 'a'", "Unsupported constant"),
+    ("x if y else 1", "Unsupported syntax"),
+    ("[x][0]", "Unsupported syntax"),
+    ("x < y", "Unsupported syntax"),
+    ("not x", "Unsupported operator"),
+])
+def test_rejects_expressions_outside_the_grammar(expression, message):
+    with pytest.raises(ValueError, match=message):
+        compile_objective(expression)
+
+
+def test_rejects_expressions_over_the_node_cap():
+    # A flat min() is one Call node plus one node per argument
+    def call(arguments: int) -> str:
+        return "min(" + ", ".join(f"f{i}" for i in range(arguments)) + ")"
+    
+    assert len(compile_objective(call(MAX_EXPRESSION_NODES - 1)).fields) == MAX_EXPRESSION_NODES - 1
+    with pytest.raises(ValueError, match=f"at most {MAX_EXPRESSION_NODES}"):
+        compile_objective(call(MAX_EXPRESSION_NODES))
+
+
+def test_no_expression_means_the_default_objective():
+    assert compile_objective(None) is None
+
+
+@pytest.mark.parametrize("expression", ["", "   ", 3])
+def test_rejects_empty_and_non_string_expressions(expression):
+    with pytest.raises(ValueError, match="non-empty string"):
+        compile_objective(expression)
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("2 * revenue - cost", 17.5),
+    ("min(x, y) + abs(x)", 0.0),
+    ("max(x, y, cost, 1)", 4.0),
+    ("-x / 2 + +y", 5.5),
+    ("revenue / 4 * 0.5", 1.25),
+    ("missing + label + 1", 1.0),
+    ("(revenue - cost) * (y - x)", 52.5),
+])
+def test_scores_accepted_expressions(expression, expected):
+    objective = compile_objective(expression)
+    assert objective.evaluate(STATE) == expected
+
+
+def test_fields_in_first_use_order_and_evaluated_with_one_change():
+    objective = compile_objective("y - 2 * x + max(y, revenue)")
+    assert objective.fields == ("y", "x", "revenue")
+    # y=20: 20 - 2 * -3 + max(20, 10)
+    assert objective.evaluate_with_change(STATE, "y", 20) == 46.0
+    assert objective.evaluate_with_change(STATE, "cost", 100) == objective.evaluate(STATE) == 20.0
+
+
+def test_column_evaluation_matches_the_state_evaluator():
+    np = pytest.importorskip("numpy")
+    objective = compile_objective("min(x, y, 1) * 3 - abs(y) / 4")
+    states = [{"x": -3, "y": 4}, {"x": 2, "y": -8}, {"x": 0.5, "y": 0.25}]
+    columns = {key: np.array([float(state[key]) for state in states]) for key in ("x", "y")}
+    values = objective.evaluate_columns(lambda name: columns.get(name, 0.0), len(states))
+    assert values.tolist() == [objective.evaluate(state) for state in states] == [-10.0, -26.0, 0.6875]
@@ -0,0 +1,80 @@
+"""Runs answered from a stored prefix must match runs made from scratch."""
+
+import json
+
+import pytest
+
+from simulation import BeamSimulator, splice_trace
+from stopping import CancellationToken
+
+# Two actions share the label increment(x), so histories alone cannot tell
+# a state's parent apart from its sibling
+AMBIGUOUS = {
+    "initial_state": {"x": 0, "y": 0},
+    "actions": [
+        {"type": "increment", "field": "x", "delta": 1},
+        {"type": "increment", "field": "x", "delta": 2},
+        {"type": "increment", "field": "y", "delta": 1}
+    ]
+}
+
+
+@pytest.mark.parametrize("trace", ["full", "delta", "sampled", "scores"])
+@pytest.mark.parametrize("max_steps", [2, 4, 7])
+def test_prefix_trace_matches_fresh_run(trace, max_steps):
+    stored = BeamSimulator(beam_width=4, max_steps=4, seed=5).run("run", AMBIGUOUS).prefix
+    fresh = BeamSimulator(beam_width=4, max_steps=max_steps, seed=5, trace=trace).run("run", AMBIGUOUS)
+    reused = BeamSimulator(beam_width=4, max_steps=max_steps, seed=5, trace=trace).run(
+        "run", AMBIGUOUS, prefix=stored
+    )
+    assert json.dumps(reused.intermediate_states) == json.dumps(fresh.intermediate_states)
+    assert reused.top_k == fresh.top_k
+
+
+@pytest.mark.parametrize("trace", ["full", "delta", "sampled", "scores", "none"])
+def test_continued_trace_matches_single_run(trace):
+    options = {"trace": trace, "trace_every": 2}
+    single = BeamSimulator(beam_width=4, max_steps=7, seed=5, **options).run("run", AMBIGUOUS)
+    
+    result = BeamSimulator(beam_width=4, max_steps=2, seed=5, **options).run("run", AMBIGUOUS)
+    records, metadata = result.intermediate_states, result.trace
+    for additional_steps in (2, 3):
+        step = result.checkpoint.step
+        result = BeamSimulator.from_checkpoint(result.checkpoint, additional_steps, **options).continue_run(
+            result.checkpoint
+        )
+        spliced = splice_trace(records, metadata, result.intermediate_states, result.trace, step)
+        records, metadata = list(spliced[0]), spliced[1]
+    
+    assert json.dumps(records) == json.dumps(single.intermediate_states)
+    assert metadata == single.trace
+    assert result.top_k == single.top_k
+
+
+def test_prefix_reuse_stops_when_cancelled_between_stored_steps():
+    stored = BeamSimulator(beam_width=4, max_steps=4, seed=5).run("run", AMBIGUOUS).prefix
+    token = CancellationToken()
+    records = stored.trace
+    
+    def reading():
+        # Cancel as the beam after step 2 is read
+        for step, record in enumerate(records):
+            if step == 2:
+                token.cancel()
+            yield record
+    
+    stored.trace = type("Trace", (), {"__iter__": lambda self: reading()})()
+    reused = BeamSimulator(beam_width=4, max_steps=4, seed=5).run("run", AMBIGUOUS, cancellation=token, prefix=stored)
+    fresh = BeamSimulator(beam_width=4, max_steps=2, seed=5).run("run", AMBIGUOUS)
+    assert reused.termination == {"reason": "cancelled", "step": 2, "truncated": True}
+    assert reused.top_k == fresh.top_k
+    assert reused.stats["reused_steps"] == 2
+
+
+def test_prefix_reuse_honors_an_expired_deadline():
+    stored = BeamSimulator(beam_width=4, max_steps=4, seed=5).run("run", AMBIGUOUS).prefix
+    reused = BeamSimulator(beam_width=4, max_steps=4, seed=5, deadline_ms=1e-9).run(
+        "run", AMBIGUOUS, prefix=stored
+    )
+    assert reused.termination == {"reason": "deadline", "step": 0, "truncated": True}
+    assert reused.stats["reused_steps"] == 0
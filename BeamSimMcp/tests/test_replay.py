@@ -0,0 +1,81 @@
+"""A replayable run must regenerate the trace it stored the digest of, and nothing else."""
+
+import itertools
+import json
+
+import pytest
+
+import stopping
+from simulation import BeamSimulator, TraceDigest, check_replay
+
+SCENARIO = {"initial_state": {"x": 0, "y": 1.5, "z": -2}}
+CONSTRAINTS = {"max_x": 3}
+
+
+def _record(run_id: str = "run", **options) -> tuple[dict, list]:
+    """Run as a replayable simulate_run does; return the stored record and the trace it hashed."""
+    traced = BeamSimulator(**options).run(run_id, SCENARIO, CONSTRAINTS)
+    simulator = BeamSimulator(**options)
+    digest = TraceDigest()
+    result = simulator.run(run_id, SCENARIO, CONSTRAINTS, trace_sink=digest)
+    record = json.loads(json.dumps({
+        "run_id": run_id,
+        "top_k": result.top_k,
+        "termination": result.termination,
+        "replay": {"settings": simulator.replay_settings(result.termination), "trace_digest": digest.hexdigest()}
+    }))
+    return record, json.loads(json.dumps(traced.intermediate_states))
+
+
+def _replay(record: dict) -> list:
+    replayed = BeamSimulator.from_replay(record["replay"]["settings"]).run("run", SCENARIO, CONSTRAINTS)
+    assert not replayed.termination["truncated"]
+    return check_replay(replayed, record)
+
+
+@pytest.mark.parametrize("trace", ["full", "delta", "sampled", "scores"])
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_replay_regenerates_the_stored_trace(trace, engine):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    record, traced = _record(beam_width=4, max_steps=6, seed=5, engine=engine, trace=trace)
+    assert _replay(record) == traced
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda record: record["replay"].update(trace_digest="0" * 64),
+    lambda record: record["top_k"][0].update(score=record["top_k"][0]["score"] + 1),
+    lambda record: record["top_k"].pop(),
+    lambda record: record["replay"]["settings"].update(max_steps=5),
+])
+def test_replay_rejects_a_record_it_does_not_reproduce(tamper):
+    record, _ = _record(beam_width=4, max_steps=6, seed=5)
+    tamper(record)
+    with pytest.raises(ValueError, match="does not match its stored result"):
+        _replay(record)
+
+
+def test_replay_rejects_another_engine_version():
+    record, _ = _record(beam_width=4, max_steps=6, seed=5)
+    record["replay"]["settings"]["engine_version"] = -1
+    with pytest.raises(ValueError, match="another engine version"):
+        _replay(record)
+
+
+def test_deadline_truncated_run_replays_to_the_step_it_reached(monkeypatch):
+    # Every clock read advances a millisecond; the first run is cut short
+    clock = itertools.count()
+    monkeypatch.setattr(stopping.time, "monotonic", lambda: next(clock) / 1000)
+    simulator = BeamSimulator(beam_width=4, max_steps=50, seed=5, deadline_ms=40)
+    digest = TraceDigest()
+    result = simulator.run("run", SCENARIO, CONSTRAINTS, trace_sink=digest)
+    monkeypatch.undo()
+    assert result.termination["truncated"]
+    
+    record = json.loads(json.dumps({
+        "run_id": "run",
+        "top_k": result.top_k,
+        "replay": {"settings": simulator.replay_settings(result.termination), "trace_digest": digest.hexdigest()}
+    }))
+    assert record["replay"]["settings"]["max_steps"] == result.termination["step"]
+    assert len(_replay(record)) == result.termination["step"] + 1
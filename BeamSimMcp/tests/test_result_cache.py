@@ -0,0 +1,85 @@
+"""Result cache entries must expire and evict on time, and only answer identical requests."""
+
+import pytest
+
+import cache
+from cache import ResultCache
+from simulation import BeamSimulator
+from stopping import StoppingRules
+
+SCENARIO = {"initial_state": {"x": 0, "y": 1.5}}
+BASE = {"beam_width": 4, "max_steps": 5, "seed": 5}
+
+
+def _response(run_id: str) -> dict:
+    return {"runId": run_id}
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    results = ResultCache(max_entries=2)
+    results.put("a", "run-a", _response("run-a"))
+    results.put("b", "run-b", _response("run-b"))
+    assert results.get("a") == _response("run-a")
+    results.put("c", "run-c", _response("run-c"))
+    
+    assert results.get("b") is None
+    assert results.get("a") == _response("run-a")
+    assert results.get("c") == _response("run-c")
+    assert results.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    results = ResultCache(ttl_seconds=60)
+    results.put("a", "run-a", _response("run-a"))
+    now[0] += 30
+    results.put("b", "run-b", _response("run-b"))
+    
+    now[0] += 40
+    assert results.get("a") is None
+    assert results.get("b") == _response("run-b")
+    assert len(results) == 1
+    assert results.stats()["evictions"] == 1
+
+
+def test_discarding_a_run_drops_every_entry_it_answered():
+    results = ResultCache()
+    results.put("a", "run-1", _response("run-1"))
+    results.put("b", "run-1", _response("run-1"))
+    results.put("c", "run-2", _response("run-2"))
+    results.discard_run("run-1")
+    assert [results.get(key) for key in "abc"] == [None, None, _response("run-2")]
+
+
+def _key(persistence: str = "full", **options) -> str:
+    return BeamSimulator(**{**BASE, **options}).request_key(SCENARIO, {"max_x": 3}, persistence)
+
+
+@pytest.mark.parametrize("options, persistence", [
+    ({"max_steps": 6}, "full"),
+    ({"trace": "scores"}, "full"),
+    ({"trace": "none"}, "full"),
+    ({"trace": "sampled"}, "full"),
+    ({"stopping": StoppingRules(plateau_steps=2)}, "full"),
+    ({"stopping": StoppingRules(goal_score=3)}, "full"),
+    ({"stopping": StoppingRules(stable_beam=True)}, "full"),
+    ({}, "replayable"),
+])
+def test_requests_differing_in_settings_do_not_share_an_entry(options, persistence):
+    assert _key(persistence, **options) != _key()
+
+
+def test_sampling_interval_counts_only_for_sampled_traces():
+    assert _key(trace="sampled", trace_every=2) != _key(trace="sampled", trace_every=3)
+    assert _key(trace="full", trace_every=2) == _key(trace="full", trace_every=3)
+
+
+@pytest.mark.parametrize("options", [
+    {"deadline_ms": 50},
+    {"engine": "python"},
+    {"stopping": StoppingRules()},
+    {"score_cache": cache.ScoreCache()},
+])
+def test_settings_that_do_not_change_a_finished_run_share_an_entry(options):
+    assert _key(**options) == _key()
@@ -0,0 +1,61 @@
+"""The SQLite store must keep committed runs through torn writes and rewrites."""
+
+import sqlite3
+
+from rundb import RunDatabase
+
+
+def _record(run_id: str, version: int = 0) -> dict:
+    return {
+        "run_id": run_id,
+        "scenario": {"initial_state": {"x": version}},
+        "best_result": {"score": float(version)},
+        "intermediate_states": [[{"score": version}]],
+        "version": version
+    }
+
+
+def test_reopen_ignores_a_torn_wal_frame(tmp_path):
+    path = tmp_path / "simulations.db"
+    db = RunDatabase(path)
+    db.put("a", _record("a"))
+    db.put("b", _record("b"))
+    # The writer is still open, so the commits are still in the WAL
+    assert (tmp_path / "simulations.db-wal").stat().st_size > 0
+    with open(tmp_path / "simulations.db-wal", "ab") as f:
+        f.write(b"\x00\x00\x00\x02torn frame")
+    
+    reopened = RunDatabase(path)
+    assert reopened.run_ids() == ["a", "b"]
+    assert reopened.get("a") == _record("a")
+    reopened.put("c", _record("c"))
+    assert RunDatabase(path).get("c") == _record("c")
+
+
+def test_rewrite_keeps_creation_time_and_updates_indexed_columns(tmp_path):
+    path = tmp_path / "simulations.db"
+    db = RunDatabase(path)
+    query = "SELECT run_id, created_at, best_score FROM runs ORDER BY rowid"
+    for version in range(3):
+        for run_id in ("a", "b"):
+            db.put(run_id, _record(run_id, version))
+        if version == 0:
+            created = sqlite3.connect(path).execute(query).fetchall()
+    
+    db = RunDatabase(path)
+    assert db.run_ids() == ["a", "b"]
+    assert [db.get(run_id) for run_id in "ab"] == [_record(run_id, 2) for run_id in "ab"]
+    rows = sqlite3.connect(path).execute(query).fetchall()
+    assert rows == [(run_id, created_at, 2.0) for run_id, created_at, _ in created]
+
+
+def test_spooled_trace_is_packed_into_the_row(tmp_path):
+    db = RunDatabase(tmp_path / "simulations.db")
+    spool = tmp_path / "run.spool"
+    spool.write_text('[{"score": 1}]\n\n[{"score": 2}]\n')
+    db.put("a", _record("a"), spool)
+    assert not spool.exists()
+    
+    db = RunDatabase(tmp_path / "simulations.db")
+    assert db.get("a")["intermediate_states"] == [[{"score": 1}], [{"score": 2}]]
+    assert list(db.get("a")) == list(_record("a"))
@@ -0,0 +1,112 @@
+"""The one-file-per-run store must keep its manifest consistent with the run files."""
+
+import pytest
+
+import runfiles
+from runfiles import RunFiles
+
+
+def _record(run_id: str, version: int = 0) -> dict:
+    return {"run_id": run_id, "version": version, "intermediate_states": [[{"score": version}]]}
+
+
+def _spool(tmp_path, version: int):
+    path = tmp_path / f"run{version}.spool"
+    path.write_text(f'[{{"score": {version}}}]\n')
+    return path
+
+
+def test_reopen_cuts_off_a_torn_manifest_line(tmp_path):
+    store = RunFiles(tmp_path / "runs")
+    store.put("a", _record("a"))
+    store.put("b", _record("b"))
+    manifest = tmp_path / "runs" / "manifest.txt"
+    intact = manifest.stat().st_size
+    with open(manifest, "a") as f:
+        f.write("c")
+    
+    store = RunFiles(tmp_path / "runs")
+    assert manifest.stat().st_size == intact
+    assert store.run_ids() == ["a", "b"]
+    store.put("c", _record("c"))
+    
+    store = RunFiles(tmp_path / "runs")
+    assert store.run_ids() == ["a", "b", "c"]
+    assert [store.get(run_id) for run_id in "abc"] == [_record(run_id) for run_id in "abc"]
+
+
+def test_manifest_is_rewritten_once_mostly_superseded(tmp_path):
+    store = RunFiles(tmp_path / "runs")
+    for version in range(5):
+        for run_id in ("a", "b"):
+            store.put(run_id, _record(run_id), _spool(tmp_path, version))
+    # Ten saves, but never more than two lines per run
+    manifest = (tmp_path / "runs" / "manifest.txt").read_text().splitlines()
+    assert len(manifest) <= 2 * 2
+    # Every replaced trace is deleted; each run keeps only the one its last line names
+    latest = dict(line.split("\t") for line in manifest)
+    traces = sorted(path.name for path in (tmp_path / "runs").rglob("*.trace.jsonl"))
+    assert traces == sorted(latest.values())
+    
+    store = RunFiles(tmp_path / "runs")
+    assert store.run_ids() == ["a", "b"]
+    for run_id in ("a", "b"):
+        assert store.get(run_id)["intermediate_states"] == [[{"score": 4}]]
+
+
+def test_inline_trace_replaces_a_spooled_one(tmp_path):
+    store = RunFiles(tmp_path / "runs")
+    store.put("a", _record("a"), _spool(tmp_path, 1))
+    store.put("a", _record("a", 2))
+    assert not list((tmp_path / "runs").rglob("*.trace.jsonl"))
+    
+    store = RunFiles(tmp_path / "runs")
+    assert store.get("a") == _record("a", 2)
+
+
+class Crash(BaseException):
+    """Stands in for the process dying; the store gets no chance to clean up."""
+
+
+def test_crash_after_the_rename_keeps_the_run_listed(monkeypatch, tmp_path):
+    store = RunFiles(tmp_path / "runs")
+    store.put("a", _record("a"))
+    
+    def replace_then_crash(source, destination):
+        replace(source, destination)
+        if str(destination).endswith(".json"):
+            raise Crash
+    
+    replace = runfiles.os.replace
+    monkeypatch.setattr(runfiles.os, "replace", replace_then_crash)
+    with pytest.raises(Crash):
+        store.put("b", _record("b"), _spool(tmp_path, 1))
+    monkeypatch.undo()
+    
+    store = RunFiles(tmp_path / "runs")
+    assert store.run_ids() == ["a", "b"]
+    assert store.get("b") == {**_record("b"), "intermediate_states": [[{"score": 1}]]}
+
+
+def test_failed_rewrite_keeps_the_earlier_record(monkeypatch, tmp_path):
+    store = RunFiles(tmp_path / "runs")
+    store.put("a", _record("a"), _spool(tmp_path, 1))
+    
+    def failing_replace(source, destination):
+        if str(destination).endswith(".json"):
+            raise OSError("disk full")
+        replace(source, destination)
+    
+    replace = runfiles.os.replace
+    monkeypatch.setattr(runfiles.os, "replace", failing_replace)
+    for run_id, spool in (("a", _spool(tmp_path, 2)), ("b", None)):
+        with pytest.raises(OSError):
+            store.put(run_id, _record(run_id, 2), spool)
+    monkeypatch.undo()
+    
+    for store in (store, RunFiles(tmp_path / "runs")):
+        assert store.get("a") == {**_record("a"), "intermediate_states": [[{"score": 1}]]}
+        assert store.get("b") is None
+    # The earlier trace is still the one a later save replaces
+    store.put("a", _record("a", 3))
+    assert not list((tmp_path / "runs").rglob("*.trace.jsonl"))
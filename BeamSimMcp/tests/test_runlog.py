@@ -0,0 +1,85 @@
+"""The segment log must survive torn writes and compaction with every run intact."""
+
+import asyncio
+
+import pytest
+
+import storage
+from runlog import RunLog
+
+
+def _record(run_id: str, version: int = 0) -> dict:
+    return {"run_id": run_id, "version": version, "intermediate_states": [[{"score": version}]]}
+
+
+def test_reopen_cuts_off_a_torn_record(tmp_path):
+    log = RunLog(tmp_path)
+    log.put("a", _record("a"))
+    log.put("b", _record("b"))
+    segment = tmp_path / "00000001.log"
+    intact = segment.stat().st_size
+    with open(segment, "ab") as f:
+        f.write(b'c\t{"run_id": "c", "vers')
+    
+    log = RunLog(tmp_path)
+    assert segment.stat().st_size == intact
+    assert log.run_ids() == ["a", "b"]
+    assert "c" not in log
+    log.put("c", _record("c"))
+    
+    log = RunLog(tmp_path)
+    assert log.run_ids() == ["a", "b", "c"]
+    assert [log.get(run_id) for run_id in "abc"] == [_record(run_id) for run_id in "abc"]
+
+
+def test_compaction_keeps_the_latest_records_and_deletes_old_segments(tmp_path):
+    log = RunLog(tmp_path, segment_bytes=256)
+    for version in range(6):
+        for run_id in ("a", "b", "c"):
+            log.put(run_id, _record(run_id, version))
+    segments = sorted(path.name for path in tmp_path.glob("*.log"))
+    # Every superseded record has been compacted away at least once
+    assert "00000001.log" not in segments
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.log")) < 6 * 3 * 64
+    
+    log = RunLog(tmp_path, segment_bytes=256)
+    assert sorted(path.name for path in tmp_path.glob("*.log")) == segments
+    assert log.run_ids() == ["a", "b", "c"]
+    assert [log.get(run_id) for run_id in "abc"] == [_record(run_id, 5) for run_id in "abc"]
+
+
+def test_spooled_trace_is_read_back_and_replaced(tmp_path):
+    log = RunLog(tmp_path / "runs")
+    spool = tmp_path / "run.spool"
+    spool.write_text('[{"score": 1}]\n[{"score": 2}]\n')
+    log.put("a", _record("a"), spool)
+    assert not spool.exists()
+    
+    log = RunLog(tmp_path / "runs")
+    assert log.get("a")["intermediate_states"] == [[{"score": 1}], [{"score": 2}]]
+    log.put("a", _record("a", 1))
+    assert log.get("a") == _record("a", 1)
+    assert not (tmp_path / "runs" / "traces" / "a.jsonl").exists()
+
+
+@pytest.mark.parametrize("backend", storage.STORAGE_BACKENDS)
+def test_legacy_file_is_imported_once(monkeypatch, tmp_path, backend):
+    legacy = tmp_path / "simulations.json"
+    legacy.write_text('{"a": {"run_id": "a", "version": 0}, "b": {"run_id": "b", "version": 0}}')
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", backend)
+    monkeypatch.setattr(storage, "STORAGE_FILE", legacy)
+    monkeypatch.setattr(storage, "RUN_LOG_DIR", tmp_path / "runs")
+    monkeypatch.setattr(storage, "DATABASE_FILE", tmp_path / "simulations.db")
+    monkeypatch.setattr(storage, "RUN_FILES_DIR", tmp_path / "run_files")
+    monkeypatch.setattr(storage, "_runs", None)
+    
+    assert asyncio.run(storage.list_simulations()) == ["a", "b"]
+    assert not legacy.exists()
+    assert (tmp_path / "simulations.json.imported").exists()
+    
+    # A store that already holds a run keeps its own record on a later import
+    asyncio.run(storage.save_simulation("a", {"run_id": "a", "version": 1}))
+    legacy.write_text('{"a": {"run_id": "a", "version": 0}, "c": {"run_id": "c", "version": 0}}')
+    monkeypatch.setattr(storage, "_runs", None)
+    assert asyncio.run(storage.get_simulation("a")) == {"run_id": "a", "version": 1}
+    assert asyncio.run(storage.list_simulations()) == ["a", "b", "c"]
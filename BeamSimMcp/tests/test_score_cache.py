@@ -0,0 +1,61 @@
+"""Score cache stats must count only the run's own lookups."""
+
+import pytest
+
+from cache import ScoreCache
+from simulation import BeamSimulator
+
+SCENARIO = {"initial_state": {"x": 0, "y": 1.5}}
+
+
+def test_stats_ignore_lookups_by_concurrent_runs():
+    alone = BeamSimulator(beam_width=4, max_steps=5, seed=5, engine="python", score_cache=ScoreCache()).run(
+        "run", SCENARIO
+    )
+    
+    cache = ScoreCache()
+    
+    def other_run(progress):
+        # Another run sharing the cache looks entries up between our steps
+        cache.get(progress.step, "other")
+        cache.put(progress.step, "other", 0.0)
+        cache.get(progress.step, "other")
+    
+    shared = BeamSimulator(beam_width=4, max_steps=5, seed=5, engine="python", score_cache=cache).run(
+        "run", SCENARIO, progress=other_run
+    )
+    assert shared.stats["score_cache"] == alone.stats["score_cache"]
+    assert cache.hits == shared.stats["score_cache"]["hits"] + 5
+    assert cache.misses == shared.stats["score_cache"]["misses"] + 5
+
+
+def test_ints_past_float_precision_do_not_share_a_score():
+    actions = [
+        {"type": "increment", "field": "x", "delta": 3},
+        {"type": "decrement", "field": "y", "delta": 2},
+        {"type": "increment", "field": "y", "delta": 5}
+    ]
+    near = {"initial_state": {"x": 2 ** 60, "y": 1}, "actions": actions}
+    far = {"initial_state": {"x": 2 ** 60 + 1, "y": 1}, "actions": actions}
+    options = {"beam_width": 4, "max_steps": 3, "seed": 5, "engine": "python"}
+    alone = BeamSimulator(score_cache=ScoreCache(), **options).run("run", far)
+    
+    cache = ScoreCache()
+    BeamSimulator(score_cache=cache, **options).run("run", near)
+    shared = BeamSimulator(score_cache=cache, **options).run("run", far)
+    assert shared.best_result == alone.best_result
+    assert shared.stats["score_cache"] == alone.stats["score_cache"]
+
+
+@pytest.mark.parametrize("engine", ["numpy", "auto"])
+def test_numpy_engine_shares_the_reference_cache(engine):
+    pytest.importorskip("numpy")
+    scenario = {"initial_state": {"x": 0, "y": 1.5, "z": -2}}
+    options = {"beam_width": 4, "max_steps": 5, "seed": 5}
+    cache = ScoreCache()
+    reference = BeamSimulator(engine="python", score_cache=cache, **options).run("run", scenario)
+    
+    result = BeamSimulator(engine=engine, score_cache=cache, **options).run("run", scenario)
+    assert result.best_result == reference.best_result
+    assert result.stats["score_cache"]["misses"] == 0
+    assert result.stats["score_cache"]["hits"] == sum(reference.stats["score_cache"].values())
@@ -0,0 +1,97 @@
+"""Scorer plugins must honour the score_batch contract, and value_sums must match sum()."""
+
+from types import SimpleNamespace
+
+import pytest
+
+import scoring
+from scoring import ScoringPlugin, load_scorer, value_sums
+from simulation import BeamSimulator
+
+np = pytest.importorskip("numpy")
+
+SCENARIO = {"initial_state": {"x": 1.0, "y": 2.0}}
+
+
+class ShortScorer(ScoringPlugin):
+    name = "short"
+    
+    def score_batch(self, states, field_names, constraints):
+        # One score short, with a well-formed breakdown
+        return states.sum(axis=1)[:-1], {"value_sum": states.sum(axis=1)}
+
+
+class InfiniteScorer(ScoringPlugin):
+    name = "infinite"
+    
+    def score_batch(self, states, field_names, constraints):
+        scores = np.where(states[:, 0] > 1.5, np.inf, states.sum(axis=1))
+        return scores, {"value_sum": scores}
+
+
+class NanScorer(ScoringPlugin):
+    name = "nan"
+    
+    def score_batch(self, states, field_names, constraints):
+        scores = np.full(len(states), np.nan)
+        return scores, {"value_sum": states.sum(axis=1)}
+
+
+class Unfinished(ScoringPlugin):
+    name = "unfinished"
+
+
+@pytest.fixture
+def plugins(monkeypatch):
+    """Register the test scorers as if installed under the entry point group."""
+    installed = [
+        SimpleNamespace(name=plugin.name, load=lambda plugin=plugin: plugin)
+        for plugin in (ShortScorer, InfiniteScorer, NanScorer, Unfinished)
+    ]
+    monkeypatch.setattr(
+        scoring, "entry_points", lambda group: installed if group == scoring.ENTRY_POINT_GROUP else []
+    )
+
+
+def _run(scorer: str):
+    return BeamSimulator(beam_width=3, max_steps=3, seed=1, scorer=scorer).run("run", SCENARIO)
+
+
+def test_rejects_the_wrong_number_of_scores(plugins):
+    with pytest.raises(ValueError, match="Scorer 'short' returned"):
+        _run("short")
+
+
+@pytest.mark.parametrize("name", ["infinite", "nan"])
+def test_rejects_non_finite_scores(plugins, name):
+    with pytest.raises(ValueError, match=f"Scorer '{name}' returned non-finite scores"):
+        _run(name)
+
+
+def test_abstract_plugin_cannot_be_instantiated_or_loaded(plugins):
+    with pytest.raises(TypeError, match="abstract"):
+        ScoringPlugin()
+    with pytest.raises(TypeError, match="abstract"):
+        Unfinished()
+    with pytest.raises(ValueError, match="does not implement score_batch"):
+        load_scorer("unfinished")
+
+
+def test_unknown_scorer_name_lists_the_installed_ones(plugins):
+    with pytest.raises(ValueError, match="scorer must be one of default, short, infinite, nan, unfinished"):
+        load_scorer("missing")
+    with pytest.raises(ValueError, match="scorer must be one of"):
+        BeamSimulator(scorer="missing")
+
+
+@pytest.mark.parametrize("values", [
+    [1e16, 1.0, -1e16],
+    [1.0, 1e100, 1.0, -1e100],
+    [0.1] * 10,
+    [3, 1e16, 1.0, 2, -1e16],
+    [2 ** 53, 1, 1.0, -(2 ** 53)],
+])
+def test_value_sums_match_sum(values):
+    is_int = np.array([isinstance(value, int) for value in values])
+    columns = ((np.array([float(value)]), is_int[i : i + 1]) for i, value in enumerate(values))
+    assert value_sums(columns, 1).tolist() == [float(sum(values))]
@@ -0,0 +1,72 @@
+"""Each stopping rule must end the run at the step it fires, on either engine."""
+
+import pytest
+
+from simulation import BeamSimulator
+from stopping import GOAL, MAX_STEPS, MIN_IMPROVEMENT, PLATEAU, STABLE_BEAM, StoppingRules
+
+ENGINES = ["python", "numpy"]
+
+# The best x is the step number: 1, 2, 3, ...
+CLIMB = {
+    "initial_state": {"x": 0},
+    "actions": [
+        {"type": "increment", "field": "x", "delta": 1},
+        {"type": "decrement", "field": "x", "delta": 1}
+    ]
+}
+
+# The best x is 5 from step 1 on
+CEILING = {
+    "initial_state": {"x": 0},
+    "actions": [
+        {"type": "set", "field": "x", "value": 5},
+        {"type": "set", "field": "x", "value": 0}
+    ]
+}
+
+
+def _run(engine: str, scenario: dict, rules: StoppingRules, dedup: bool = False):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    simulator = BeamSimulator(
+        beam_width=2, max_steps=10, seed=0, engine=engine, dedup=dedup, stopping=rules
+    )
+    return simulator.run("run", scenario)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_goal_stops_at_the_first_step_reaching_it(engine):
+    result = _run(engine, CLIMB, StoppingRules(goal_score=3))
+    assert result.termination == {"reason": GOAL, "step": 3, "truncated": False}
+    assert result.best_result["score"] == 3
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_plateau_stops_after_that_many_steps_without_improvement(engine):
+    # Steps 2 and 3 do not improve on step 1
+    result = _run(engine, CEILING, StoppingRules(plateau_steps=2))
+    assert result.termination == {"reason": PLATEAU, "step": 3, "truncated": False}
+    assert len(result.intermediate_states) == 4
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_min_improvement_stops_once_the_relative_gain_falls_short(engine):
+    # Gains are 1/1, 1/2, 1/3, 1/4 from step 2 on; 1/4 < 0.3 at step 5
+    result = _run(engine, CLIMB, StoppingRules(min_improvement=0.3))
+    assert result.termination == {"reason": MIN_IMPROVEMENT, "step": 5, "truncated": False}
+    assert result.best_result["score"] == 5
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stable_beam_stops_when_a_step_reproduces_its_beam(engine):
+    # Step 1 yields {5, 0}; step 2 yields {5, 0} again
+    result = _run(engine, CEILING, StoppingRules(stable_beam=True), dedup=True)
+    assert result.termination == {"reason": STABLE_BEAM, "step": 2, "truncated": False}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_rules_that_never_fire_run_to_max_steps(engine):
+    rules = StoppingRules(goal_score=100, plateau_steps=3, stable_beam=True)
+    result = _run(engine, CLIMB, rules)
+    assert result.termination == {"reason": MAX_STEPS, "step": 10, "truncated": False}
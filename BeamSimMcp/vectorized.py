@@ -0,0 +1,679 @@
+"""
+NumPy-backed beam expansion engine.
+
+Holds the beam as a (beam x fields) float array and the action set as
+per-action (field index, operand) vectors, so applying actions and computing
+value_sum and constraint_penalty are batched array operations per step.
+Only the survivors of each step are turned back into state dicts.
+
+Results are identical to the reference engine in simulation.py: columns are
+accumulated in state order with the reference sum()'s rounding (see
+scoring.value_sums, which needs to know which cells hold Python ints),
+candidates are ranked with a stable sort, and the random stream is consumed
+in the same order. Once int deltas could carry a beam's ints past what
+float64 holds exactly, the rest of the run is handed to the reference
+engine.
+"""
+
+import math
+import random
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from cache import ScoreCache
+from constraints import CompiledConstraints
+from fingerprint import MIX_1, MIX_2, QUANTIZE_BITS, field_salt, int_salt
+from objective import Objective
+from scenario import OP_DECREMENT, OP_INCREMENT, OP_SET, CompiledScenario
+from scoring import ScoringPlugin, value_sums
+from simulation import ActionLabels, PathNode, PythonEngine, SimulationState, _apply_action
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:  # pragma: no cover - numpy is an optional extra
+    np = None
+    HAS_NUMPY = False
+
+# Candidates per step below which a process pool is not worth its overhead
+PARALLEL_MIN_CANDIDATES = 20_000
+
+# Largest magnitude at which every integer is exactly representable as a float
+_EXACT_INT_LIMIT = 2 ** 53
+
+
+def _is_exact(value: Any) -> bool:
+    """True if float64 arithmetic on value matches Python arithmetic."""
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return isinstance(value, int) and abs(value) <= _EXACT_INT_LIMIT
+
+
+@dataclass
+class _ArrayScenario:
+    """A scenario lowered to a fixed schema of numeric columns."""
+    fields: list[str]
+    columns: dict[str, int]
+    # Predefined actions (None when actions are generated per state)
+    actions: list[dict[str, Any]] | None
+    action_field: Any    # (actions,) column index, -1 for a no-op
+    action_is_set: Any   # (actions,) True for "set", False for a delta
+    action_operand: Any  # (actions,) signed delta or assigned value
+    action_operand_int: Any  # (actions,) True where the operand is a Python int
+    # (column, limit, is_max, weight) per applicable bound, in constraint order
+    constraints: list[tuple[int, float, bool, int | float]]
+    # Per-column limits and weights for incremental scoring
+    max_limit: Any  # +inf where the column has no upper bound
+    min_limit: Any  # -inf where the column has no lower bound
+    max_weight: Any
+    min_weight: Any
+    # Scenario objective replacing the value sum, if any
+    objective: Objective | None = None
+    # The constraints the tuples above were lowered from, for scorer plugins
+    bounds: CompiledConstraints | None = None
+    # Largest |operand| of an action that writes a Python int
+    int_operand_reach: int = 0
+    # Largest |limit| among int limits and largest |weight|, for penalties
+    int_limit_reach: int = 0
+    weight_reach: int | float = 0
+
+
+def _compile(
+    scenario: CompiledScenario,
+    constraints: CompiledConstraints
+) -> _ArrayScenario | None:
+    """
+    Lower a compiled scenario to array form, or return None if it cannot be.
+    
+    A scenario fits when its schema is fixed (its numeric fields stay
+    numeric and no action adds fields), its action fields are strings, and
+    all numbers are exactly representable as float64. Whether the ints a
+    search reaches stay representable is checked per step (see
+    NumpyEngine.expand).
+    """
+    if not scenario.fixed_schema:
+        return None
+    fields = list(scenario.numeric_fields)
+    if not all(_is_exact(scenario.initial_state[key]) for key in fields):
+        return None
+    columns = {key: i for i, key in enumerate(fields)}
+    
+    actions = None
+    action_field: list[int] = []
+    action_is_set: list[bool] = []
+    action_operand: list[float] = []
+    action_operand_int: list[bool] = []
+    
+    if scenario.actions is not None:
+        actions = scenario.actions
+        for op, _, field, operand in scenario.action_table:
+            if not isinstance(field, str):
+                return None
+            
+            column, is_set, value = -1, False, 0.0
+            if op in (OP_INCREMENT, OP_DECREMENT):
+                if not _is_exact(operand):
+                    return None
+                column = columns[field]
+                value = float(operand) if op == OP_INCREMENT else -float(operand)
+            elif op == OP_SET:
+                if not _is_exact(operand):
+                    return None
+                column, is_set, value = columns[field], True, float(operand)
+            
+            action_field.append(column)
+            action_is_set.append(is_set)
+            action_operand.append(value)
+            action_operand_int.append(isinstance(operand, int))
+    int_operand_reach = max(
+        (abs(int(value)) for value, is_int in zip(action_operand, action_operand_int) if is_int),
+        default=0
+    )
+    
+    compiled_constraints = []
+    int_limit_reach, weight_reach = 0, 0
+    for bound in constraints.bounds:
+        if bound.field not in columns:
+            continue
+        if not _is_exact(bound.limit):
+            return None
+        compiled_constraints.append(
+            (columns[bound.field], float(bound.limit), bound.is_max, bound.weight)
+        )
+        if isinstance(bound.limit, int):
+            int_limit_reach = max(int_limit_reach, abs(bound.limit))
+        weight_reach = max(weight_reach, abs(bound.weight))
+    
+    max_limit = np.full(len(fields), np.inf)
+    min_limit = np.full(len(fields), -np.inf)
+    max_weight = np.zeros(len(fields))
+    min_weight = np.zeros(len(fields))
+    for column, limit, is_max, weight in compiled_constraints:
+        if is_max:
+            max_limit[column], max_weight[column] = limit, weight
+        else:
+            min_limit[column], min_weight[column] = limit, weight
+    
+    return _ArrayScenario(
+        fields=fields,
+        columns=columns,
+        actions=actions,
+        action_field=np.array(action_field, dtype=np.intp),
+        action_is_set=np.array(action_is_set, dtype=bool),
+        action_operand=np.array(action_operand, dtype=np.float64),
+        action_operand_int=np.array(action_operand_int, dtype=bool),
+        constraints=compiled_constraints,
+        max_limit=max_limit,
+        min_limit=min_limit,
+        max_weight=max_weight,
+        min_weight=min_weight,
+        objective=scenario.objective,
+        bounds=constraints,
+        int_operand_reach=int_operand_reach,
+        int_limit_reach=int_limit_reach,
+        weight_reach=weight_reach
+    )
+
+
+def top_k(scores, k: int):
+    """
+    Indices of the k highest scores, best first.
+    
+    Ties are broken by lower index, reproducing a stable descending sort, but
+    only the selected k entries are ever sorted.
+    """
+    keys = -scores
+    if k >= len(keys):
+        return np.argsort(keys, kind="stable")
+    
+    kth = np.partition(keys, k - 1)[k - 1]
+    better = np.flatnonzero(keys < kth)
+    tied = np.flatnonzero(keys == kth)[:k - len(better)]
+    chosen = np.concatenate([better, tied])
+    return chosen[np.argsort(keys[chosen], kind="stable")]
+
+
+def score_candidates(
+    rows, parents, columns, new_values, constraints, objective=None, field_columns=None,
+    int_cells=None, new_ints=None
+):
+    """
+    Return total scores for candidates without materializing their rows.
+    
+    Candidate i is rows[parents[i]] with column columns[i] replaced by
+    new_values[i] (no change where columns[i] is -1). Columns are rebuilt
+    one at a time, so peak memory is O(candidates), not O(candidates x fields).
+    Each candidate's score depends only on its own cell, so scoring any
+    slice of candidates gives the same values as scoring them all at once.
+    
+    int_cells and new_ints mark the cells of rows and new_values that hold
+    Python ints, for the value sum; without them every cell is a float.
+    With an objective, it replaces the value sum and only the columns it
+    reads (looked up by name in field_columns) are rebuilt.
+    """
+    n_fields = rows.shape[1]
+    touched = np.flatnonzero(columns >= 0)
+    touched = touched[np.argsort(columns[touched], kind="stable")]
+    bounds = np.searchsorted(columns[touched], np.arange(n_fields + 1))
+    
+    def column(index):
+        values = rows[:, index][parents]
+        hits = touched[bounds[index]:bounds[index + 1]]
+        values[hits] = new_values[hits]
+        return values
+    
+    def int_column(index):
+        if int_cells is None:
+            return None
+        ints = int_cells[:, index][parents]
+        hits = touched[bounds[index]:bounds[index + 1]]
+        ints[hits] = new_ints[hits]
+        return ints
+    
+    if objective is not None:
+        value_sum = objective.evaluate_columns(
+            lambda name: column(field_columns[name]) if name in field_columns else 0.0,
+            len(parents)
+        )
+    else:
+        value_sum = value_sums(((column(index), int_column(index)) for index in range(n_fields)), len(parents))
+    
+    penalty = np.zeros(len(parents))
+    for index, limit, is_max, weight in constraints:
+        actual = column(index)
+        if is_max:
+            violated = actual > limit
+            excess = (actual - limit) * weight
+        else:
+            violated = actual < limit
+            excess = (limit - actual) * weight
+        np.subtract(penalty, excess, out=penalty, where=violated)
+    
+    return value_sum + penalty
+
+
+class NumpyEngine:
+    """
+    Expansion engine that scores a whole step's candidates as arrays.
+    
+    With scoring="incremental", a candidate's score is its parent's score plus
+    the value and penalty change of the one column it writes; survivors are
+    re-scored in full, as in the reference engine. With dedup, candidate
+    fingerprints are updated from the parent's with two cell hashes and
+    repeats are dropped before scoring. With a score_cache and full
+    scoring, exact candidate fingerprints are looked up first and only the
+    misses are scored, serially. With workers > 1, large full-scoring steps
+    without a cache are sharded across a process pool (see parallel.py)
+    with identical results.
+    
+    safe_point, when set, is called once candidates are built and again
+    before scoring, and may raise StepInterrupted to abandon the step.
+    
+    With a scorer plugin, each step's candidate rows are materialized and
+    passed to its score_batch in one call; incremental scoring and the
+    process pool do not apply.
+    
+    reference, when given, builds the PythonEngine the run is handed to
+    once a step could produce Python ints that float64 does not hold
+    exactly (see _stays_exact); the two engines would then rank
+    candidates differently.
+    """
+    
+    def __init__(
+        self,
+        compiled: _ArrayScenario,
+        rng: random.Random,
+        labels: ActionLabels,
+        scoring: str = "full",
+        dedup: bool = False,
+        score_cache: ScoreCache | None = None,
+        cache_scope: str = "",
+        workers: int = 1,
+        plugin: ScoringPlugin | None = None,
+        reference: Callable[[], PythonEngine] | None = None
+    ):
+        self.compiled = compiled
+        self.rng = rng
+        self.plugin = plugin
+        self.incremental = scoring == "incremental" and compiled.objective is None and plugin is None
+        self.dedup = dedup
+        self.duplicates = 0
+        self.evaluated = 0
+        self.score_cache = score_cache
+        self.cache_scope = cache_scope
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._salts = np.array([field_salt(key) for key in compiled.fields], dtype=np.uint64)
+        self._int_salts = np.array([int_salt(key) for key in compiled.fields], dtype=np.uint64)
+        if compiled.actions is None:
+            self._action_ids = [
+                labels.intern({"type": action_type, "field": field})
+                for field in compiled.fields
+                for action_type in ("increment", "decrement")
+            ]
+        else:
+            self._action_ids = [labels.intern(action) for action in compiled.actions]
+        self._beam: list[SimulationState] | None = None
+        self._rows = None
+        # True where a beam cell holds a Python int rather than a float
+        self._int_cells = None
+        self._scores = None
+        self._fingerprints = None
+        self._exact_fingerprints = None
+        self.safe_point: Callable[[], None] | None = None
+        self._reference = reference
+        self._fallback: PythonEngine | None = None
+        self._scorer = None
+        if workers > 1 and not self.incremental and plugin is None:
+            from parallel import ParallelScorer
+            
+            self._scorer = ParallelScorer(workers, compiled)
+    
+    def close(self) -> None:
+        """Release resources held for parallel scoring."""
+        if self._scorer is not None:
+            self._scorer.close()
+    
+    def _beam_rows(self, beam: list[SimulationState]):
+        """Array rows for the beam, rebuilt only if it was not produced here."""
+        if beam is not self._beam:
+            fields = self.compiled.fields
+            self._rows = np.array(
+                [[s.values[key] for key in fields] for s in beam],
+                dtype=np.float64
+            ).reshape(len(beam), len(fields))
+            self._int_cells = np.array(
+                [[not isinstance(s.values[key], float) for key in fields] for s in beam],
+                dtype=bool
+            ).reshape(len(beam), len(fields))
+            self._scores = np.array([s.score for s in beam], dtype=np.float64)
+            self._fingerprints = np.array([s.fingerprint for s in beam], dtype=np.uint64)
+            self._exact_fingerprints = np.array(
+                [s.exact_fingerprint for s in beam], dtype=np.uint64
+            )
+        return self._rows
+    
+    def _stays_exact(self, rows, int_cells) -> bool:
+        """
+        True if every candidate of this beam keeps its int arithmetic exact.
+        
+        The reference engine sums ints (and scales int constraint excesses)
+        exactly, so the int cells of any candidate, their running sum and
+        each int penalty must stay within _EXACT_INT_LIMIT. One action
+        changes one cell by at most int_operand_reach, which bounds all of
+        them from the beam's own ints.
+        """
+        compiled = self.compiled
+        reach = float(np.abs(np.where(int_cells, rows, 0.0)).sum(axis=1).max(initial=0.0))
+        reach += compiled.int_operand_reach
+        if compiled.constraints:
+            reach = max(reach, (reach + compiled.int_limit_reach) * compiled.weight_reach)
+        return reach <= _EXACT_INT_LIMIT
+    
+    def _expand_reference(self, beam: list[SimulationState], beam_width: int) -> list[SimulationState]:
+        """Expand with the reference engine, keeping this engine's counters."""
+        fallback = self._fallback
+        fallback.safe_point = self.safe_point
+        fallback.duplicates, fallback.evaluated = self.duplicates, self.evaluated
+        fallback.cache_hits, fallback.cache_misses = self.cache_hits, self.cache_misses
+        try:
+            return fallback.expand(beam, beam_width)
+        finally:
+            self.duplicates, self.evaluated = fallback.duplicates, fallback.evaluated
+            self.cache_hits, self.cache_misses = fallback.cache_hits, fallback.cache_misses
+    
+    def _hash_cells(self, columns, values, quantize_bits: int, ints=None):
+        """
+        Vectorized fingerprint.field_hash for numeric cells.
+        
+        Exact hashes (quantize_bits=0) need ints, which marks the cells
+        holding Python ints; the engine only holds ints float64 represents
+        exactly, so their int64 values are the ints themselves.
+        """
+        x = (values + 0.0).view(np.uint64)
+        if quantize_bits:
+            x = (x + np.uint64(1 << (quantize_bits - 1))) >> np.uint64(quantize_bits)
+            x = self._salts[columns] ^ x
+        else:
+            x = np.where(
+                ints,
+                self._int_salts[columns] ^ values.astype(np.int64).view(np.uint64),
+                self._salts[columns] ^ x
+            )
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(MIX_1)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(MIX_2)
+        return x ^ (x >> np.uint64(31))
+    
+    def _child_fingerprints(
+        self, parent_fingerprints, parents, columns, old, new_values, quantize_bits, old_ints=None, new_ints=None
+    ):
+        """
+        Fingerprints of candidates, updated from their parents' in O(1) each.
+        
+        old_ints and new_ints mark int cells, as _hash_cells needs for exact hashes.
+        """
+        fingerprints = parent_fingerprints[parents]
+        touched = np.flatnonzero(columns >= 0)
+        cells = columns[touched]
+        exact = quantize_bits == 0
+        fingerprints[touched] ^= (
+            self._hash_cells(cells, old[touched], quantize_bits, old_ints[touched] if exact else None)
+            ^ self._hash_cells(cells, new_values[touched], quantize_bits, new_ints[touched] if exact else None)
+        )
+        return fingerprints
+    
+    def score_candidates(self, rows, parents, columns, new_values, int_cells, new_ints):
+        """Return total scores for candidates without materializing their rows."""
+        compiled = self.compiled
+        if self.plugin is not None:
+            return self._plugin_scores(rows, parents, columns, new_values)
+        return score_candidates(
+            rows, parents, columns, new_values, compiled.constraints, compiled.objective, compiled.columns,
+            int_cells, new_ints
+        )
+    
+    def _plugin_scores(self, rows, parents, columns, new_values):
+        """Materialize candidate rows and score them with one score_batch call."""
+        states = rows[parents]
+        touched = np.flatnonzero(columns >= 0)
+        states[touched, columns[touched]] = new_values[touched]
+        scores, _ = self.plugin.score_batch(states, self.compiled.fields, self.compiled.bounds)
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.shape != (len(parents),):
+            raise ValueError(
+                f"Scorer '{self.plugin.name}' returned {scores.shape} scores for {len(parents)} states"
+            )
+        if not np.isfinite(scores).all():
+            raise ValueError(f"Scorer '{self.plugin.name}' returned non-finite scores")
+        return scores
+    
+    def score_rows(self, rows, int_cells):
+        """Return total scores for fully materialized rows."""
+        n = len(rows)
+        return self.score_candidates(
+            rows, np.arange(n), np.full(n, -1, dtype=np.intp), np.zeros(n), int_cells, np.zeros(n, dtype=bool)
+        )
+    
+    def _cached_scores(self, rows, parents, columns, new_values, int_cells, new_ints, exact_fingerprints):
+        """Full scores, served from the score cache where possible."""
+        cache, scope = self.score_cache, self.cache_scope
+        scores = self._scores[parents]
+        touched = np.flatnonzero(columns >= 0)
+        keys = exact_fingerprints[touched].tolist()
+        
+        cached = cache.get_many(keys, scope)
+        hit = np.fromiter((score is not None for score in cached), dtype=bool, count=len(cached))
+        scores[touched[hit]] = [score for score in cached if score is not None]
+        
+        missed = np.flatnonzero(~hit)
+        self.cache_hits += len(keys) - len(missed)
+        self.cache_misses += len(missed)
+        if len(missed):
+            missing = touched[missed]
+            computed = self.score_candidates(
+                rows, parents[missing], columns[missing], new_values[missing], int_cells, new_ints[missing]
+            )
+            scores[missing] = computed
+            cache.put_many([keys[position] for position in missed.tolist()], scope, computed.tolist())
+        return scores
+    
+    def _column_penalty(self, values, columns):
+        """Constraint penalty of each value in its own column."""
+        penalty = np.zeros(len(values))
+        compiled = self.compiled
+        over = values - compiled.max_limit[columns]
+        hit = over > 0
+        penalty[hit] -= over[hit] * compiled.max_weight[columns[hit]]
+        under = compiled.min_limit[columns] - values
+        hit = under > 0
+        penalty[hit] -= under[hit] * compiled.min_weight[columns[hit]]
+        return penalty
+    
+    def expand(self, beam: list[SimulationState], beam_width: int) -> list[SimulationState]:
+        """Expand every beam state by every action and keep the best beam_width."""
+        if self._fallback is not None:
+            return self._expand_reference(beam, beam_width)
+        compiled = self.compiled
+        rows = self._beam_rows(beam)
+        int_cells = self._int_cells
+        if self._reference is not None and not self._stays_exact(rows, int_cells):
+            # Checked before the step draws from rng, so the reference
+            # engine consumes the random stream from the same position
+            self._fallback = self._reference()
+            return self._expand_reference(beam, beam_width)
+        n_beam, n_fields = rows.shape
+        
+        if compiled.actions is None:
+            # One increment and one decrement per numeric field, with deltas
+            # drawn per state in the same order as CompiledScenario.actions_for.
+            deltas = [self.rng.uniform(0.5, 2.0) for _ in range(n_beam * n_fields)]
+            n_actions = 2 * n_fields
+            operand = np.repeat(np.array(deltas, dtype=np.float64), 2)
+            operand[1::2] *= -1
+            columns = np.tile(np.repeat(np.arange(n_fields), 2), n_beam)
+            is_set = np.zeros(len(operand), dtype=bool)
+            operand_int = is_set
+        else:
+            n_actions = len(compiled.actions)
+            operand = np.tile(compiled.action_operand, n_beam)
+            columns = np.tile(compiled.action_field, n_beam)
+            is_set = np.tile(compiled.action_is_set, n_beam)
+            operand_int = np.tile(compiled.action_operand_int, n_beam)
+        
+        if n_beam * n_actions == 0:
+            return []
+        
+        # Candidate c is action (c % n_actions) applied to state (c // n_actions),
+        # the same order the reference engine appends candidates in. Each
+        # action writes at most one column, so a candidate is its parent index
+        # plus a (column, old value, new value) cell, with column -1 for a no-op.
+        parents = np.repeat(np.arange(n_beam), n_actions)
+        candidate_ids = np.arange(len(parents))
+        touched = np.flatnonzero(columns >= 0)
+        old = np.zeros(len(parents))
+        new_values = np.zeros(len(parents))
+        old[touched] = rows[parents[touched], columns[touched]]
+        new_values[touched] = np.where(
+            is_set[touched], operand[touched], old[touched] + operand[touched]
+        )
+        # A delta keeps a cell an int only if both the cell and the delta are ints
+        new_ints = np.zeros(len(parents), dtype=bool)
+        new_ints[touched] = operand_int[touched] & (
+            is_set[touched] | int_cells[parents[touched], columns[touched]]
+        )
+        
+        if self.safe_point is not None:
+            self.safe_point()
+        
+        fingerprints = None
+        if self.dedup:
+            # Keep only the first candidate reaching each state
+            fingerprints = self._child_fingerprints(
+                self._fingerprints, parents, columns, old, new_values, QUANTIZE_BITS
+            )
+            _, first = np.unique(fingerprints, return_index=True)
+            keep = np.sort(first)
+            self.duplicates += len(parents) - len(keep)
+            candidate_ids, parents, columns, old, new_values, new_ints, fingerprints = (
+                values[keep]
+                for values in (candidate_ids, parents, columns, old, new_values, new_ints, fingerprints)
+            )
+        
+        exact_fingerprints = None
+        if self.score_cache is not None:
+            old_ints = np.zeros(len(parents), dtype=bool)
+            hit = np.flatnonzero(columns >= 0)
+            old_ints[hit] = int_cells[parents[hit], columns[hit]]
+            exact_fingerprints = self._child_fingerprints(
+                self._exact_fingerprints, parents, columns, old, new_values, 0, old_ints, new_ints
+            )
+        
+        if self.safe_point is not None:
+            self.safe_point()
+        self.evaluated += len(parents)
+        
+        if self.incremental:
+            scores = self._scores[parents]
+            touched = np.flatnonzero(columns >= 0)
+            cells = columns[touched]
+            # Grouped as in the reference _score_delta: value change plus penalty change
+            scores[touched] += (new_values[touched] - old[touched]) + (
+                self._column_penalty(new_values[touched], cells)
+                - self._column_penalty(old[touched], cells)
+            )
+        elif exact_fingerprints is not None:
+            scores = self._cached_scores(
+                rows, parents, columns, new_values, int_cells, new_ints, exact_fingerprints
+            )
+        elif self._scorer is None or len(parents) < PARALLEL_MIN_CANDIDATES:
+            scores = self.score_candidates(rows, parents, columns, new_values, int_cells, new_ints)
+        else:
+            scores = None
+        
+        if scores is None:
+            order, top_scores = self._scorer.top_k(
+                rows, parents, columns, new_values, int_cells, new_ints, beam_width
+            )
+        else:
+            order = top_k(scores, beam_width)
+            top_scores = scores[order]
+        
+        # Materialize rows for the survivors only
+        survivor_rows = rows[parents[order]]
+        hit = np.flatnonzero(columns[order] >= 0)
+        survivor_rows[hit, columns[order][hit]] = new_values[order][hit]
+        survivor_ints = int_cells[parents[order]]
+        survivor_ints[hit, columns[order][hit]] = new_ints[order][hit]
+        survivor_scores = self.score_rows(survivor_rows, survivor_ints) if self.incremental else top_scores
+        no_fingerprints = np.zeros(len(order), dtype=np.uint64)
+        survivor_fingerprints = fingerprints[order] if fingerprints is not None else no_fingerprints
+        survivor_exact = (
+            exact_fingerprints[order] if exact_fingerprints is not None else no_fingerprints
+        )
+        
+        survivors = []
+        for rank, candidate in enumerate(candidate_ids[order].tolist()):
+            parent = beam[candidate // n_actions]
+            action_index = candidate % n_actions
+            if compiled.actions is None:
+                field = compiled.fields[action_index // 2]
+                action = {
+                    "type": "increment" if action_index % 2 == 0 else "decrement",
+                    "field": field,
+                    "delta": deltas[(candidate // n_actions) * n_fields + action_index // 2]
+                }
+            else:
+                action = compiled.actions[action_index]
+            
+            survivors.append(SimulationState(
+                values=_apply_action(parent.values, action),
+                score=float(survivor_scores[rank]),
+                path=PathNode(parent.path, self._action_ids[action_index]),
+                fingerprint=int(survivor_fingerprints[rank]),
+                exact_fingerprint=int(survivor_exact[rank])
+            ))
+        
+        self._beam = survivors
+        self._rows = survivor_rows
+        self._int_cells = survivor_ints
+        self._scores = np.array(survivor_scores, dtype=np.float64)
+        self._fingerprints = survivor_fingerprints
+        self._exact_fingerprints = survivor_exact
+        return survivors
+
+
+def create_engine(
+    scenario: CompiledScenario,
+    constraints: CompiledConstraints,
+    rng: random.Random,
+    labels: ActionLabels,
+    scoring: str = "full",
+    dedup: bool = False,
+    score_cache: ScoreCache | None = None,
+    cache_scope: str = "",
+    workers: int = 1,
+    plugin: ScoringPlugin | None = None
+) -> NumpyEngine | None:
+    """
+    Build a NumpyEngine for the scenario, or None if it does not fit.
+    
+    With the default scorer, the engine falls back to a PythonEngine for the
+    rest of the run if the search's ints outgrow float64. A scorer plugin
+    is handed float64 arrays by contract, so it never falls back.
+    """
+    compiled = _compile(scenario, constraints)
+    if compiled is None:
+        return None
+    
+    def reference() -> PythonEngine:
+        # The beam it inherits carries exact fingerprints hashed as the
+        # reference engine hashes them, so it keeps using the same cache
+        return PythonEngine(
+            scenario, constraints, rng, labels, scoring, dedup, score_cache, cache_scope, scenario.objective
+        )
+    
+    return NumpyEngine(
+        compiled, rng, labels, scoring, dedup, score_cache, cache_scope, workers, plugin,
+        reference if plugin is None else None
+    )